@@ -1,7 +1,8 @@
 import logging
-from typing import List
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 
 from core.config import settings
 from models.schemas import (
@@ -10,6 +11,9 @@ from models.schemas import (
     AdminSmtpTestRequest,
     AdminSmtpTestResponse,
     AdminOtpVerifyRequest,
+    ProctoringAggregateResponse,
+    ProctoringEventPage,
+    ProctoringSessionPage,
     QuestionCreate,
     QuestionResponse,
 )
@@ -19,6 +23,27 @@ from services.question_service import (
     delete_question,
     update_question,
 )
+from services.answer_jobs import answer_jobs
+from services.answer_prescreen import get_prescreen_stats
+from services.audio_preprocess import get_preprocess_stats
+from services.audio_probe import get_probe_stats
+from services.conversation_memory import get_memory_stats
+from services.proctoring_aggregates import daily_summaries, session_summary
+from services.proctoring_channel import get_channel_stats
+from services.proctoring_ingest import proctoring_ingest
+from services.proctoring_sink import proctoring_sink
+from services.proctoring_store import aggregate, proctoring_store, query_events, query_sessions
+from services.streaming_transcription import get_streaming_stats
+from services.transcript_cache import transcript_cache
+from services.transcription_backends import get_transcription_stats
+from services.usage_ledger import usage_ledger
+from services.openai_service import (
+    get_resilience_status,
+    get_route_stats,
+    get_executor_stats,
+    get_scheduler_stats,
+    get_singleflight_stats,
+)
 from services.admin_auth_service import (
     request_admin_otp,
     send_smtp_test_email,
@@ -169,3 +194,166 @@ def remove_question(question_id: int):
             detail=f"Failed to delete question: {exc}",
         )
 
+@router.get(
+    "/proctoring/sessions",
+    response_model=ProctoringSessionPage,
+    dependencies=[Depends(require_admin_auth)],
+)
+def list_proctoring_sessions(
+    candidate_id: Optional[str] = None,
+    session_status: Optional[str] = Query(None, alias="status"),
+    terminated: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    try:
+        total, items = query_sessions(
+            candidate_id=candidate_id,
+            status=session_status,
+            terminated=terminated,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset,
+        )
+        return ProctoringSessionPage(total=total, limit=limit, offset=offset, items=items)
+    except Exception as exc:
+        logger.exception("list_proctoring_sessions failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch proctoring sessions: {exc}",
+        )
+
+
+@router.get(
+    "/proctoring/sessions/{session_id}/events",
+    response_model=ProctoringEventPage,
+    dependencies=[Depends(require_admin_auth)],
+)
+def list_proctoring_events(
+    session_id: str,
+    event_type: Optional[str] = Query(None, alias="type"),
+    counted: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    try:
+        total, items = query_events(
+            session_id,
+            event_type=event_type,
+            counted=counted,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset,
+        )
+        return ProctoringEventPage(total=total, limit=limit, offset=offset, items=items)
+    except Exception as exc:
+        logger.exception("list_proctoring_events failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch proctoring events: {exc}",
+        )
+
+
+@router.get("/proctoring/logs/{candidate_id}/{session_id}", dependencies=[Depends(require_admin_auth)])
+def proctoring_session_log(candidate_id: str, session_id: str) -> Dict[str, Any]:
+    # Raw audit records from the log files (indexed segments, not the database copy).
+    try:
+        records = proctoring_sink.read_session(candidate_id, session_id)
+        if not records:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No proctoring log for this session")
+        return {"candidate_id": candidate_id, "session_id": session_id, "records": records}
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("proctoring_session_log failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read proctoring log: {exc}",
+        )
+
+
+@router.get("/proctoring/stats/sessions/{session_id}", dependencies=[Depends(require_admin_auth)])
+def proctoring_session_stats(session_id: str) -> Dict[str, Any]:
+    # Running counters kept up to date at ingest; no event rows are read.
+    try:
+        summary = session_summary(session_id)
+        if summary is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No proctoring stats for this session")
+        return summary
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("proctoring_session_stats failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch proctoring stats: {exc}",
+        )
+
+
+@router.get("/proctoring/stats/daily", dependencies=[Depends(require_admin_auth)])
+def proctoring_daily_stats(since: Optional[date] = None, until: Optional[date] = None) -> Dict[str, Any]:
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=29)
+    if since > until or (until - since).days > 366:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since..until must span 1 to 367 days")
+    try:
+        return daily_summaries(since, until)
+    except Exception as exc:
+        logger.exception("proctoring_daily_stats failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch proctoring daily stats: {exc}",
+        )
+
+
+@router.get(
+    "/proctoring/aggregate",
+    response_model=ProctoringAggregateResponse,
+    dependencies=[Depends(require_admin_auth)],
+)
+def proctoring_aggregate(
+    group_by: Literal["type", "day", "status"] = "type",
+    candidate_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    try:
+        buckets = aggregate(group_by, candidate_id=candidate_id, since=since, until=until)
+        return ProctoringAggregateResponse(group_by=group_by, buckets=buckets)
+    except Exception as exc:
+        logger.exception("proctoring_aggregate failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to aggregate proctoring events: {exc}",
+        )
+
+
+@router.get("/llm/status", dependencies=[Depends(require_admin_auth)])
+def llm_status() -> Dict[str, Any]:
+    # Internal view of the LLM call path for capacity tuning.
+    return {
+        "singleflight": get_singleflight_stats(),
+        "scheduler": get_scheduler_stats(),
+        "llm_executor": get_executor_stats(),
+        "breakers": get_resilience_status(),
+        "routes": get_route_stats(),
+        "conversation_memory": get_memory_stats(),
+        "prescreen": get_prescreen_stats(),
+        "usage_ledger": usage_ledger.stats(),
+        "audio_probe": get_probe_stats(),
+        "audio_preprocess": get_preprocess_stats(),
+        "streaming_transcription": get_streaming_stats(),
+        "transcript_cache": transcript_cache.stats(),
+        "transcription": get_transcription_stats(),
+        "answer_jobs": answer_jobs.stats(),
+        "proctoring_ingest": proctoring_ingest.stats(),
+        "proctoring_channel": get_channel_stats(),
+        "proctoring_sink": proctoring_sink.stats(),
+        "proctoring_store": proctoring_store.stats(),
+    }
@@ -1,25 +1,46 @@
+import asyncio
 import logging
 import json
 from uuid import uuid4
-from datetime import datetime, timezone
-from pathlib import Path
-from typing import Literal
-
-from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile, status
+from typing import Any, AsyncIterator, Literal, Tuple
+
+from fastapi import (
+    APIRouter,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from core.config import settings
 from models.schemas import (
+    AnswerJobResponse,
     AnswerResponse,
     InterviewNextRequest,
     InterviewNextResponse,
     InterviewStartResponse,
+    InterviewTurnResponse,
     ProctoringLogRequest,
     ProctoringLogResponse,
     UsageSummaryResponse,
 )
-from services.openai_service import evaluate_answer, generate_ai_question, generate_followup_question
+from services import conversation_memory
+from services.answer_jobs import TERMINAL, answer_jobs
+from services.audio_probe import validate_audio
+from services.openai_service import evaluate_answer, generate_ai_question, generate_followup_question, stream_evaluation
+from services.llm_resilience import LLMUnavailableError
+from services.proctoring_channel import ProctoringChannel
+from services.proctoring_ingest import proctoring_ingest
 from services.question_service import get_company_questions
-from services.speech_service import transcribe_audio
+from services.speech_service import audio_too_large, transcribe_audio
+from services.streaming_transcription import IncrementalTranscriber
 from services.usage_service import (
     check_question_limit,
     enforce_interview_limits_or_raise,
@@ -35,11 +56,12 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/interview", tags=["candidate"])
 
 MAX_QUESTIONS = settings.max_questions_per_interview
+# Upper bound for one long-poll, and the SSE keep-alive interval.
+ANSWER_JOB_MAX_WAIT_SECONDS = 30
 HYBRID_DB_QUESTIONS = 3
-LOGS_DIR = Path(__file__).resolve().parents[2] / "logs" / "proctoring"
 
 
-def _enforce_windows_browser_only(request: Request) -> None:
+def _enforce_windows_browser_only(request: Request | WebSocket) -> None:
     if not settings.windows_browser_only:
         return
     user_agent = (request.headers.get("user-agent") or "").lower()
@@ -64,16 +86,15 @@ def _enforce_windows_browser_only(request: Request) -> None:
         )
 
 
-def _is_valid_audio_upload(audio: UploadFile) -> bool:
-    content_type = (audio.content_type or "").lower()
-    filename = (audio.filename or "").lower()
-    if content_type.startswith("audio/"):
-        return True
-    if content_type == "application/octet-stream" and filename.endswith(
-        (".wav", ".mp3", ".m4a", ".webm", ".ogg")
-    ):
-        return True
-    return False
+async def _validate_audio_upload(audio: UploadFile) -> None:
+    """
+    Reject uploads that are not real audio, or are too short/long, before any paid call.
+
+    The container is sniffed from the bytes rather than trusted from the content type,
+    and the filename extension is corrected to match so the STT engine decodes it right.
+    """
+    probe = await asyncio.to_thread(validate_audio, audio.file)
+    audio.filename = probe.filename(audio.filename or "audio")
 
 
 @router.get("/start", response_model=InterviewStartResponse)
@@ -150,6 +171,64 @@ async def start_interview(
         )
 
 
+async def _select_next_question(
+    *,
+    mode: str,
+    role: str,
+    difficulty: str,
+    previous_question: str,
+    user_answer: str,
+    next_index: int,
+    user_id: str,
+    session_id: str,
+) -> Tuple[str, str]:
+    """Pick the next question for the mode; returns (question, source)."""
+    if mode != "company" and settings.next_question_from_history:
+        # Feeds history-aware AI follow-ups, including turns answered on curated questions.
+        conversation_memory.record_turn(session_id, previous_question, user_answer)
+    company_questions = get_company_questions(
+        role=role,
+        difficulty=difficulty,
+        limit=HYBRID_DB_QUESTIONS if mode == "hybrid" else MAX_QUESTIONS,
+        shuffle=False,
+    )
+
+    if mode == "company":
+        if next_index < len(company_questions):
+            return company_questions[next_index].question, "database"
+        question = await generate_ai_question(role=role, difficulty=difficulty, user_id=user_id)
+        return question, "ai"
+    if mode == "hybrid" and next_index < len(company_questions):
+        return company_questions[next_index].question, "database"
+    try:
+        if settings.next_question_from_history:
+            # History-aware follow-up: rolling summary of earlier turns plus the latest ones verbatim.
+            question = await conversation_memory.generate_followup(
+                session_id,
+                role=role,
+                difficulty=difficulty,
+                user_id=user_id,
+            )
+        else:
+            question = await generate_followup_question(
+                previous_question=previous_question,
+                user_answer=user_answer,
+                role=role,
+                difficulty=difficulty,
+                user_id=user_id,
+            )
+    except LLMUnavailableError:
+        if mode != "hybrid":
+            raise
+        # Breaker is open: keep hybrid interviews moving with the wider curated pool.
+        fallback_pool = get_company_questions(role=role, difficulty=difficulty, shuffle=False)
+        if not fallback_pool:
+            raise
+        logger.warning("hybrid fallback to database question role=%s index=%s", role, next_index)
+        return fallback_pool[next_index % len(fallback_pool)].question, "database"
+    return question, "ai"
+
+
 @router.post("/next", response_model=InterviewNextResponse)
 async def next_question(payload: InterviewNextRequest, request: Request):
     """
@@ -167,48 +246,17 @@ async def next_question(payload: InterviewNextRequest, request: Request):
         check_question_limit(payload.user_id)
 
         next_index = int(payload.question_index) + 1
-
-        company_questions = get_company_questions(
+        question, source = await _select_next_question(
+            mode=payload.mode,
             role=payload.role,
             difficulty=payload.difficulty,
-            limit=HYBRID_DB_QUESTIONS if payload.mode == "hybrid" else MAX_QUESTIONS,
-            shuffle=False,
+            previous_question=payload.previous_question,
+            user_answer=payload.user_answer,
+            next_index=next_index,
+            user_id=payload.user_id,
+            session_id=payload.session_id,
         )
 
-        if payload.mode == "company":
-            if next_index < len(company_questions):
-                question = company_questions[next_index].question
-                source = "database"
-            else:
-                question = await generate_ai_question(
-                    role=payload.role,
-                    difficulty=payload.difficulty,
-                    user_id=payload.user_id,
-                )
-                source = "ai"
-        elif payload.mode == "ai":
-            question = await generate_followup_question(
-                previous_question=payload.previous_question,
-                user_answer=payload.user_answer,
-                role=payload.role,
-                difficulty=payload.difficulty,
-                user_id=payload.user_id,
-            )
-            source = "ai"
-        else:
-            if next_index < len(company_questions):
-                question = company_questions[next_index].question
-                source = "database"
-            else:
-                question = await generate_followup_question(
-                    previous_question=payload.previous_question,
-                    user_answer=payload.user_answer,
-                    role=payload.role,
-                    difficulty=payload.difficulty,
-                    user_id=payload.user_id,
-                )
-                source = "ai"
-
         enforce_interview_limits_or_raise(session, next_question_index=next_index, next_source=source)
         advance_session_state(
             payload.session_id,
@@ -244,15 +292,13 @@ async def answer(
     user_id: str = Form(""),
 ):
     _enforce_windows_browser_only(request)
-    if not _is_valid_audio_upload(audio):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Please upload an audio file.",
-        )
+    await _validate_audio_upload(audio)
     try:
         transcript = await transcribe_audio(audio, max_bytes=settings.max_audio_upload_bytes)
         evaluation = await evaluate_answer(answer=transcript, question=question, user_id=user_id or None)
         return AnswerResponse(transcript=transcript, evaluation=evaluation)
+    except HTTPException:
+        raise
     except Exception as exc:
         logger.exception("answer failed")
         raise HTTPException(
@@ -261,6 +307,304 @@ async def answer(
         )
 
 
+@router.post("/turn", response_model=InterviewTurnResponse)
+async def turn(
+    request: Request,
+    audio: UploadFile = File(...),
+    question: str = Form(...),
+    user_id: str = Form(..., min_length=2),
+    session_id: str = Form(..., min_length=2),
+    mode: Literal["company", "ai", "hybrid"] = Form(...),
+    role: str = Form(..., min_length=2),
+    difficulty: str = Form(..., pattern="^(easy|medium|hard)$"),
+    question_index: int = Form(..., ge=0),
+):
+    """
+    Answer the current question and advance in one request.
+
+    Equivalent to /answer followed by /next, but the audio is transcribed once and
+    evaluation runs concurrently with next-question selection/generation, since the
+    follow-up only needs the transcript.
+    """
+    _enforce_windows_browser_only(request)
+    await _validate_audio_upload(audio)
+    try:
+        session = validate_session_or_raise(session_id, user_id)
+        enforce_next_question_cooldown_or_raise(session)
+        check_question_limit(user_id)
+
+        transcript = await transcribe_audio(audio, max_bytes=settings.max_audio_upload_bytes)
+        if not transcript.strip():
+            evaluation = await evaluate_answer(answer=transcript, question=question, user_id=user_id)
+            # The session does not advance: the same question comes back so the candidate can retry.
+            return InterviewTurnResponse(
+                transcript=transcript,
+                evaluation=evaluation,
+                next_question=InterviewNextResponse(
+                    session_id=session_id,
+                    user_id=user_id,
+                    question=question,
+                    mode=mode,
+                    source="retry",
+                    question_index=question_index,
+                ),
+            )
+
+        next_index = int(question_index) + 1
+        # A TaskGroup cancels the sibling if either call fails, so a failed evaluation
+        # does not leave a next-question LLM call running (and billed) with no reader.
+        try:
+            async with asyncio.TaskGroup() as group:
+                evaluation_task = group.create_task(
+                    evaluate_answer(answer=transcript, question=question, user_id=user_id)
+                )
+                next_task = group.create_task(
+                    _select_next_question(
+                        mode=mode,
+                        role=role,
+                        difficulty=difficulty,
+                        previous_question=question,
+                        user_answer=transcript,
+                        next_index=next_index,
+                        user_id=user_id,
+                        session_id=session_id,
+                    )
+                )
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        evaluation = evaluation_task.result()
+        next_text, source = next_task.result()
+        conversation_memory.update_score(session_id, question, int(evaluation["score"]))
+
+        enforce_interview_limits_or_raise(session, next_question_index=next_index, next_source=source)
+        advance_session_state(session_id, user_id, next_question_index=next_index, source=source)
+        increment_question_usage(user_id)
+
+        return InterviewTurnResponse(
+            transcript=transcript,
+            evaluation=evaluation,
+            next_question=InterviewNextResponse(
+                session_id=session_id,
+                user_id=user_id,
+                question=next_text,
+                mode=mode,
+                source=source,
+                question_index=next_index,
+            ),
+        )
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("turn failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process turn: {exc}",
+        )
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=True)}\n\n"
+
+
+@router.post("/answer/stream")
+async def answer_stream(
+    request: Request,
+    audio: UploadFile = File(...),
+    question: str = Form(...),
+    user_id: str = Form(""),
+):
+    """
+    Server-Sent Events variant of /answer.
+
+    Events, in order:
+    - `transcript`: {"transcript": str} as soon as speech-to-text finishes.
+    - `field`: {"name": str, "value": any} for each rubric field as the model completes it.
+    - `feedback`: {"delta": str} incremental feedback text.
+    - `result`: the final AnswerResponse payload (same schema as /answer).
+    - `error`: {"detail": str} if evaluation fails mid-stream.
+    """
+    _enforce_windows_browser_only(request)
+    await _validate_audio_upload(audio)
+    # Transcribe before the response starts: the upload is closed once the handler returns.
+    try:
+        transcript = await transcribe_audio(audio, max_bytes=settings.max_audio_upload_bytes)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("answer_stream transcription failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process answer: {exc}",
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield _sse_event("transcript", {"transcript": transcript})
+        try:
+            async for kind, payload in stream_evaluation(
+                answer=transcript,
+                question=question,
+                user_id=user_id or None,
+            ):
+                if kind == "field":
+                    name, value = payload
+                    yield _sse_event("field", {"name": name, "value": value})
+                elif kind == "feedback_delta":
+                    yield _sse_event("feedback", {"delta": payload})
+                elif kind == "evaluation":
+                    result = AnswerResponse(transcript=transcript, evaluation=payload)
+                    yield _sse_event("result", result.model_dump())
+        except HTTPException as exc:
+            yield _sse_event("error", {"detail": exc.detail})
+        except Exception as exc:
+            logger.exception("answer_stream evaluation failed")
+            yield _sse_event("error", {"detail": f"Failed to process answer: {exc}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the browser as they are produced.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/answer/jobs", response_model=AnswerJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_answer_job(
+    request: Request,
+    audio: UploadFile = File(...),
+    question: str = Form(...),
+    user_id: str = Form(""),
+):
+    """
+    Queue an answer for background transcription and evaluation.
+
+    Returns immediately with a job ID; fetch the result from `GET /answer/jobs/{job_id}`
+    (long-poll with `?wait=`) or `GET /answer/jobs/{job_id}/events` (SSE).
+    Responds 503 with Retry-After when the job backlog is full.
+    """
+    _enforce_windows_browser_only(request)
+    await _validate_audio_upload(audio)
+    if audio.size is not None and audio.size > settings.max_audio_upload_bytes:
+        raise audio_too_large(settings.max_audio_upload_bytes)
+    data = await audio.read()
+    job_id = await answer_jobs.submit(
+        audio=data,
+        filename=audio.filename or "audio.webm",
+        question=question,
+        user_id=user_id,
+    )
+    return AnswerJobResponse(job_id=job_id, status="queued")
+
+
+async def _load_answer_job(job_id: str, wait: float = 0) -> dict:
+    job = await answer_jobs.wait(job_id, min(wait, ANSWER_JOB_MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer job not found.")
+    return job
+
+
+@router.get("/answer/jobs/{job_id}", response_model=AnswerJobResponse)
+async def get_answer_job(job_id: str, wait: float = Query(0, ge=0, le=ANSWER_JOB_MAX_WAIT_SECONDS)):
+    """Job status; with `wait` > 0 the request is held until the job finishes or `wait` seconds pass."""
+    job = await _load_answer_job(job_id, wait)
+    return AnswerJobResponse(job_id=job_id, status=job["status"], result=job["result"], detail=job["detail"])
+
+
+@router.get("/answer/jobs/{job_id}/events")
+async def answer_job_events(job_id: str):
+    """
+    Server-Sent Events for one job: `status` whenever a new state is observed, then
+    `result` (AnswerResponse payload) or `error` ({"detail": str}) and the stream ends.
+    """
+    job = await _load_answer_job(job_id)
+
+    async def event_stream() -> AsyncIterator[str]:
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield _sse_event("status", {"job_id": job_id, "status": last_status})
+            if current["status"] in TERMINAL:
+                if current["result"] is not None:
+                    yield _sse_event("result", current["result"])
+                else:
+                    yield _sse_event("error", {"detail": current["detail"]})
+                return
+            # Comment line keeps proxies from closing an idle stream.
+            yield ": keep-alive\n\n"
+            current = await _load_answer_job(job_id, ANSWER_JOB_MAX_WAIT_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/answer/ws")
+async def answer_ws(websocket: WebSocket):
+    """
+    Transcribe an answer while the candidate is still speaking.
+
+    Protocol:
+    - client -> `{"format": "pcm16" | "webm", "sample_rate": 16000, "question": str, "user_id": str}`
+      (`sample_rate` must be a standard rate from 8000 to 48000 Hz; anything else closes with 1008)
+    - client -> binary audio chunks, then `{"type": "end"}`
+    - server -> `{"type": "segment", "index": int, "text": str}` as pauses close segments (pcm16 only)
+    - server -> `{"type": "transcript", "transcript": str}` right after `end`
+    - server -> `{"type": "result", ...AnswerResponse}` or `{"type": "error", "detail": str}`
+    """
+    await websocket.accept()
+    transcriber: IncrementalTranscriber | None = None
+    try:
+        _enforce_windows_browser_only(websocket)
+        start = await websocket.receive_json()
+        question = str(start.get("question") or "").strip()
+        user_id = str(start.get("user_id") or "").strip()
+        if not question:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="question is required.")
+        try:
+            transcriber = IncrementalTranscriber(
+                audio_format=str(start.get("format") or "webm"),
+                sample_rate=int(start.get("sample_rate") or 16_000),
+                max_bytes=settings.max_audio_upload_bytes,
+            )
+        except (TypeError, ValueError) as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                transcriber.feed(message["bytes"])
+                for index, text in transcriber.new_segments():
+                    await websocket.send_json({"type": "segment", "index": index, "text": text})
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        transcript = await transcriber.finish()
+        await websocket.send_json({"type": "transcript", "transcript": transcript})
+        evaluation = await evaluate_answer(answer=transcript, question=question, user_id=user_id or None)
+        result = AnswerResponse(transcript=transcript, evaluation=evaluation)
+        await websocket.send_json({"type": "result", **result.model_dump()})
+        await websocket.close()
+    except WebSocketDisconnect:
+        if transcriber is not None:
+            transcriber.cancel()
+    except HTTPException as exc:
+        if transcriber is not None:
+            transcriber.cancel()
+        await websocket.send_json({"type": "error", "detail": exc.detail})
+        await websocket.close(code=1008)
+    except Exception as exc:
+        if transcriber is not None:
+            transcriber.cancel()
+        logger.exception("answer_ws failed")
+        await websocket.send_json({"type": "error", "detail": f"Failed to process answer: {exc}"})
+        await websocket.close(code=1011)
+
+
 @router.get("/usage", response_model=UsageSummaryResponse)
 async def usage(user_id: str = Query(..., min_length=2)):
     try:
@@ -285,32 +629,18 @@ async def save_proctoring_log(payload: ProctoringLogRequest):
     log detectable risk signals (tab switch, blur, blocked shortcuts, face/gaze events).
     """
     try:
-        LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        safe_candidate = "".join(c for c in payload.candidate_id if c.isalnum() or c in ("-", "_"))
-        if not safe_candidate:
-            safe_candidate = "unknown_candidate"
-        log_path = LOGS_DIR / f"{safe_candidate}.jsonl"
-
-        log_record = {
-            "server_received_at": datetime.now(timezone.utc).isoformat(),
-            "candidate_id": payload.candidate_id,
-            "session_id": payload.session_id,
-            "role": payload.role,
-            "difficulty": payload.difficulty,
-            "mode": payload.mode,
-            "status": payload.status,
-            "violations": payload.violations,
-            "terminated": payload.terminated,
-            "events": [event.model_dump() for event in payload.events],
-        }
-
-        with log_path.open("a", encoding="utf-8") as log_file:
-            log_file.write(json.dumps(log_record, ensure_ascii=True) + "\n")
-
+        # Only events past the session's acknowledged sequence are queued for the writer.
+        result = await proctoring_ingest.ingest(payload)
         return ProctoringLogResponse(
             ok=True,
-            log_file=str(log_path),
-            events_stored=len(payload.events),
+            log_file=str(result.log_path),
+            events_stored=result.events_stored,
+            acked_seq=result.acked_seq,
+            duplicates_skipped=result.duplicates_skipped,
+            events_accepted=result.events_accepted,
+            exact_duplicates_dropped=result.exact_duplicates_dropped,
+            runs_collapsed=result.runs_collapsed,
+            records_written=result.events_stored,
         )
     except Exception as exc:
         logger.exception("save_proctoring_log failed")
@@ -319,3 +649,92 @@ async def save_proctoring_log(payload: ProctoringLogRequest):
             detail=f"Failed to save proctoring log: {exc}",
         )
 
+
+@router.websocket("/proctor/ws")
+async def proctoring_ws(websocket: WebSocket):
+    """
+    Stream proctoring events over one connection instead of a POST per upload.
+
+    Protocol:
+    - client -> `{"candidate_id", "session_id", "role", "difficulty", "mode", "status"?, "violations"?, "terminated"?}`
+    - server -> `{"type": "ready", "acked_seq": int, ...}`; send events from `acked_seq` on (also after a reconnect)
+    - client -> `[seq, ts_ms, type, message, counted, metadata?]` or a list of those, seq contiguous
+    - client -> `{"type": "status", "status": str, "violations": int, "terminated": bool}` when the session state changes
+    - server -> `{"type": "ack", "acked_seq": int, "backoff_ms"?: int}` per server-side batch; with
+      `backoff_ms`, hold further events (batch them locally) for that long
+    - server -> `{"type": "resend", "from": int}` when a batch started past `acked_seq`
+    - client -> `{"type": "flush"}` to force an ack now, `{"type": "end"}` to flush and close
+    """
+    await websocket.accept()
+    channel: ProctoringChannel | None = None
+    try:
+        _enforce_windows_browser_only(websocket)
+        hello = await websocket.receive_json()
+        if not isinstance(hello, dict):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="First frame must be a session object.")
+        try:
+            meta = ProctoringLogRequest.model_validate({"status": "active", "violations": 0, **hello, "events": []})
+        except ValidationError as exc:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid session: {problems}")
+        channel = ProctoringChannel(meta)
+        await websocket.send_json(
+            {
+                "type": "ready",
+                "acked_seq": await channel.resume_seq(),
+                "batch_ms": settings.proctor_ws_batch_ms,
+                "batch_events": settings.proctor_ws_batch_events,
+            }
+        )
+
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=channel.seconds_until_due())
+            except asyncio.TimeoutError:
+                replies = await channel.flush()
+            else:
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                try:
+                    frame = json.loads(message.get("text") or "null")
+                    if isinstance(frame, list):
+                        replies = await channel.feed(frame)
+                    elif isinstance(frame, dict) and frame.get("type") == "status":
+                        violations = int(frame.get("violations", channel.meta.violations))
+                        if violations < 0:
+                            raise ValueError("violations must be >= 0")
+                        replies = await channel.update_status(
+                            str(frame.get("status") or channel.meta.status),
+                            violations,
+                            bool(frame.get("terminated", channel.meta.terminated)),
+                        )
+                    elif isinstance(frame, dict) and frame.get("type") == "flush":
+                        replies = await channel.flush() or [await channel.ack()]
+                    elif isinstance(frame, dict) and frame.get("type") == "end":
+                        replies = await channel.close() or [await channel.ack()]
+                        channel = None
+                        for reply in replies:
+                            await websocket.send_json(reply)
+                        await websocket.close()
+                        return
+                    else:
+                        raise ValueError("expected an event frame or a status/flush/end message")
+                except (TypeError, ValueError, OverflowError) as exc:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid frame: {exc}")
+            for reply in replies:
+                await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        if channel is not None:
+            # Whatever was buffered before the drop is still stored; the client resumes from `ready`.
+            await channel.close()
+    except HTTPException as exc:
+        if channel is not None:
+            await channel.close()
+        await websocket.send_json({"type": "error", "detail": exc.detail})
+        await websocket.close(code=1008)
+    except Exception as exc:
+        if channel is not None:
+            await channel.close()
+        logger.exception("proctoring_ws failed")
+        await websocket.send_json({"type": "error", "detail": f"Failed to save proctoring events: {exc}"})
+        await websocket.close(code=1011)
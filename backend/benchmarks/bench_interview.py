@@ -0,0 +1,139 @@
+"""
+Offline throughput benchmark for the interview flow (/start, /answer, /next).
+
+Runs the FastAPI app in-process against the stub LLM provider and a throwaway
+SQLite database, so it needs no network access and costs nothing:
+
+    cd backend
+    python -m benchmarks.bench_interview --candidates 50 --turns 3
+
+Stub latency/token distributions come from STUB_LLM_* environment variables.
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import struct
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+
+def _configure_env(db_path: Path) -> None:
+    # Must run before the app (and its Settings) are imported.
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("REQUEST_LIMIT_PER_MINUTE", "1000000")
+    os.environ.setdefault("NEXT_QUESTION_COOLDOWN_SECONDS", "0")
+    os.environ.setdefault("DAILY_QUESTIONS_FREE", "1000000")
+    os.environ.setdefault("DAILY_TOKENS_FREE", "1000000000")
+    os.environ.setdefault("WINDOWS_BROWSER_ONLY", "false")
+
+
+def _answer_audio(index: int, turn: int, seconds: float = 2.0) -> bytes:
+    """A short WAV tone, distinct per candidate/turn so the transcript cache does not short-circuit it."""
+    from services.audio_preprocess import pcm16_to_wav
+
+    rate = 16_000
+    frequency = 200 + (index * 7 + turn * 13) % 400
+    pcm = b"".join(
+        struct.pack("<h", int(6000 * math.sin(2 * math.pi * frequency * i / rate))) for i in range(int(seconds * rate))
+    )
+    return pcm16_to_wav(pcm, rate)
+
+
+async def _candidate(client, index: int, turns: int, timings: Dict[str, List[float]]) -> None:
+    user_id = f"bench-{index}"
+
+    async def timed(name: str, coro):
+        started = time.perf_counter()
+        response = await coro
+        timings[name].append(time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    start = await timed(
+        "/start",
+        client.get(
+            "/api/interview/start",
+            params={"user_id": user_id, "role": "Backend Engineer", "difficulty": "medium", "mode": "ai"},
+        ),
+    )
+    question = start["question"]
+    question_index = start["question_index"]
+    for turn in range(turns):
+        audio = _answer_audio(index, turn)
+        answer = await timed(
+            "/answer",
+            client.post(
+                "/api/interview/answer",
+                files={"audio": ("answer.wav", audio, "audio/wav")},
+                data={"question": question, "user_id": user_id},
+            ),
+        )
+        nxt = await timed(
+            "/next",
+            client.post(
+                "/api/interview/next",
+                json={
+                    "user_id": user_id,
+                    "session_id": start["session_id"],
+                    "mode": "ai",
+                    "role": "Backend Engineer",
+                    "difficulty": "medium",
+                    "previous_question": question,
+                    "user_answer": answer["transcript"],
+                    "question_index": question_index,
+                },
+            ),
+        )
+        question = nxt["question"]
+        question_index = nxt["question_index"]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def _run(candidates: int, turns: int) -> None:
+    import httpx
+
+    from core.database import init_db
+    from main import app
+    from services.usage_ledger import usage_ledger
+
+    init_db()
+    timings: Dict[str, List[float]] = defaultdict(list)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(_candidate(client, i, turns, timings) for i in range(candidates)))
+        elapsed = time.perf_counter() - started
+    # ASGITransport does not send lifespan events; flush before the temp DB is removed.
+    await usage_ledger.stop()
+
+    total = sum(len(v) for v in timings.values())
+    print(f"candidates={candidates} turns={turns} requests={total} elapsed={elapsed:.2f}s rps={total / elapsed:.1f}")
+    for name, values in timings.items():
+        print(
+            f"{name:8s} n={len(values):5d} mean={statistics.mean(values) * 1000:8.1f}ms "
+            f"p50={_percentile(values, 50) * 1000:8.1f}ms p95={_percentile(values, 95) * 1000:8.1f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure_env(Path(tmp) / "bench.db")
+        asyncio.run(_run(args.candidates, args.turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-event cost of proctoring uploads: one POST /proctor-log per event vs. /proctor/ws frames.
+
+Runs the app in-process against a throwaway SQLite database and log directory:
+
+    cd backend
+    python -m benchmarks.bench_proctoring --events 2000
+
+Each event is sent on its own (one POST, or one WebSocket frame), as a client reporting
+events as they happen would; the WebSocket run ends with `end` and waits for the final ack.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+
+def _configure_env(tmp: Path) -> None:
+    # Must run before the app (and its Settings) are imported.
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp / 'bench.db'}"
+    os.environ.setdefault("REQUEST_LIMIT_PER_MINUTE", "1000000000")
+    os.environ.setdefault("WINDOWS_BROWSER_ONLY", "false")
+    os.environ.setdefault("ANSWER_JOB_DB_PATH", str(tmp / "answer_jobs.db"))
+
+
+def _session(session_id: str) -> Dict[str, Any]:
+    return {"candidate_id": "bench-candidate", "session_id": session_id, "role": "Bench", "difficulty": "easy", "mode": "ai"}
+
+
+def _event(index: int) -> Dict[str, Any]:
+    # Alternating types so run-length compaction does not hide the per-event work.
+    return {
+        "timestamp": f"2026-01-01T00:{index // 60 % 60:02d}:{index % 60:02d}.{index % 1000:03d}Z",
+        "type": "violation" if index % 2 else "warning",
+        "message": f"event {index}",
+        "counted": bool(index % 2),
+        "metadata": {"i": index},
+    }
+
+
+def _report(name: str, events: int, elapsed: float) -> None:
+    print(f"{name:<6} events={events:<6} elapsed={elapsed:7.2f}s per_event={elapsed / events * 1e6:9.1f}us rate={events / elapsed:9.0f}/s")
+
+
+def _run(events: int, tmp: Path) -> None:
+    from fastapi.testclient import TestClient
+
+    import services.proctoring_sink as proctoring_sink
+    from main import app
+
+    proctoring_sink.LOGS_DIR = tmp / "logs"
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        for index in range(events):
+            response = client.post(
+                "/api/interview/proctor-log",
+                json={**_session("post"), "status": "active", "violations": 0, "seq_start": index, "events": [_event(index)]},
+            )
+            response.raise_for_status()
+        _report("post", events, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with client.websocket_connect("/api/interview/proctor/ws") as ws:
+            ws.send_json(_session("ws"))
+            ws.receive_json()
+            for index in range(events):
+                event = _event(index)
+                ws.send_json([index, event["timestamp"], event["type"], event["message"], event["counted"], event["metadata"]])
+            ws.send_json({"type": "end"})
+            acked = 0
+            while acked < events:
+                message = ws.receive_json()
+                acked = message.get("acked_seq", acked)
+        _report("ws", events, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure_env(Path(tmp))
+        _run(args.events, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Latency/throughput benchmark for the transcription backends.
+
+Sends the same set of clips to each backend at a fixed concurrency, bypassing the
+transcript cache so every request reaches the engine:
+
+    cd backend
+    python -m benchmarks.bench_transcription --backends stub,local --requests 40 --concurrency 4
+    python -m benchmarks.bench_transcription --backends api --audio test_tone.wav
+
+Without --audio, a few seconds of synthetic tone are used (enough to measure
+overhead; use a real recording to judge accuracy). The `local` backend needs
+faster-whisper and the `api` backend an OPENAI_API_KEY; unavailable backends are skipped.
+"""
+import argparse
+import asyncio
+import io
+import math
+import statistics
+import struct
+import time
+from pathlib import Path
+from typing import List
+
+
+def _synthetic_clip(seconds: float, rate: int = 16_000) -> bytes:
+    from services.audio_preprocess import pcm16_to_wav
+
+    samples = (
+        int(8000 * math.sin(2 * math.pi * 220 * i / rate) * (0.6 + 0.4 * math.sin(2 * math.pi * 3 * i / rate)))
+        for i in range(int(seconds * rate))
+    )
+    return pcm16_to_wav(b"".join(struct.pack("<h", s) for s in samples), rate)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _bench_backend(name: str, clips: List[bytes], requests: int, concurrency: int) -> None:
+    from services.transcription_backends import create_backend
+
+    try:
+        backend = create_backend(name)
+    except Exception as exc:
+        print(f"{name:<8} skipped: {exc}")
+        return
+
+    latencies: List[float] = []
+    errors = 0
+    first_error = ""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        nonlocal errors, first_error
+        async with limit:
+            started = time.perf_counter()
+            try:
+                await backend.transcribe(io.BytesIO(clips[index % len(clips)]), "clip.wav")
+            except Exception as exc:
+                errors += 1
+                first_error = first_error or f"{type(exc).__name__}: {exc}"
+                return
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        # One request per worker first, so model loading is not counted as latency.
+        warm_started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        warmup = time.perf_counter() - warm_started
+        latencies.clear()
+        errors = 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        backend.close()
+
+    if not latencies:
+        print(f"{name:<8} all {requests} requests failed ({first_error})")
+        return
+    print(
+        f"{backend.name:<16} n={len(latencies):<4} err={errors:<3} "
+        f"p50={statistics.median(latencies) * 1000:8.1f}ms "
+        f"p95={_percentile(latencies, 0.95) * 1000:8.1f}ms "
+        f"throughput={len(latencies) / elapsed:6.2f}/s "
+        f"warmup={warmup:5.2f}s"
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    clips = [Path(path).read_bytes() for path in args.audio] or [
+        _synthetic_clip(args.seconds + i * 0.5) for i in range(4)
+    ]
+    print(f"requests={args.requests} concurrency={args.concurrency} clips={len(clips)}")
+    for name in args.backends.split(","):
+        await _bench_backend(name.strip(), clips, args.requests, args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default="stub,local,api")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--audio", action="append", default=[], help="audio file to send (repeatable)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of the synthetic clips")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import json
 import os
 from dataclasses import dataclass
+from functools import cached_property
 
 from dotenv import load_dotenv
 
@@ -19,6 +21,16 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw.strip())
+    except ValueError:
+        return default
+
+
 def _env_bool(name: str, default: bool = False) -> bool:
     raw = os.getenv(name)
     if raw is None:
@@ -36,6 +48,54 @@ def _normalize_database_url(url: str) -> str:
     return value
 
 
+def _parse_model_limits(value: str) -> dict[str, tuple[int, int]]:
+    """Parse `model=rpm:tpm,model=rpm:tpm` into {model: (rpm, tpm)}, skipping bad entries."""
+    limits: dict[str, tuple[int, int]] = {}
+    for item in (value or "").split(","):
+        model, _, budget = item.partition("=")
+        rpm, _, tpm = budget.partition(":")
+        try:
+            limits[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            continue
+    return limits
+
+
+# Logical LLM operations -> model parameters. `model: ""` means LLM_MODEL; an empty
+# fallback_model disables SLO failover for that route.
+_DEFAULT_LLM_ROUTES: dict[str, dict] = {
+    "question": {"max_tokens": 150, "temperature": 0.3, "latency_slo_ms": 3000},
+    "followup": {"max_tokens": 150, "temperature": 0.3, "latency_slo_ms": 3000},
+    "followup_history": {"max_tokens": 150, "temperature": 0.3, "latency_slo_ms": 3000},
+    "evaluation": {"max_tokens": 400, "temperature": 0.3, "latency_slo_ms": 8000},
+    "summary": {"max_tokens": 160, "temperature": 0.2, "latency_slo_ms": 10000},
+}
+
+
+def _parse_llm_routes(value: str, default_model: str, fallback_model: str) -> dict[str, dict]:
+    """Merge LLM_ROUTES JSON overrides (per operation) onto the default routing table."""
+    try:
+        overrides = json.loads(value) if (value or "").strip() else {}
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"LLM_ROUTES is not valid JSON: {exc}") from exc
+    if not isinstance(overrides, dict) or not all(isinstance(route, dict) for route in overrides.values()):
+        raise ValueError("LLM_ROUTES must be a JSON object of {operation: {parameter: value}}")
+    routes: dict[str, dict] = {}
+    for name in set(_DEFAULT_LLM_ROUTES) | set(overrides):
+        route = {
+            "model": "",
+            "fallback_model": fallback_model,
+            "max_tokens": 150,
+            "temperature": 0.3,
+            "latency_slo_ms": 5000,
+        }
+        route.update(_DEFAULT_LLM_ROUTES.get(name, {}))
+        route.update(overrides.get(name, {}))
+        route["model"] = route["model"] or default_model
+        routes[name] = route
+    return routes
+
+
 def _split_origins(value: str) -> list[str]:
     raw = (value or "").strip()
     if not raw:
@@ -73,9 +133,95 @@ class Settings:
     daily_questions_free: int = _env_int("DAILY_QUESTIONS_FREE", 10)
     max_questions_per_interview: int = _env_int("MAX_QUESTIONS_PER_INTERVIEW", 10)
     max_ai_questions_per_interview: int = _env_int("MAX_AI_QUESTIONS_PER_INTERVIEW", 5)
+    # AI/hybrid /next: follow up on the whole conversation (rolling summary) instead of the last answer.
+    next_question_from_history: bool = _env_bool("NEXT_QUESTION_FROM_HISTORY", False)
     next_question_cooldown_seconds: int = _env_int("NEXT_QUESTION_COOLDOWN_SECONDS", 5)
     request_limit_per_minute: int = _env_int("REQUEST_LIMIT_PER_MINUTE", 10)
     max_audio_upload_bytes: int = _env_int("MAX_AUDIO_UPLOAD_BYTES", 5 * 1024 * 1024)
+    # Uploads are sniffed and rejected outside this duration range before any STT call.
+    audio_min_seconds: float = _env_float("AUDIO_MIN_SECONDS", 1.0)
+    audio_max_seconds: float = _env_float("AUDIO_MAX_SECONDS", 600.0)
+    # Trim silence and downsample to 16 kHz mono before transcription (needs numpy; ffmpeg for non-WAV).
+    audio_preprocess_enabled: bool = _env_bool("AUDIO_PREPROCESS", True)
+    audio_vad_max_pause_ms: int = _env_int("AUDIO_VAD_MAX_PAUSE_MS", 600)
+    audio_vad_padding_ms: int = _env_int("AUDIO_VAD_PADDING_MS", 150)
+    # WebSocket answers: pause that closes a segment, and the longest segment before a forced cut.
+    stream_segment_silence_ms: int = _env_int("STREAM_SEGMENT_SILENCE_MS", 500)
+    stream_max_segment_seconds: int = _env_int("STREAM_MAX_SEGMENT_SECONDS", 20)
+    # Speech-to-text: "api" (LLM provider), "local" (faster-whisper process pool) or "stub".
+    transcription_backend: str = os.getenv("TRANSCRIPTION_BACKEND", "api").strip().lower()
+    local_whisper_model: str = os.getenv("LOCAL_WHISPER_MODEL", "base.en").strip()
+    local_whisper_compute_type: str = os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8").strip()
+    local_whisper_workers: int = _env_int("LOCAL_WHISPER_WORKERS", 2)
+    local_whisper_language: str = os.getenv("LOCAL_WHISPER_LANGUAGE", "en").strip()
+    # Transcripts keyed by audio hash; TRANSCRIPT_CACHE_DIR (empty = memory only) adds a disk tier.
+    transcript_cache_size: int = _env_int("TRANSCRIPT_CACHE_SIZE", 512)
+    transcript_cache_ttl_seconds: int = _env_int("TRANSCRIPT_CACHE_TTL_SECONDS", 3600)
+    transcript_cache_dir: str = os.getenv("TRANSCRIPT_CACHE_DIR", "").strip()
+    transcript_cache_disk_entries: int = _env_int("TRANSCRIPT_CACHE_DISK_ENTRIES", 5000)
+    # Job-based /answer: worker concurrency, backlog before 503, and the local SQLite job table.
+    answer_job_workers: int = _env_int("ANSWER_JOB_WORKERS", 4)
+    answer_job_queue_limit: int = _env_int("ANSWER_JOB_QUEUE_LIMIT", 100)
+    answer_job_db_path: str = os.getenv("ANSWER_JOB_DB_PATH", "./answer_jobs.db")
+    answer_job_retention_seconds: int = _env_int("ANSWER_JOB_RETENTION_SECONDS", 3600)
+    # A running job is renewed by its process; one not renewed for this long is re-queued.
+    answer_job_lease_seconds: int = _env_int("ANSWER_JOB_LEASE_SECONDS", 120)
+    # Proctoring logs are queued in memory and appended by a background writer.
+    proctor_flush_interval_ms: int = _env_int("PROCTOR_FLUSH_INTERVAL_MS", 500)
+    proctor_flush_batch_size: int = _env_int("PROCTOR_FLUSH_BATCH_SIZE", 1000)
+    proctor_fsync_interval_ms: int = _env_int("PROCTOR_FSYNC_INTERVAL_MS", 5000)
+    proctor_max_open_files: int = _env_int("PROCTOR_MAX_OPEN_FILES", 64)
+    # A candidate's log is rotated into a compressed, session-indexed segment (gzip | zstd | none).
+    proctor_rotate_bytes: int = _env_int("PROCTOR_ROTATE_BYTES", 8 * 1024 * 1024)
+    proctor_rotate_seconds: int = _env_int("PROCTOR_ROTATE_SECONDS", 86400)
+    proctor_compression: str = os.getenv("PROCTOR_COMPRESSION", "gzip").strip().lower()
+    # Sessions whose acknowledged event sequence is remembered (least recently used dropped).
+    proctor_tracked_sessions: int = _env_int("PROCTOR_TRACKED_SESSIONS", 10000)
+    # Exact duplicates of any of a session's last N events are dropped at ingest.
+    proctor_dedup_window: int = _env_int("PROCTOR_DEDUP_WINDOW", 256)
+    # /proctor/ws: server-side batch window and size; acks ask clients to back off while
+    # more than PROCTOR_WS_HIGH_WATER records wait for the log writer.
+    proctor_ws_batch_ms: int = _env_int("PROCTOR_WS_BATCH_MS", 250)
+    proctor_ws_batch_events: int = _env_int("PROCTOR_WS_BATCH_EVENTS", 200)
+    proctor_ws_high_water: int = _env_int("PROCTOR_WS_HIGH_WATER", 5000)
+    proctor_ws_backoff_ms: int = _env_int("PROCTOR_WS_BACKOFF_MS", 1000)
+    # Also index proctoring sessions/events in the database for admin queries.
+    proctor_db_store: bool = _env_bool("PROCTOR_DB_STORE", True)
+    # Token usage is buffered in memory and written in batches.
+    usage_flush_interval_ms: int = _env_int("USAGE_FLUSH_INTERVAL_MS", 1000)
+    usage_flush_batch_size: int = _env_int("USAGE_FLUSH_BATCH_SIZE", 500)
+    # LLM provider: "openai" for production, "stub" for offline load tests and profiling.
+    llm_provider: str = os.getenv("LLM_PROVIDER", "openai").strip().lower()
+    llm_model: str = os.getenv("LLM_MODEL", "gpt-4o-mini").strip()
+    # Per-operation routing table overrides (JSON) and SLO failover behaviour.
+    llm_routes_raw: str = os.getenv("LLM_ROUTES", "")
+    llm_fallback_model: str = os.getenv("LLM_FALLBACK_MODEL", "").strip()
+    llm_route_min_samples: int = _env_int("LLM_ROUTE_MIN_SAMPLES", 20)
+    llm_route_failover_seconds: int = _env_int("LLM_ROUTE_FAILOVER_SECONDS", 120)
+    stub_llm_latency_ms: int = _env_int("STUB_LLM_LATENCY_MS", 400)
+    stub_llm_latency_jitter_ms: int = _env_int("STUB_LLM_LATENCY_JITTER_MS", 100)
+    stub_llm_tokens_mean: int = _env_int("STUB_LLM_TOKENS_MEAN", 250)
+    stub_llm_tokens_stddev: int = _env_int("STUB_LLM_TOKENS_STDDEV", 60)
+    stub_llm_seed: int = _env_int("STUB_LLM_SEED", 0)
+    # LLM scheduler budgets (per model) and admission control.
+    llm_default_rpm: int = _env_int("LLM_DEFAULT_RPM", 500)
+    llm_default_tpm: int = _env_int("LLM_DEFAULT_TPM", 200_000)
+    llm_model_limits_raw: str = os.getenv("LLM_MODEL_LIMITS", "")
+    llm_queue_limit: int = _env_int("LLM_QUEUE_LIMIT", 200)
+    # Threads for blocking provider calls (and stream reads), apart from the default executor.
+    llm_max_concurrency: int = _env_int("LLM_MAX_CONCURRENCY", 32)
+    llm_live_deadline_seconds: int = _env_int("LLM_LIVE_DEADLINE_SECONDS", 10)
+    llm_prefetch_deadline_seconds: int = _env_int("LLM_PREFETCH_DEADLINE_SECONDS", 30)
+    llm_batch_deadline_seconds: int = _env_int("LLM_BATCH_DEADLINE_SECONDS", 120)
+    # LLM resilience: per-operation deadlines, circuit breaker, optional hedging.
+    llm_question_timeout_seconds: float = _env_float("LLM_QUESTION_TIMEOUT_SECONDS", 8.0)
+    llm_evaluation_timeout_seconds: float = _env_float("LLM_EVALUATION_TIMEOUT_SECONDS", 20.0)
+    llm_breaker_error_rate: float = _env_float("LLM_BREAKER_ERROR_RATE", 0.5)
+    llm_breaker_min_calls: int = _env_int("LLM_BREAKER_MIN_CALLS", 5)
+    llm_breaker_window_seconds: int = _env_int("LLM_BREAKER_WINDOW_SECONDS", 60)
+    llm_breaker_open_seconds: int = _env_int("LLM_BREAKER_OPEN_SECONDS", 30)
+    # 0 disables hedging; otherwise a duplicate question request fires after this delay.
+    llm_hedge_delay_ms: int = _env_int("LLM_HEDGE_DELAY_MS", 0)
     # Default off: local/dev and non-Chromium UAs often fail platform detection; enable in prod via env.
     windows_browser_only: bool = _env_bool("WINDOWS_BROWSER_ONLY", False)
 
@@ -83,6 +229,19 @@ class Settings:
     def allowed_origins(self) -> list[str]:
         return _split_origins(self.allowed_origins_raw)
 
+    def __post_init__(self) -> None:
+        # Parsed once here so a bad LLM_ROUTES fails at startup, not on the first LLM call.
+        self.llm_routes
+        self.llm_model_limits
+
+    @cached_property
+    def llm_routes(self) -> dict[str, dict]:
+        return _parse_llm_routes(self.llm_routes_raw, self.llm_model, self.llm_fallback_model)
+
+    @cached_property
+    def llm_model_limits(self) -> dict[str, tuple[int, int]]:
+        return _parse_model_limits(self.llm_model_limits_raw)
+
 
 settings = Settings()
 
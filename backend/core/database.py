@@ -3,7 +3,7 @@ from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Iterator
 
-from sqlalchemy import DateTime, Integer, String, Text, create_engine, text
+from sqlalchemy import Boolean, DateTime, Float, Index, Integer, String, Text, create_engine, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
 
 from core.config import settings
@@ -105,6 +105,84 @@ class RequestLog(Base):
     timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
 
+class ProctoringSessionRecord(Base):
+    """Latest proctoring state per interview session (one row, updated on each ingest)."""
+
+    __tablename__ = "proctoring_sessions"
+    session_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    candidate_id: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    role: Mapped[str] = mapped_column(String(120), nullable=False)
+    difficulty: Mapped[str] = mapped_column(String(24), nullable=False)
+    mode: Mapped[str] = mapped_column(String(24), nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    violations: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    terminated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, index=True)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class ProctoringEventRecord(Base):
+    """One stored (possibly run-length compacted) proctoring event."""
+
+    __tablename__ = "proctoring_events"
+    __table_args__ = (
+        Index("ix_proctoring_events_session_seq", "session_id", "seq"),
+        Index("ix_proctoring_events_candidate_time", "candidate_id", "occurred_at"),
+        Index("ix_proctoring_events_type_time", "type", "occurred_at"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    session_id: Mapped[str] = mapped_column(String(128), nullable=False)
+    candidate_id: Mapped[str] = mapped_column(String(128), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Client timestamp as sent, plus its parsed form for range queries (NULL if unparseable).
+    timestamp: Mapped[str] = mapped_column(String(64), nullable=False)
+    occurred_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    type: Mapped[str] = mapped_column(String(64), nullable=False)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+    counted: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    last_ts: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    metadata_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ProctoringSessionStats(Base):
+    """Running violation counters per proctoring session, updated on each store flush."""
+
+    __tablename__ = "proctoring_session_stats"
+    session_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    candidate_id: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    first_event_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_event_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    first_violation_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    counted_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    uncounted_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    terminated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # {type: {"counted", "uncounted", "first_at", "last_at"}}
+    type_counts_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ProctoringDailyStats(Base):
+    """Running proctoring counters per UTC day, updated on each store flush."""
+
+    __tablename__ = "proctoring_daily_stats"
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)
+    # Session counters are attributed to the day the session started.
+    sessions_started: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sessions_terminated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sessions_with_violation: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_violation_seconds_total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    # Event counters are attributed to the day the event happened.
+    counted_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    uncounted_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # {type: {"counted", "uncounted"}}
+    type_counts_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
 @contextmanager
 def get_db() -> Iterator[Session]:
     db = SessionLocal()
@@ -1,18 +1,103 @@
 import logging
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from api.admin.routes import router as admin_router
 from api.candidate.routes import router as candidate_router
 from core.config import settings
 from core.database import init_db
+from services.answer_jobs import answer_jobs
+from services.llm_scheduler import llm_scheduler
+from services.proctoring_sink import proctoring_sink
+from services.proctoring_store import proctoring_store
+from services.speech_service import sweep_tmp_uploads
+from services.transcript_cache import transcript_cache
+from services.transcription_backends import close_transcription_backend, get_transcription_backend
+from services.usage_ledger import usage_ledger
 from services.usage_service import record_request
 
 logger = logging.getLogger(__name__)
 
+# Multipart endpoints that carry an audio file; their bodies are size-capped before parsing.
+AUDIO_UPLOAD_PATHS = {
+    "/api/interview/answer",
+    "/api/interview/answer/stream",
+    "/api/interview/answer/jobs",
+    "/api/interview/turn",
+}
+# Room for multipart boundaries and the small form fields sent alongside the audio.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it instead of reporting a 400.
+    def __init__(self) -> None:
+        max_mb = settings.max_audio_upload_bytes / (1024 * 1024)
+        super().__init__(status_code=413, detail=f"Audio file too large. Max allowed size is {max_mb:g}MB.")
+
+
+class AudioUploadLimitMiddleware:
+    """
+    Reject oversized audio uploads before FastAPI parses the multipart body.
+
+    A declared Content-Length over the limit is refused without reading the body;
+    otherwise bytes are counted as they arrive and the request is aborted with 413
+    as soon as the limit is crossed, so chunked uploads cannot stream past it.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in AUDIO_UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.max_audio_upload_bytes + MULTIPART_OVERHEAD_BYTES
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        if declared > limit:
+            await _payload_too_large(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await _payload_too_large(scope, receive, send)
+
+
+async def _payload_too_large(scope: Scope, receive: Receive, send: Send) -> None:
+    error = _BodyTooLarge()
+    response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+    await response(scope, receive, send)
+
 
 def create_app() -> FastAPI:
     # Load environment variables from .env file if present
@@ -24,6 +109,9 @@ def create_app() -> FastAPI:
 
     app = FastAPI(title="AI Interviewer API", version="1.0.0")
 
+    # Added before CORS so it sits inside it and 413 responses still carry CORS headers.
+    app.add_middleware(AudioUploadLimitMiddleware)
+
     app.add_middleware(
         CORSMiddleware,
         # Restrict CORS to configured frontend origins in production.
@@ -65,6 +153,32 @@ def create_app() -> FastAPI:
                 "Check DATABASE_URL in your environment variables.",
                 exc,
             )
+        sweep_tmp_uploads()
+        transcript_cache.prune_disk()
+        usage_ledger.start()
+        proctoring_sink.start()
+        proctoring_store.start()
+        try:
+            # Local engines load their model here rather than on the first answer.
+            get_transcription_backend().start()
+        except Exception as exc:
+            logger.error("Transcription backend unavailable: %s", exc)
+
+    @app.on_event("startup")
+    async def _start_answer_jobs():
+        # Re-queues jobs left unfinished by the previous process.
+        await answer_jobs.start()
+
+    @app.on_event("shutdown")
+    async def _shutdown():
+        await answer_jobs.stop()
+        # Write buffered token usage before the process exits.
+        await usage_ledger.stop()
+        # Queued proctoring records are written and fsynced before exit.
+        await proctoring_sink.stop()
+        await proctoring_store.stop()
+        close_transcription_backend()
+        llm_scheduler.shutdown()
 
     return app
 
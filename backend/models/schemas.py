@@ -1,4 +1,5 @@
-from typing import List, Literal
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -34,6 +35,13 @@ class AnswerResponse(BaseModel):
     evaluation: Evaluation
 
 
+class AnswerJobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    result: Optional[AnswerResponse] = None
+    detail: Optional[str] = None
+
+
 class QuestionCreate(BaseModel):
     company: str = Field(default="General", min_length=2)
     role: str = Field(..., min_length=2)
@@ -71,6 +79,14 @@ class InterviewNextResponse(BaseModel):
     question_index: int
 
 
+class InterviewTurnResponse(BaseModel):
+    transcript: str
+    evaluation: Evaluation
+    # For an empty transcript the session is not advanced: this is the same question and
+    # index again, with source "retry", so the candidate can answer it once more.
+    next_question: Optional[InterviewNextResponse] = None
+
+
 class ProctoringEvent(BaseModel):
     timestamp: str
     type: str
@@ -88,13 +104,70 @@ class ProctoringLogRequest(BaseModel):
     status: str = Field(..., min_length=2)
     violations: int = Field(..., ge=0)
     terminated: bool = False
+    # Sequence number of events[0] within the session; omitted = `events` is the full list so far.
+    seq_start: Optional[int] = Field(None, ge=0)
     events: List[ProctoringEvent] = Field(default_factory=list)
 
 
 class ProctoringLogResponse(BaseModel):
     ok: bool = True
     log_file: str
+    # Event records written after compaction (same as records_written).
     events_stored: int
+    # Events [0, acked_seq) are stored; send the next batch with seq_start=acked_seq.
+    acked_seq: int = 0
+    # Events below the previous acked_seq, already received.
+    duplicates_skipped: int = 0
+    # New events in this batch, and what compaction made of them.
+    events_accepted: int = 0
+    exact_duplicates_dropped: int = 0
+    runs_collapsed: int = 0
+    records_written: int = 0
+
+
+class ProctoringSessionItem(BaseModel):
+    session_id: str
+    candidate_id: str
+    role: str
+    difficulty: str
+    mode: str
+    status: str
+    violations: int
+    terminated: bool
+    event_count: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProctoringSessionPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[ProctoringSessionItem]
+
+
+class ProctoringEventItem(BaseModel):
+    seq: int
+    timestamp: str
+    type: str
+    message: str
+    counted: bool
+    count: int = 1
+    last_ts: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    received_at: datetime
+
+
+class ProctoringEventPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[ProctoringEventItem]
+
+
+class ProctoringAggregateResponse(BaseModel):
+    group_by: Literal["type", "day", "status"]
+    buckets: List[Dict[str, Any]]
 
 
 class AdminOtpRequest(BaseModel):
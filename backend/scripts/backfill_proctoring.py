@@ -0,0 +1,92 @@
+"""
+One-time import of existing proctoring JSONL logs into the proctoring_sessions and
+proctoring_events tables:
+
+    cd backend
+    python -m scripts.backfill_proctoring --dry-run
+    python -m scripts.backfill_proctoring
+
+Reads flat pre-sharding files, rotated segments and active files alike. Records
+written before sequence numbers existed carry the whole event list so far, so
+only the events past the ones already seen for that session are imported.
+
+Each flush commits whole records, and a session's stored event_count is the sequence
+number its next record starts at. A re-run skips every record below that point, so an
+interrupted import resumes where it stopped instead of leaving sessions partial.
+"""
+import argparse
+from pathlib import Path
+from typing import Dict
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.database import ProctoringSessionRecord, get_db, init_db
+from services.proctoring_segments import iter_records
+from services.proctoring_sink import LOGS_DIR
+from services.proctoring_store import ProctoringStore
+
+
+def _run(args: argparse.Namespace) -> None:
+    logs_dir = Path(args.logs_dir)
+    init_db()
+    with get_db() as db:
+        # Client events stored per session, i.e. where each session's import resumes.
+        resume = dict(db.execute(select(ProctoringSessionRecord.session_id, ProctoringSessionRecord.event_count)).all())
+
+    store = ProctoringStore()
+    seen: Dict[str, int] = {}
+    totals = {"records": 0, "malformed": 0, "skipped_records": 0, "events": 0}
+    resumed: set[str] = set()
+    imported: set[str] = set()
+    pending = 0
+    for record in iter_records(logs_dir):
+        totals["records"] += 1
+        if not record.get("session_id") or not record.get("candidate_id"):
+            totals["malformed"] += 1
+            continue
+        session_id = record["session_id"]
+        events = record.get("events") or []
+        if "seq_start" not in record:
+            # Legacy line: the full list so far; keep only what this session has not imported yet.
+            start = seen.get(session_id, 0)
+            record = {**record, "seq_start": start, "seq_count": max(0, len(events) - start), "events": events[start:]}
+            seen[session_id] = max(start, len(events))
+        if int(record["seq_start"]) < resume.get(session_id, 0):
+            # Imported by an earlier run; records are committed whole, never in part.
+            totals["skipped_records"] += 1
+            resumed.add(session_id)
+            continue
+        totals["events"] += len(record["events"])
+        imported.add(session_id)
+        if args.dry_run:
+            continue
+        store.record(record)
+        pending += len(record["events"])
+        if pending >= args.batch_size:
+            store.flush()
+            pending = 0
+    if not args.dry_run:
+        store.flush()
+    stats = store.stats()
+    print(
+        f"{'dry run: ' if args.dry_run else ''}records={totals['records']} "
+        f"malformed={totals['malformed']} skipped_records={totals['skipped_records']} "
+        f"resumed_sessions={len(resumed & imported)} sessions={len(imported)} events={totals['events']} "
+        f"flush_failures={stats['flush_failures']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logs-dir", default=str(LOGS_DIR))
+    parser.add_argument("--batch-size", type=int, default=1000, help="event rows per insert")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be imported without writing")
+    args = parser.parse_args()
+    if not settings.proctor_db_store and not args.dry_run:
+        parser.error("PROCTOR_DB_STORE is disabled; enable it before importing")
+    _run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+import asyncio
+import io
+import json
+import logging
+import math
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+from services.openai_service import evaluate_answer
+from services.speech_service import transcribe_file
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TERMINAL = (DONE, FAILED)
+
+# Finished jobs are purged after this many completions (and at startup).
+_PURGE_EVERY_JOBS = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answer_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    question TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    filename TEXT NOT NULL,
+    audio BLOB,
+    result TEXT,
+    error TEXT,
+    status_code INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    lease_until REAL
+)
+"""
+
+# Added after the first release; older tables get them on startup.
+_LEASE_COLUMNS = {"owner": "TEXT", "lease_until": "REAL"}
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    path = Path(settings.answer_job_db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class AnswerJobQueue:
+    """
+    Background /answer processing: transcription then evaluation, off the request path.
+
+    Jobs (including the audio, as a BLOB) are stored in a local SQLite table before the
+    upload returns, so a restart re-queues anything queued or interrupted mid-run. A running
+    job holds a lease (owner + expiry) that its process renews; processes sharing the table
+    only take over running jobs whose lease has lapsed, i.e. whose owner has gone away. At
+    most ANSWER_JOB_WORKERS jobs run at once; submissions beyond ANSWER_JOB_QUEUE_LIMIT
+    outstanding jobs are rejected with 503 and a Retry-After estimated from recent job times.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue | None = None
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: asyncio.Task | None = None
+        self._owner = uuid4().hex
+        self._starting: asyncio.Future | None = None
+        # Long-poll waiters per job, each with its own event so it can deregister itself.
+        self._waiters: Dict[str, List[asyncio.Event]] = {}
+        self._outstanding = 0
+        # Moving average of job duration, used for Retry-After.
+        self._avg_seconds = 5.0
+        # Jobs finished since the last purge of old rows.
+        self._finished_since_purge = 0
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "recovered": 0}
+
+    async def start(self) -> None:
+        # Shared so concurrent first requests do not each spawn a worker pool.
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        try:
+            await asyncio.shield(self._starting)
+        except Exception:
+            self._starting = None
+            raise
+
+    async def _start(self) -> None:
+        self._queue = asyncio.Queue()
+        recovered = await asyncio.to_thread(self._recover)
+        for job_id in recovered:
+            self._queue.put_nowait(job_id)
+        self._outstanding = len(recovered)
+        self._stats["recovered"] += len(recovered)
+        if recovered:
+            logger.info("re-queued %s unfinished answer job(s)", len(recovered))
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(max(1, settings.answer_job_workers))
+        ]
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self) -> None:
+        tasks = [*self._workers, *([self._sweeper] if self._sweeper else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sweeper = None
+        self._starting = None
+        # Interrupted jobs go back to 'queued' now rather than waiting for their lease to lapse.
+        try:
+            await asyncio.to_thread(self._release)
+        except Exception:
+            logger.exception("failed to release running answer jobs")
+
+    async def submit(self, audio: bytes, filename: str, question: str, user_id: str) -> str:
+        await self.start()
+        if self._outstanding >= settings.answer_job_queue_limit:
+            self._stats["rejected"] += 1
+            retry_after = self._avg_seconds * self._outstanding / max(1, settings.answer_job_workers)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many answers are being processed. Please retry shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+        job_id = uuid4().hex
+        # Counted before the insert so concurrent submits cannot overshoot the limit.
+        self._outstanding += 1
+        try:
+            await asyncio.to_thread(self._insert, job_id, audio, filename, question, user_id)
+        except Exception:
+            self._outstanding -= 1
+            raise
+        self._stats["submitted"] += 1
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Dict[str, Any] | None:
+        await self.start()
+        return await asyncio.to_thread(self._load, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Dict[str, Any] | None:
+        """Long-poll: return once the job finishes or `timeout` elapses, whichever is first."""
+        if timeout <= 0:
+            return await self.get(job_id)
+        # Registered before the status read, so a job finishing in between still wakes us.
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, []).append(event)
+        try:
+            job = await self.get(job_id)
+            if job is None or job["status"] in TERMINAL:
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await self.get(job_id)
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None and event in waiters:
+                waiters.remove(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "outstanding": self._outstanding,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._workers),
+            "avg_job_seconds": round(self._avg_seconds, 2),
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            started = time.monotonic()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("answer job crashed job_id=%s", job_id)
+            finally:
+                self._outstanding = max(0, self._outstanding - 1)
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+                for event in self._waiters.pop(job_id, []):
+                    event.set()
+                self._queue.task_done()
+            if self._finished_since_purge >= _PURGE_EVERY_JOBS:
+                self._finished_since_purge = 0
+                await asyncio.to_thread(self._purge)
+
+    async def _sweep(self) -> None:
+        # Picks up jobs whose owner died while this process keeps running.
+        interval = max(1, settings.answer_job_lease_seconds)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                expired = await asyncio.to_thread(self._requeue_expired)
+            except Exception:
+                logger.exception("answer job lease sweep failed")
+                continue
+            for job_id in expired:
+                self._outstanding += 1
+                self._queue.put_nowait(job_id)
+            if expired:
+                self._stats["recovered"] += len(expired)
+                logger.info("re-queued %s answer job(s) with an expired lease", len(expired))
+
+    async def _renew(self, job_id: str) -> None:
+        interval = max(1, settings.answer_job_lease_seconds) / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._extend_lease, job_id)
+            except Exception:
+                logger.warning("failed to renew answer job lease job_id=%s", job_id, exc_info=True)
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return
+        renew = asyncio.create_task(self._renew(job_id))
+        try:
+            await self._process(job_id, job)
+        finally:
+            renew.cancel()
+
+    async def _process(self, job_id: str, job: Dict[str, Any]) -> None:
+        try:
+            transcript = await transcribe_file(
+                io.BytesIO(job["audio"] or b""),
+                job["filename"],
+                settings.max_audio_upload_bytes,
+            )
+            evaluation = await evaluate_answer(
+                answer=transcript,
+                question=job["question"],
+                user_id=job["user_id"] or None,
+            )
+        except HTTPException as exc:
+            self._stats["failed"] += 1
+            self._finished_since_purge += 1
+            await asyncio.to_thread(self._finish, job_id, FAILED, None, str(exc.detail), exc.status_code)
+            return
+        except Exception as exc:
+            self._stats["failed"] += 1
+            self._finished_since_purge += 1
+            logger.exception("answer job failed job_id=%s", job_id)
+            await asyncio.to_thread(
+                self._finish, job_id, FAILED, None, f"Failed to process answer: {exc}", 500
+            )
+            return
+        self._stats["completed"] += 1
+        self._finished_since_purge += 1
+        result = {"transcript": transcript, "evaluation": evaluation}
+        await asyncio.to_thread(self._finish, job_id, DONE, json.dumps(result), None, 200)
+
+    # --- SQLite access (always called from a worker thread) ---
+
+    def _recover(self) -> List[str]:
+        with _connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(answer_jobs)")}
+            for name, kind in _LEASE_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE answer_jobs ADD COLUMN {name} {kind}")
+            # Only jobs nobody is renewing; another live process may still be running the rest.
+            conn.execute(
+                "UPDATE answer_jobs SET status = ?, owner = NULL, updated_at = ?"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, time.time(), RUNNING, time.time()),
+            )
+            rows = conn.execute(
+                "SELECT id FROM answer_jobs WHERE status = ? ORDER BY created_at",
+                (QUEUED,),
+            ).fetchall()
+        self._purge()
+        return [row["id"] for row in rows]
+
+    def _requeue_expired(self) -> List[str]:
+        # Marked with a one-off token inside the same transaction, so only this sweep sees them.
+        token = f"requeue:{uuid4().hex}"
+        now = time.time()
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE answer_jobs SET status = ?, owner = ?, updated_at = ?"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, token, now, RUNNING, now),
+            )
+            rows = conn.execute(
+                "SELECT id FROM answer_jobs WHERE owner = ? ORDER BY created_at", (token,)
+            ).fetchall()
+            conn.execute("UPDATE answer_jobs SET owner = NULL WHERE owner = ?", (token,))
+        return [row["id"] for row in rows]
+
+    def _release(self) -> None:
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE answer_jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE status = ? AND owner = ?",
+                (QUEUED, time.time(), RUNNING, self._owner),
+            )
+
+    def _extend_lease(self, job_id: str) -> None:
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE answer_jobs SET lease_until = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time() + settings.answer_job_lease_seconds, job_id, RUNNING, self._owner),
+            )
+
+    def _insert(self, job_id: str, audio: bytes, filename: str, question: str, user_id: str) -> None:
+        now = time.time()
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO answer_jobs (id, status, question, user_id, filename, audio, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, question, user_id, filename, sqlite3.Binary(audio), now, now),
+            )
+
+    def _claim(self, job_id: str) -> Dict[str, Any] | None:
+        with _connect() as conn:
+            now = time.time()
+            claimed = conn.execute(
+                "UPDATE answer_jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                (RUNNING, self._owner, now + settings.answer_job_lease_seconds, now, job_id, QUEUED),
+            ).rowcount
+            if not claimed:
+                return None
+            row = conn.execute(
+                "SELECT question, user_id, filename, audio FROM answer_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _finish(
+        self,
+        job_id: str,
+        job_status: str,
+        result: str | None,
+        error: str | None,
+        status_code: int,
+    ) -> None:
+        # The audio is no longer needed once the job has an outcome.
+        with _connect() as conn:
+            finished = conn.execute(
+                "UPDATE answer_jobs SET status = ?, result = ?, error = ?, status_code = ?, audio = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (job_status, result, error, status_code, time.time(), job_id, RUNNING, self._owner),
+            ).rowcount
+        if not finished:
+            # Our lease lapsed and another process took the job over; its outcome wins.
+            logger.warning("answer job lease lost before finishing job_id=%s", job_id)
+
+    def _load(self, job_id: str) -> Dict[str, Any] | None:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, result, error, status_code FROM answer_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "detail": row["error"],
+            "status_code": row["status_code"],
+        }
+
+    def _purge(self) -> None:
+        cutoff = time.time() - settings.answer_job_retention_seconds
+        with _connect() as conn:
+            conn.execute(
+                "DELETE FROM answer_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
+
+
+answer_jobs = AnswerJobQueue()
@@ -0,0 +1,122 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Answers made only of these phrases are treated as a non-attempt.
+_NON_ANSWER_PHRASES = {
+    "i don't know",
+    "i dont know",
+    "i do not know",
+    "don't know",
+    "dont know",
+    "no idea",
+    "i have no idea",
+    "not sure",
+    "i'm not sure",
+    "im not sure",
+    "i am not sure",
+    "i can't answer",
+    "i cannot answer",
+    "pass",
+    "skip",
+    "next",
+    "next question",
+    "no",
+    "nothing",
+}
+
+# Text Whisper commonly produces for silence or background noise.
+_SILENCE_HALLUCINATIONS = {
+    "you",
+    "thank you",
+    "thanks",
+    "thank you for watching",
+    "thanks for watching",
+    "please subscribe",
+    "bye",
+    "okay",
+    "ok",
+    "hmm",
+    "um",
+    "uh",
+    "music",
+    "subtitles by the amara org community",
+}
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "so", "to", "of", "in", "on", "at", "for",
+    "with", "by", "from", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that",
+    "i", "you", "we", "they", "he", "she", "my", "your", "me", "um", "uh", "like", "just",
+    "well", "yeah", "yes", "okay", "ok", "do", "does", "did", "would", "could", "can", "will",
+    "what", "how", "why", "when", "which", "about", "think", "know",
+}
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+_stats: Counter = Counter()
+
+_REASONS = {
+    "empty": "No answer was captured.",
+    "non_answer": "The candidate did not attempt the question.",
+    "silence": "The recording contained no meaningful speech.",
+    "too_short": "The answer is too short to demonstrate understanding.",
+}
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def screen_reason(answer: str, question: str) -> Optional[str]:
+    """Return why `answer` is an obvious fail, or None if it needs a real evaluation."""
+    words = _words(answer)
+    if not words:
+        return "empty"
+    normalized = " ".join(words)
+    if len(words) == 1:
+        # A one-word answer that names something from the question may be right.
+        if normalized in {word for word in _words(question) if word not in _STOPWORDS}:
+            return None
+        if normalized in _SILENCE_HALLUCINATIONS:
+            return "silence"
+        if normalized in _NON_ANSWER_PHRASES:
+            return "non_answer"
+        return "too_short"
+    # Longer answers are only screened when they are a known filler phrase as a whole.
+    if normalized in _SILENCE_HALLUCINATIONS:
+        return "silence"
+    if normalized in _NON_ANSWER_PHRASES:
+        return "non_answer"
+    return None
+
+
+def prescreen_answer(answer: str, question: str) -> Optional[Dict[str, Any]]:
+    """
+    Cheap local checks run before the LLM evaluation.
+
+    Returns a canned failing evaluation for empty answers, whole-answer filler phrases
+    (silence transcripts, "I don't know") and one-word answers that share no content
+    word with the question; otherwise None and the caller evaluates normally. Short
+    answers of two or more words, such as "binary search tree", always go to the LLM.
+    """
+    _stats["screened"] += 1
+    reason = screen_reason(answer, question)
+    if reason is None:
+        _stats["passed_to_llm"] += 1
+        return None
+    _stats["llm_calls_saved"] += 1
+    _stats[f"reason_{reason}"] += 1
+    weakness = _REASONS[reason]
+    return {
+        "score": 0,
+        "confidence": 90,
+        "strengths": [],
+        "weaknesses": [weakness],
+        "improvements": ["Give a structured answer: state the approach, explain trade-offs, and add an example."],
+        "verdict": "fail",
+        "feedback": f"{weakness} The answer could not be credited.",
+    }
+
+
+def get_prescreen_stats() -> Dict[str, int]:
+    return dict(_stats)
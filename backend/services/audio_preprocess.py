@@ -0,0 +1,269 @@
+"""
+Audio preprocessing before speech-to-text.
+
+Decodes the upload to PCM, trims leading/trailing silence and shortens long pauses
+with an energy-based voice activity detector, and re-encodes as 16 kHz mono 16-bit
+WAV. Whisper bills by duration, so every second removed here is a second not paid for.
+
+WAV is decoded with the standard library; other containers (WebM/Ogg/MP3/M4A) need
+ffmpeg on PATH. Without NumPy, or when the input cannot be decoded, the original
+bytes are passed through untouched.
+
+Try it on a file:  python -m services.audio_preprocess test_tone.wav --out trimmed.wav
+"""
+
+import argparse
+import io
+import logging
+import shutil
+import subprocess
+import wave
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16_000
+_FRAME_MS = 30
+# A frame is voiced when its RMS clears both the absolute floor and a multiple of the noise floor.
+_ABS_THRESHOLD = 0.01
+_NOISE_MULTIPLIER = 3.0
+_NOISE_PERCENTILE = 10
+_FFMPEG_TIMEOUT_SECONDS = 30
+# Anti-aliasing filter for downsampling: taps per unit of decimation ratio, and the
+# pass band as a fraction of the target Nyquist frequency.
+_LOWPASS_TAPS_PER_RATIO = 32
+_LOWPASS_CUTOFF = 0.9
+
+_stats: Counter = Counter()
+
+
+@dataclass
+class PreprocessResult:
+    data: bytes
+    filename: str
+    applied: bool
+    reason: str = ""
+    original_bytes: int = 0
+    original_seconds: float = 0.0
+    output_seconds: float = 0.0
+    # False when the detector found no speech at all.
+    has_speech: bool = True
+
+    @property
+    def output_bytes(self) -> int:
+        # Not necessarily smaller: compressed WebM/MP3 grows when decoded to WAV.
+        return len(self.data)
+
+    @property
+    def seconds_saved(self) -> float:
+        return round(self.original_seconds - self.output_seconds, 3) if self.applied else 0.0
+
+
+def can_preprocess(filename: str) -> bool:
+    """Cheap check made before the upload is read, so undecodable formats keep the zero-copy path."""
+    if np is None or not settings.audio_preprocess_enabled:
+        return False
+    return Path(filename).suffix.lower() == ".wav" or shutil.which("ffmpeg") is not None
+
+
+def preprocess_audio(data: bytes, filename: str) -> PreprocessResult:
+    """Trim and downsample `data`; on any decoding problem return it unchanged with `applied=False`."""
+    if np is None:
+        return _skipped(data, filename, "numpy_missing")
+    decoded = _decode(data)
+    if decoded is None:
+        return _skipped(data, filename, "undecodable")
+    samples, rate = decoded
+    original_seconds = len(samples) / rate if rate else 0.0
+    samples = _resample(samples, rate, TARGET_SAMPLE_RATE)
+    voiced = _trim_silence(samples, TARGET_SAMPLE_RATE)
+
+    result = PreprocessResult(
+        data=_encode_wav(voiced, TARGET_SAMPLE_RATE),
+        filename=f"{Path(filename).stem or 'audio'}.wav",
+        applied=True,
+        original_bytes=len(data),
+        original_seconds=round(original_seconds, 3),
+        output_seconds=round(len(voiced) / TARGET_SAMPLE_RATE, 3),
+        has_speech=len(voiced) > 0,
+    )
+    _stats["processed"] += 1
+    _stats["bytes_in"] += result.original_bytes
+    _stats["bytes_out"] += result.output_bytes
+    _stats["milliseconds_saved"] += int(result.seconds_saved * 1000)
+    if not result.has_speech:
+        _stats["no_speech"] += 1
+    return result
+
+
+def _skipped(data: bytes, filename: str, reason: str) -> PreprocessResult:
+    _stats[f"skipped_{reason}"] += 1
+    return PreprocessResult(data=data, filename=filename, applied=False, reason=reason, original_bytes=len(data))
+
+
+def _decode(data: bytes) -> Tuple["np.ndarray", int] | None:
+    """Return mono float32 samples in [-1, 1] and their sample rate."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        decoded = _decode_wav(data)
+        if decoded is not None:
+            return decoded
+    return _decode_ffmpeg(data)
+
+
+def _decode_wav(data: bytes) -> Tuple["np.ndarray", int] | None:
+    try:
+        with wave.open(io.BytesIO(data), "rb") as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        # 8-bit WAV is unsigned.
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+    return _downmix(samples, channels), rate
+
+
+def _decode_ffmpeg(data: bytes) -> Tuple["np.ndarray", int] | None:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    command = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "pipe:1",
+    ]
+    try:
+        completed = subprocess.run(command, input=data, capture_output=True, timeout=_FFMPEG_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        logger.warning("ffmpeg decode failed: %s", exc)
+        return None
+    if completed.returncode != 0 or not completed.stdout:
+        return None
+    return np.frombuffer(completed.stdout, dtype="<i2").astype(np.float32) / 32768.0, TARGET_SAMPLE_RATE
+
+
+def _downmix(samples: "np.ndarray", channels: int) -> "np.ndarray":
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+
+def _resample(samples: "np.ndarray", rate: int, target: int) -> "np.ndarray":
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate > target:
+        # Remove content above the target Nyquist first, or it folds back into the speech band.
+        samples = _lowpass(samples, _LOWPASS_CUTOFF * target / 2 / rate, int(_LOWPASS_TAPS_PER_RATIO * rate / target))
+    # Linear interpolation is plenty for speech recognition input once it is band-limited.
+    duration = len(samples) / rate
+    target_len = max(1, int(round(duration * target)))
+    positions = np.linspace(0, len(samples) - 1, target_len)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _lowpass(samples: "np.ndarray", cutoff: float, half_width: int) -> "np.ndarray":
+    """Blackman-windowed sinc FIR; `cutoff` is in cycles per sample (0.5 = Nyquist)."""
+    offsets = np.arange(-half_width, half_width + 1)
+    taps = 2 * cutoff * np.sinc(2 * cutoff * offsets) * np.blackman(len(offsets))
+    taps /= taps.sum()
+    return np.convolve(samples, taps.astype(np.float32), mode="same").astype(np.float32)
+
+
+def voiced_frames(samples: "np.ndarray", rate: int) -> Tuple["np.ndarray", int]:
+    """Per-frame voice activity mask (with padding applied) and the frame length in samples."""
+    frame = max(1, rate * _FRAME_MS // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=bool), frame
+    frames = samples[: count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    noise = float(np.percentile(rms, _NOISE_PERCENTILE)) * _NOISE_MULTIPLIER
+    # Capped at half the peak so recordings without quiet frames (a steady tone) stay voiced.
+    threshold = max(_ABS_THRESHOLD, min(noise, 0.5 * float(rms.max())))
+    mask = rms >= threshold
+    pad = settings.audio_vad_padding_ms // _FRAME_MS
+    if pad > 0 and mask.any():
+        # Keep a little context around speech so word onsets and tails are not clipped.
+        mask = np.convolve(mask.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+    return mask, frame
+
+
+def _trim_silence(samples: "np.ndarray", rate: int) -> "np.ndarray":
+    mask, frame = voiced_frames(samples, rate)
+    if not mask.any():
+        return samples[:0]
+    # Shorten pauses: keep only the first max_pause silent frames after each voiced frame.
+    max_pause = max(0, settings.audio_vad_max_pause_ms // _FRAME_MS)
+    position = np.arange(len(mask))
+    last_voiced = np.maximum.accumulate(np.where(mask, position, -1))
+    keep = mask | (position - last_voiced <= max_pause)
+    # Leading and trailing silence goes entirely.
+    voiced = np.flatnonzero(mask)
+    keep[: voiced[0]] = False
+    keep[voiced[-1] + 1 :] = False
+    return samples[: len(mask) * frame].reshape(len(mask), frame)[keep].reshape(-1)
+
+
+def _encode_wav(samples: "np.ndarray", rate: int) -> bytes:
+    return pcm16_to_wav((np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes(), rate)
+
+
+def pcm16_to_samples(pcm: bytes) -> "np.ndarray":
+    """Little-endian 16-bit mono PCM as float32 samples in [-1, 1]."""
+    return np.frombuffer(pcm[: len(pcm) - len(pcm) % 2], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def pcm16_to_wav(pcm: bytes, rate: int) -> bytes:
+    """Wrap raw little-endian 16-bit mono PCM in a WAV header (no NumPy needed)."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm[: len(pcm) - len(pcm) % 2])
+    return buffer.getvalue()
+
+
+def get_preprocess_stats() -> Dict[str, Any]:
+    return {**_stats, "numpy_available": np is not None, "ffmpeg_available": shutil.which("ffmpeg") is not None}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trim silence and downsample an audio file for STT.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--out", type=Path, help="write the processed WAV here")
+    args = parser.parse_args()
+
+    result = preprocess_audio(args.path.read_bytes(), args.path.name)
+    if not result.applied:
+        print(f"skipped: {result.reason}")
+        return
+    print(
+        f"input={result.original_bytes}B/{result.original_seconds:.2f}s "
+        f"output={len(result.data)}B/{result.output_seconds:.2f}s "
+        f"saved={result.seconds_saved:.2f}s speech={result.has_speech}"
+    )
+    if args.out:
+        args.out.write_bytes(result.data)
+
+
+if __name__ == "__main__":
+    main()
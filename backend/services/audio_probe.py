@@ -0,0 +1,531 @@
+"""
+Header-only audio validation, run before any paid speech-to-text call.
+
+The container is identified from its magic bytes (the client's content type and
+filename are not trusted), then just enough of the header - plus the tail for
+streamed WebM/Ogg - is parsed to get the duration and sample rate. Unrecognised,
+corrupt, too-short and too-long uploads are rejected with 400 and counted by reason.
+
+Supported: WebM/Matroska, Ogg (Opus/Vorbis), WAV, MP3 and MP4/M4A. No decoding is
+done and nothing beyond the first and last few hundred KB is read.
+"""
+
+import os
+import struct
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Tuple
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 256 * 1024
+# An MP4 `moov` box larger than this is not worth parsing for a duration.
+_MAX_MOOV_BYTES = 4 * 1024 * 1024
+
+EXTENSIONS = {"webm": ".webm", "ogg": ".ogg", "wav": ".wav", "mp3": ".mp3", "m4a": ".m4a"}
+
+_stats: Counter = Counter()
+
+
+class _Corrupt(ValueError):
+    pass
+
+
+@dataclass
+class AudioProbe:
+    container: str
+    duration_seconds: float | None = None
+    sample_rate: int | None = None
+    channels: int | None = None
+
+    def filename(self, original: str) -> str:
+        """`original` with the extension of the sniffed container, so the STT engine decodes it correctly."""
+        return f"{Path(original).stem or 'audio'}{EXTENSIONS[self.container]}"
+
+
+def probe_audio(audio_file: BinaryIO) -> AudioProbe:
+    """Identify and measure a seekable audio file; raises ValueError when it is unrecognised or corrupt."""
+    size = audio_file.seek(0, os.SEEK_END)
+    audio_file.seek(0)
+    head = audio_file.read(HEAD_BYTES)
+    try:
+        if head[:4] == b"\x1a\x45\xdf\xa3":
+            return _probe_webm(head, audio_file, size)
+        if head[:4] == b"OggS":
+            return _probe_ogg(head, audio_file, size)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _probe_wav(audio_file, size)
+        if head[4:8] == b"ftyp":
+            return _probe_mp4(audio_file, size)
+        if head[:3] == b"ID3" or _mp3_frame(head, 0) is not None:
+            return _probe_mp3(head, audio_file, size)
+    except (_Corrupt, _Truncated, struct.error, IndexError, RecursionError) as exc:
+        raise _Corrupt(str(exc) or "corrupt") from exc
+    finally:
+        audio_file.seek(0)
+    raise ValueError("unrecognized")
+
+
+def validate_audio(audio_file: BinaryIO) -> AudioProbe:
+    """Probe an upload and enforce AUDIO_MIN_SECONDS/AUDIO_MAX_SECONDS; raises 400 otherwise."""
+    if audio_file.seek(0, os.SEEK_END) == 0:
+        _reject("empty", "The recording is empty.")
+    try:
+        probe = probe_audio(audio_file)
+    except _Corrupt:
+        _reject("corrupt", "The recording is damaged and cannot be processed. Please record again.")
+    except ValueError:
+        _reject("unrecognized", "Invalid file type. Please upload an audio file.")
+
+    check_duration(probe.duration_seconds)
+    _stats["accepted"] += 1
+    _stats[f"accepted_{probe.container}"] += 1
+    return probe
+
+
+def check_duration(seconds: float | None, *, minimum: bool = True) -> None:
+    """Raise 400 outside AUDIO_MIN_SECONDS..AUDIO_MAX_SECONDS (`minimum=False` checks only the cap)."""
+    if seconds is None:
+        # Live-recorded WebM often has no duration; the size cap still bounds it.
+        _stats["duration_unknown"] += 1
+    elif minimum and seconds < settings.audio_min_seconds:
+        _reject("too_short", f"The recording is too short (minimum {settings.audio_min_seconds:g}s).")
+    elif seconds > settings.audio_max_seconds:
+        _reject("too_long", f"The recording is too long (maximum {settings.audio_max_seconds:g}s).")
+
+
+def _reject(reason: str, detail: str) -> None:
+    _stats[f"rejected_{reason}"] += 1
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def get_probe_stats() -> Dict[str, Any]:
+    rejected = {key[len("rejected_"):]: value for key, value in _stats.items() if key.startswith("rejected_")}
+    return {
+        "accepted": _stats["accepted"],
+        "rejected": rejected,
+        "rejected_total": sum(rejected.values()),
+        "duration_unknown": _stats["duration_unknown"],
+        "containers": {key[len("accepted_"):]: value for key, value in _stats.items() if key.startswith("accepted_")},
+    }
+
+
+def _read_tail(audio_file: BinaryIO, size: int, head: bytes) -> Tuple[bytes, int]:
+    """Last TAIL_BYTES of the file and their offset (reuses `head` when the file is small)."""
+    if size <= len(head):
+        return head, 0
+    offset = max(0, size - TAIL_BYTES)
+    audio_file.seek(offset)
+    return audio_file.read(TAIL_BYTES), offset
+
+
+# --- WebM / Matroska (EBML) ---
+
+_EBML_SEGMENT = 0x18538067
+_EBML_INFO = 0x1549A966
+_EBML_TRACKS = 0x1654AE6B
+_EBML_TRACK_ENTRY = 0xAE
+_EBML_AUDIO = 0xE1
+_EBML_CLUSTER = 0x1F43B675
+_EBML_MASTERS = {_EBML_SEGMENT, _EBML_INFO, _EBML_TRACKS, _EBML_TRACK_ENTRY, _EBML_AUDIO}
+# Segment > Tracks > TrackEntry > Audio is as deep as the elements we read go.
+_EBML_MAX_DEPTH = 16
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_SAMPLING_FREQUENCY = 0xB5
+_EBML_CHANNELS = 0x9F
+_EBML_TIMECODE = 0xE7
+_EBML_SIMPLE_BLOCK = 0xA3
+_EBML_BLOCK_GROUP = 0xA0
+_EBML_BLOCK = 0xA1
+
+
+class _Truncated(Exception):
+    pass
+
+
+def _ebml_vint(data: bytes, pos: int, keep_marker: bool = False) -> Tuple[int, int, bool]:
+    """(value, length, unknown_size) of the EBML variable-length integer at `pos`."""
+    if pos >= len(data):
+        raise _Truncated
+    first = data[pos]
+    if first == 0:
+        raise _Corrupt("bad EBML length")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise _Truncated
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[pos + 1 : pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _ebml_element(data: bytes, pos: int) -> Tuple[int, int, int, bool]:
+    """(id, body_start, body_size, unknown_size) of the element at `pos`."""
+    element_id, id_length, _ = _ebml_vint(data, pos, keep_marker=True)
+    body_size, size_length, unknown = _ebml_vint(data, pos + id_length)
+    return element_id, pos + id_length + size_length, body_size, unknown
+
+
+def _ebml_float(body: bytes) -> float:
+    if len(body) == 4:
+        return struct.unpack(">f", body)[0]
+    if len(body) == 8:
+        return struct.unpack(">d", body)[0]
+    raise _Corrupt("bad EBML float")
+
+
+def _walk_ebml(data: bytes, start: int, end: int, found: Dict[str, Any], depth: int = 0) -> None:
+    if depth > _EBML_MAX_DEPTH:
+        raise _Corrupt("EBML nesting too deep")
+    pos = start
+    while pos < end:
+        try:
+            element_id, body, body_size, unknown = _ebml_element(data, pos)
+        except _Truncated:
+            return
+        if element_id == _EBML_CLUSTER:
+            found["cluster"] = True
+            return
+        stop = end if unknown else min(end, body + body_size)
+        if element_id in _EBML_MASTERS:
+            if element_id == _EBML_SEGMENT:
+                found["segment"] = True
+            _walk_ebml(data, body, stop, found, depth + 1)
+        payload = data[body:stop] if body_size <= 8 else b""
+        if element_id == _EBML_TIMECODE_SCALE:
+            found["scale"] = int.from_bytes(payload, "big")
+        elif element_id == _EBML_DURATION:
+            found["duration"] = _ebml_float(payload)
+        elif element_id == _EBML_SAMPLING_FREQUENCY:
+            found["sample_rate"] = int(_ebml_float(payload))
+        elif element_id == _EBML_CHANNELS:
+            found["channels"] = int.from_bytes(payload, "big")
+        if unknown:
+            return
+        pos = body + body_size
+
+
+def _probe_webm(head: bytes, audio_file: BinaryIO, size: int) -> AudioProbe:
+    try:
+        _, body, body_size, _ = _ebml_element(head, 0)
+    except _Truncated:
+        raise _Corrupt("truncated EBML header")
+    found: Dict[str, Any] = {}
+    _walk_ebml(head, body + body_size, len(head), found)
+    if not found.get("segment"):
+        raise _Corrupt("no Segment")
+    scale = found.get("scale") or 1_000_000
+    duration = found.get("duration")
+    if duration is not None:
+        seconds: float | None = duration * scale / 1e9
+    else:
+        # MediaRecorder output has no Duration; use the last block's timestamp instead.
+        tail, _ = _read_tail(audio_file, size, head)
+        last = _last_webm_timecode(tail)
+        if last is not None:
+            seconds = last * scale / 1e9
+        elif size <= len(head) and not found.get("cluster"):
+            seconds = 0.0  # headers only, no audio at all
+        else:
+            seconds = None
+    return AudioProbe("webm", seconds, found.get("sample_rate"), found.get("channels"))
+
+
+def _last_webm_timecode(data: bytes) -> int | None:
+    """Timecode of the last block in the last Cluster that starts inside `data`."""
+    marker = _EBML_CLUSTER.to_bytes(4, "big")
+    end = len(data)
+    while (pos := data.rfind(marker, 0, end)) != -1:
+        end = pos
+        timecode = _cluster_end_time(data, pos)
+        if timecode is not None:
+            return timecode
+    return None
+
+
+def _cluster_end_time(data: bytes, pos: int) -> int | None:
+    try:
+        _, body, body_size, unknown = _ebml_element(data, pos)
+        element_id, child, child_size, _ = _ebml_element(data, body)
+    except (_Truncated, _Corrupt):
+        return None
+    if element_id != _EBML_TIMECODE:
+        return None  # the marker bytes were inside audio data
+    cluster_time = int.from_bytes(data[child : child + child_size], "big")
+    stop = len(data) if unknown else min(len(data), body + body_size)
+    latest = 0
+    pos = child + child_size
+    try:
+        while pos < stop:
+            element_id, child, child_size, _ = _ebml_element(data, pos)
+            pos = child + child_size
+            if element_id == _EBML_BLOCK_GROUP:
+                element_id, child, _, _ = _ebml_element(data, child)
+                if element_id != _EBML_BLOCK:
+                    continue
+            elif element_id != _EBML_SIMPLE_BLOCK:
+                continue
+            _, track_length, _ = _ebml_vint(data, child)
+            latest = max(latest, struct.unpack_from(">h", data, child + track_length)[0])
+    except (_Truncated, _Corrupt, struct.error):
+        pass  # an upload cut mid-block keeps the blocks read so far
+    return cluster_time + latest
+
+
+# --- Ogg (Opus / Vorbis) ---
+
+
+def _probe_ogg(head: bytes, audio_file: BinaryIO, size: int) -> AudioProbe:
+    if len(head) < 28 or head[4] != 0:
+        raise _Corrupt("bad Ogg page")
+    serial = head[14:18]
+    payload = head[27 + head[26] :]
+    if payload.startswith(b"OpusHead"):
+        channels, pre_skip, input_rate = payload[9], *struct.unpack("<HI", payload[10:16])
+        granule_rate, offset = 48_000, pre_skip
+    elif payload.startswith(b"\x01vorbis"):
+        channels, input_rate = payload[11], struct.unpack("<I", payload[12:16])[0]
+        granule_rate, offset = input_rate, 0
+    else:
+        raise _Corrupt("unsupported Ogg codec")
+    if not granule_rate:
+        raise _Corrupt("zero sample rate")
+
+    tail, _ = _read_tail(audio_file, size, head)
+    seconds = None
+    end = len(tail)
+    while (pos := tail.rfind(b"OggS", 0, end)) != -1:
+        end = pos
+        if pos + 18 > len(tail) or tail[pos + 4] != 0 or tail[pos + 14 : pos + 18] != serial:
+            continue
+        granule = struct.unpack("<q", tail[pos + 6 : pos + 14])[0]
+        if granule >= 0:
+            seconds = max(0, granule - offset) / granule_rate
+            break
+    return AudioProbe("ogg", seconds, input_rate or granule_rate, channels)
+
+
+# --- WAV ---
+
+
+def _probe_wav(audio_file: BinaryIO, size: int) -> AudioProbe:
+    audio_file.seek(12)
+    fmt = None
+    while True:
+        header = audio_file.read(8)
+        if len(header) < 8:
+            raise _Corrupt("no data chunk")
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            body = audio_file.read(chunk_size)
+            if len(body) < 16:
+                raise _Corrupt("short fmt chunk")
+            fmt = struct.unpack("<HHIIHH", body[:16])
+            audio_file.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise _Corrupt("data before fmt")
+            data_start = audio_file.tell()
+            # Streaming writers leave the size as 0 or 0xFFFFFFFF.
+            available = size - data_start
+            data_size = chunk_size if 0 < chunk_size <= available else available
+            _, channels, sample_rate, byte_rate, _, _ = fmt
+            if not byte_rate or not sample_rate:
+                raise _Corrupt("zero byte rate")
+            return AudioProbe("wav", data_size / byte_rate, sample_rate, channels)
+        else:
+            audio_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+# --- MP3 ---
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+
+
+@dataclass
+class _Mp3Frame:
+    version: int  # 1, 2 or 25 (MPEG-2.5)
+    layer: int
+    bitrate: int  # bits per second
+    sample_rate: int
+    channels: int
+    length: int
+    samples: int
+
+
+def _mp3_frame(data: bytes, pos: int) -> _Mp3Frame | None:
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = {0: 25, 2: 2, 3: 1}.get((b1 >> 3) & 3)
+    layer = {1: 3, 2: 2, 3: 1}.get((b1 >> 1) & 3)
+    bitrate_index, rate_index, padding = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[(min(version, 2), layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 576 if layer == 3 and version != 1 else 1152
+        length = samples // 8 * bitrate // sample_rate + padding
+    return _Mp3Frame(version, layer, bitrate, sample_rate, 1 if b3 >> 6 == 3 else 2, length, samples)
+
+
+def _probe_mp3(head: bytes, audio_file: BinaryIO, size: int) -> AudioProbe:
+    start = 0
+    if head[:3] == b"ID3":
+        tag_size = 0
+        for byte in head[6:10]:
+            tag_size = (tag_size << 7) | (byte & 0x7F)
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    data = head[start:]
+    if len(data) < 4096 and size > len(head):
+        # Large ID3 tag (cover art): read the frames that follow it.
+        audio_file.seek(start)
+        data = audio_file.read(HEAD_BYTES)
+
+    # A sync word only counts when a second frame header follows it.
+    frame = None
+    for pos in range(min(len(data) - 4, 4096)):
+        candidate = _mp3_frame(data, pos)
+        if candidate is None or candidate.length <= 0:
+            continue
+        following = pos + candidate.length
+        if following + 4 > len(data) or _mp3_frame(data, following) is not None:
+            frame = candidate
+            start, data = start + pos, data[pos:]
+            break
+    if frame is None:
+        raise _Corrupt("no MPEG audio frame")
+
+    # A Xing/Info (VBR) or VBRI header in the first frame carries the frame count.
+    side_info = (32 if frame.channels == 2 else 17) if frame.version == 1 else (17 if frame.channels == 2 else 9)
+    frames = None
+    xing = 4 + side_info
+    if data[xing : xing + 4] in (b"Xing", b"Info") and struct.unpack_from(">I", data, xing + 4)[0] & 1:
+        frames = struct.unpack_from(">I", data, xing + 8)[0]
+    elif data[36:40] == b"VBRI":
+        frames = struct.unpack_from(">I", data, 50)[0]
+    if frames:
+        seconds = frames * frame.samples / frame.sample_rate
+    else:
+        seconds = (size - start) * 8 / frame.bitrate
+    return AudioProbe("mp3", seconds, frame.sample_rate, frame.channels)
+
+
+# --- MP4 / M4A ---
+
+
+def _mp4_boxes(data: bytes, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        box_size, box_type = struct.unpack(">I4s", data[pos : pos + 8])
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", data[pos + 8 : pos + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - pos
+        if box_size < header:
+            raise _Corrupt("bad MP4 box size")
+        yield box_type, pos + header, min(end, pos + box_size)
+        pos += box_size
+
+
+def _probe_mp4(audio_file: BinaryIO, size: int) -> AudioProbe:
+    # Walk top-level boxes by seeking, so a leading `mdat` is skipped without reading it.
+    pos = 0
+    moov = None
+    while pos + 8 <= size:
+        audio_file.seek(pos)
+        header = audio_file.read(16)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+        elif box_size == 0:
+            box_size = size - pos
+        if box_size < 8:
+            raise _Corrupt("bad MP4 box size")
+        if box_type == b"moov":
+            if box_size > _MAX_MOOV_BYTES:
+                return AudioProbe("m4a")
+            audio_file.seek(pos)
+            moov = audio_file.read(box_size)
+            break
+        pos += box_size
+    if moov is None:
+        raise _Corrupt("no moov box")
+
+    timescale = seconds = sample_rate = channels = fragment_duration = None
+    for box_type, body, end in _mp4_boxes(moov, 8, len(moov)):
+        if box_type == b"mvhd":
+            timescale, seconds = _mp4_mvhd(moov, body)
+        elif box_type == b"mvex":
+            # Fragmented files (Safari MediaRecorder) may only carry a fragment duration.
+            for inner_type, inner_body, _ in _mp4_boxes(moov, body, end):
+                if inner_type == b"mehd":
+                    fmt = ">Q" if moov[inner_body] == 1 else ">I"
+                    fragment_duration = struct.unpack_from(fmt, moov, inner_body + 4)[0]
+        elif box_type == b"trak" and sample_rate is None:
+            sample_rate, channels = _mp4_audio_track(moov, body, end)
+    if sample_rate is None:
+        raise _Corrupt("no audio track")
+    if not seconds and fragment_duration and timescale:
+        seconds = fragment_duration / timescale
+    return AudioProbe("m4a", seconds or None, sample_rate, channels)
+
+
+def _mp4_mvhd(data: bytes, body: int) -> Tuple[int | None, float | None]:
+    """(timescale, seconds) from a movie header; seconds is None when unset."""
+    if data[body] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, body + 12)
+    if not timescale:
+        return None, None
+    if duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        return timescale, None
+    return timescale, duration / timescale
+
+
+def _mp4_audio_track(data: bytes, start: int, end: int) -> Tuple[int | None, int | None]:
+    """(sample_rate, channels) when this `trak` is a sound track."""
+    for box_type, body, box_end in _mp4_boxes(data, start, end):
+        if box_type != b"mdia":
+            continue
+        children = {kind: (child, child_end) for kind, child, child_end in _mp4_boxes(data, body, box_end)}
+        hdlr = children.get(b"hdlr")
+        if hdlr is None or data[hdlr[0] + 8 : hdlr[0] + 12] != b"soun":
+            return None, None
+        for kind, child, child_end in _mp4_boxes(data, *children.get(b"minf", (0, 0))):
+            if kind != b"stbl":
+                continue
+            for inner, inner_body, _ in _mp4_boxes(data, child, child_end):
+                if inner == b"stsd":
+                    # Audio sample entry: 8-byte header, 6 reserved, 2 data ref, 8 reserved,
+                    # then channel count, sample size, 4 reserved and a 16.16 sample rate.
+                    entry = inner_body + 8
+                    channels = struct.unpack(">H", data[entry + 24 : entry + 26])[0]
+                    sample_rate = struct.unpack(">I", data[entry + 32 : entry + 36])[0] >> 16
+                    return sample_rate or None, channels or None
+        mdhd = children.get(b"mdhd")
+        if mdhd is not None:
+            # The media timescale of an audio track is its sample rate.
+            offset = 20 if data[mdhd[0]] == 1 else 12
+            return struct.unpack(">I", data[mdhd[0] + offset : mdhd[0] + offset + 4])[0], None
+    return None, None
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from services.openai_service import generate_followup_from_history, summarize_interview_turns
+
+logger = logging.getLogger(__name__)
+
+# Turns kept verbatim; older turns are folded into the rolling summary.
+VERBATIM_TURNS = 2
+_MAX_SESSIONS = 2000
+_SUMMARY_MAX_CHARS = 1200
+
+
+class _SessionMemory:
+    def __init__(self) -> None:
+        self.summary = ""
+        self.recent: List[Dict[str, Any]] = []
+        # Evicted from `recent` but not yet folded into `summary`.
+        self.pending: List[Dict[str, Any]] = []
+        self.refresh: asyncio.Task | None = None
+        self.turns = 0
+
+
+# In-memory, LRU-bounded store keyed by interview session_id.
+_memories: "OrderedDict[str, _SessionMemory]" = OrderedDict()
+_stats = {"turns_recorded": 0, "summary_refreshes": 0, "summary_failures": 0}
+
+
+def _get(session_id: str) -> _SessionMemory:
+    memory = _memories.get(session_id)
+    if memory is None:
+        memory = _SessionMemory()
+        _memories[session_id] = memory
+        while len(_memories) > _MAX_SESSIONS:
+            _memories.popitem(last=False)
+    _memories.move_to_end(session_id)
+    return memory
+
+
+def record_turn(
+    session_id: str,
+    question: str,
+    answer: str,
+    *,
+    score: int | None = None,
+) -> None:
+    """
+    Add a Q/A turn to the session's memory.
+
+    Re-recording the latest question (e.g. a retried request) replaces that turn.
+    Turns pushed out of the verbatim window are summarized in the background.
+    """
+    memory = _get(session_id)
+    turn = {"question": question.strip(), "answer": answer.strip(), "score": score}
+    if memory.recent and memory.recent[-1]["question"] == turn["question"]:
+        memory.recent[-1] = turn
+        return
+    memory.recent.append(turn)
+    memory.turns += 1
+    _stats["turns_recorded"] += 1
+    while len(memory.recent) > VERBATIM_TURNS:
+        memory.pending.append(memory.recent.pop(0))
+    if memory.pending and (memory.refresh is None or memory.refresh.done()):
+        memory.refresh = asyncio.create_task(_refresh_summary(memory))
+
+
+def update_score(session_id: str, question: str, score: int) -> None:
+    memory = _memories.get(session_id)
+    if memory is None:
+        return
+    for turn in reversed(memory.pending + memory.recent):
+        if turn["question"] == question.strip():
+            turn["score"] = score
+            return
+
+
+def get_context(session_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Return (summary, verbatim turns). Turns still awaiting summarization are included verbatim."""
+    memory = _memories.get(session_id)
+    if memory is None:
+        return "", []
+    return memory.summary, memory.pending + memory.recent
+
+
+async def generate_followup(session_id: str, *, role: str, difficulty: str, user_id: str | None) -> str:
+    summary, turns = get_context(session_id)
+    return await generate_followup_from_history(
+        role=role,
+        history=turns,
+        user_id=user_id,
+        summary=summary,
+        difficulty=difficulty,
+    )
+
+
+async def _refresh_summary(memory: _SessionMemory) -> None:
+    while memory.pending:
+        batch = list(memory.pending)
+        try:
+            summary = await summarize_interview_turns(memory.summary, batch)
+        except Exception as exc:
+            # Keep the turns pending; they are sent verbatim and retried after the next turn.
+            _stats["summary_failures"] += 1
+            logger.warning("conversation summary refresh failed: %s", exc)
+            return
+        if not summary:
+            _stats["summary_failures"] += 1
+            return
+        memory.summary = summary[:_SUMMARY_MAX_CHARS]
+        del memory.pending[: len(batch)]
+        _stats["summary_refreshes"] += 1
+
+
+def get_memory_stats() -> Dict[str, int]:
+    return {**_stats, "sessions": len(_memories)}
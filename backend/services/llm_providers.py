@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping
+
+from dotenv import load_dotenv
+from openai import OpenAI, RateLimitError
+
+from core.config import settings
+
+
+@dataclass
+class ChatResult:
+    content: str
+    total_tokens: int = 0
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ChatStreamChunk:
+    text: str = ""
+    # Only the final chunk carries usage.
+    total_tokens: int | None = None
+
+
+class ChatStream:
+    """Iterable of ChatStreamChunk plus the response headers seen when the stream opened."""
+
+    def __init__(self, chunks: Iterator[ChatStreamChunk], headers: Mapping[str, str] | None = None, closer=None):
+        self._chunks = chunks
+        self.headers: Mapping[str, str] = headers or {}
+        self._closer = closer
+
+    def __iter__(self) -> Iterator[ChatStreamChunk]:
+        return self._chunks
+
+    def close(self) -> None:
+        if callable(self._closer):
+            self._closer()
+
+
+class ProviderRateLimitError(RuntimeError):
+    """Provider rejected the call for rate limiting; `headers` feed the scheduler's backoff."""
+
+    def __init__(self, message: str, headers: Mapping[str, str] | None = None) -> None:
+        super().__init__(message)
+        self.headers: Mapping[str, str] = headers or {}
+
+
+class LLMProvider:
+    """
+    Blocking provider interface; callers run these methods in a worker thread.
+
+    `messages` use the OpenAI chat format. `response_format={"type": "json_object"}`
+    asks for a JSON object body.
+    """
+
+    name = "base"
+
+    def chat(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> ChatResult:
+        raise NotImplementedError
+
+    def stream_chat(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> ChatStream:
+        raise NotImplementedError
+
+    def transcribe(self, audio_file: BinaryIO, filename: str = "audio.webm") -> str:
+        # `filename` only tells the provider the container format.
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self) -> None:
+        self._client: OpenAI | None = None
+        self._chat_client: OpenAI | None = None
+
+    def client(self) -> OpenAI:
+        if self._client is None:
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            self._client = OpenAI(api_key=api_key)
+        return self._client
+
+    def chat_client(self) -> OpenAI:
+        # Chat calls carry the caller's deadline as `timeout`; SDK retries would outlive it
+        # (retries are the breaker's and hedging's job), so one attempt per call.
+        if self._chat_client is None:
+            self._chat_client = self.client().with_options(max_retries=0)
+        return self._chat_client
+
+    def chat(self, *, response_format=None, **kwargs: Any) -> ChatResult:
+        if response_format:
+            kwargs["response_format"] = response_format
+        try:
+            raw = self.chat_client().chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as exc:
+            raise ProviderRateLimitError(str(exc), exc.response.headers) from exc
+        response = raw.parse()
+        return ChatResult(
+            content=response.choices[0].message.content or "",
+            total_tokens=_usage_total_tokens(response),
+            headers=raw.headers,
+        )
+
+    def stream_chat(self, *, response_format=None, **kwargs: Any) -> ChatStream:
+        if response_format:
+            kwargs["response_format"] = response_format
+        try:
+            raw = self.chat_client().chat.completions.with_raw_response.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs,
+            )
+        except RateLimitError as exc:
+            raise ProviderRateLimitError(str(exc), exc.response.headers) from exc
+        stream = raw.parse()
+
+        def chunks() -> Iterator[ChatStreamChunk]:
+            for chunk in stream:
+                text = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+                usage = getattr(chunk, "usage", None)
+                yield ChatStreamChunk(
+                    text=text,
+                    total_tokens=_usage_total_tokens(chunk) if usage is not None else None,
+                )
+
+        return ChatStream(chunks(), headers=raw.headers, closer=getattr(stream, "close", None))
+
+    def transcribe(self, audio_file: BinaryIO, filename: str = "audio.webm") -> str:
+        transcript = self.client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, audio_file),
+            response_format="text",
+        )
+        return transcript.strip()
+
+
+class StubProvider(LLMProvider):
+    """
+    Offline, deterministic provider for load tests and profiling.
+
+    Output depends only on the prompt (or audio bytes), so runs are reproducible.
+    Latency and token counts are drawn from normal distributions configured via
+    STUB_LLM_* settings, seeded by the same hash so identical prompts cost the same.
+    """
+
+    name = "stub"
+
+    def chat(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> ChatResult:
+        digest, rng = _seeded(_prompt_text(messages))
+        time.sleep(_sample_latency(rng))
+        return ChatResult(
+            content=_stub_content(digest, messages, response_format),
+            total_tokens=_sample_tokens(rng, max_tokens),
+            headers={},
+        )
+
+    def stream_chat(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> ChatStream:
+        digest, rng = _seeded(_prompt_text(messages))
+        content = _stub_content(digest, messages, response_format)
+        latency = _sample_latency(rng)
+        total_tokens = _sample_tokens(rng, max_tokens)
+        pieces = [content[i : i + 8] for i in range(0, len(content), 8)] or [""]
+
+        def chunks() -> Iterator[ChatStreamChunk]:
+            for piece in pieces:
+                time.sleep(latency / len(pieces))
+                yield ChatStreamChunk(text=piece)
+            yield ChatStreamChunk(total_tokens=total_tokens)
+
+        return ChatStream(chunks())
+
+    def transcribe(self, audio_file: BinaryIO, filename: str = "audio.webm") -> str:
+        data = audio_file.read()
+        digest, rng = _seeded(data)
+        time.sleep(_sample_latency(rng))
+        if not data:
+            return ""
+        return (
+            f"Stub transcript {digest[:8]}: I would start by clarifying requirements, "
+            "then choose appropriate data structures and discuss trade-offs."
+        )
+
+
+def _prompt_text(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def _seeded(payload: str | bytes) -> tuple[str, random.Random]:
+    raw = payload.encode("utf-8") if isinstance(payload, str) else payload
+    digest = hashlib.sha256(raw).hexdigest()
+    return digest, random.Random(int(digest[:16], 16) ^ settings.stub_llm_seed)
+
+
+def _sample_latency(rng: random.Random) -> float:
+    mean = settings.stub_llm_latency_ms / 1000.0
+    jitter = settings.stub_llm_latency_jitter_ms / 1000.0
+    return max(0.0, rng.gauss(mean, jitter))
+
+
+def _sample_tokens(rng: random.Random, max_tokens: int) -> int:
+    sampled = int(rng.gauss(settings.stub_llm_tokens_mean, settings.stub_llm_tokens_stddev))
+    return max(1, sampled + max_tokens // 4)
+
+
+def _stub_content(digest: str, messages: List[Dict[str, str]], response_format: Dict[str, str] | None) -> str:
+    if response_format and response_format.get("type") == "json_object":
+        score = int(digest[:2], 16) % 11
+        return json.dumps(
+            {
+                "score": score,
+                "confidence": 50 + int(digest[2:4], 16) % 50,
+                "strengths": ["Addresses the core of the question."],
+                "weaknesses": ["Limited depth on edge cases."],
+                "improvements": ["Discuss complexity and failure modes."],
+                "verdict": "pass" if score >= 7 else "fail",
+                "feedback": f"Stub evaluation {digest[:8]}: the answer is {'solid' if score >= 7 else 'incomplete'}.",
+            }
+        )
+    user_prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    topic = " ".join(str(user_prompt).split()[:12])
+    return f"Stub question {digest[:8]}: walk me through your approach to this - {topic}?"
+
+
+def _usage_total_tokens(response: Any) -> int:
+    usage = getattr(response, "usage", None)
+    total = getattr(usage, "total_tokens", 0) if usage is not None else 0
+    try:
+        return max(0, int(total or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+_PROVIDERS = {"openai": OpenAIProvider, "stub": StubProvider}
+_provider: LLMProvider | None = None
+
+
+def get_provider() -> LLMProvider:
+    global _provider
+    if _provider is None:
+        name = (settings.llm_provider or "openai").strip().lower()
+        provider_cls = _PROVIDERS.get(name)
+        if provider_cls is None:
+            raise RuntimeError(f"Unknown LLM_PROVIDER '{name}'. Use one of: {', '.join(_PROVIDERS)}.")
+        _provider = provider_cls()
+    return _provider
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CLOSED = "closed"
+_OPEN = "open"
+_HALF_OPEN = "half_open"
+
+
+class LLMUnavailableError(HTTPException):
+    """Raised instead of calling the provider while an operation's breaker is open."""
+
+    def __init__(self, operation: str, retry_after: float) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is temporarily unavailable. Please retry shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.operation = operation
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a rolling time window.
+
+    closed -> open when at least `min_calls` outcomes in the window fail at `error_rate`
+    or more; open -> half_open after `open_seconds`, letting a single probe through;
+    the probe's outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.state = _CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"failures": 0, "successes": 0, "short_circuited": 0, "opened": 0}
+
+    def before_call(self) -> None:
+        now = time.monotonic()
+        if self.state == _OPEN:
+            remaining = self._opened_at + settings.llm_breaker_open_seconds - now
+            if remaining > 0:
+                self._stats["short_circuited"] += 1
+                raise LLMUnavailableError(self.name, remaining)
+            self.state = _HALF_OPEN
+        if self.state == _HALF_OPEN:
+            if self._probe_in_flight:
+                self._stats["short_circuited"] += 1
+                raise LLMUnavailableError(self.name, 1)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self._stats["successes"] += 1
+        if self.state == _HALF_OPEN:
+            logger.info("LLM breaker closed operation=%s", self.name)
+            self.state = _CLOSED
+            self._outcomes.clear()
+        self._probe_in_flight = False
+        self._record(True)
+
+    def record_failure(self) -> None:
+        self._stats["failures"] += 1
+        self._probe_in_flight = False
+        if self.state == _HALF_OPEN:
+            self._open()
+            return
+        self._record(False)
+        total = len(self._outcomes)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if total >= settings.llm_breaker_min_calls and failures / total >= settings.llm_breaker_error_rate:
+            self._open()
+
+    def release(self) -> None:
+        # The call ended without a provider outcome (e.g. rejected by the scheduler).
+        self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self.state = _OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+        logger.warning("LLM breaker opened operation=%s", self.name)
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        cutoff = now - settings.llm_breaker_window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def status(self) -> Dict[str, Any]:
+        total = len(self._outcomes)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        open_for = 0.0
+        if self.state == _OPEN:
+            open_for = max(0.0, self._opened_at + settings.llm_breaker_open_seconds - time.monotonic())
+        return {
+            **self._stats,
+            "state": self.state,
+            "window_calls": total,
+            "window_error_rate": round(failures / total, 3) if total else 0.0,
+            "reopens_in_seconds": round(open_for, 2),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(operation: str) -> CircuitBreaker:
+    breaker = _breakers.get(operation)
+    if breaker is None:
+        breaker = CircuitBreaker(operation)
+        _breakers[operation] = breaker
+    return breaker
+
+
+def get_breaker_status() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.status() for name, breaker in _breakers.items()}
+
+
+async def call_with_breaker(operation: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a provider call under the operation's breaker; deadline overruns count as failures."""
+    breaker = get_breaker(operation)
+    breaker.before_call()
+    try:
+        result = await call()
+    except asyncio.TimeoutError:
+        breaker.record_failure()
+        logger.warning("LLM deadline exceeded operation=%s", operation)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="AI service timed out. Please retry.",
+        )
+    except HTTPException:
+        # Local admission control rejected the call before it reached the provider.
+        breaker.release()
+        raise
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay_seconds: float) -> Any:
+    """
+    Start `call`; if it has not finished after `delay_seconds`, start a duplicate and
+    return whichever succeeds first. The loser is cancelled; its HTTP request may still
+    run on the LLM pool until the provider timeout. If both fail, the first error is raised.
+    """
+    tasks = {asyncio.ensure_future(call())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_seconds)
+        if not done:
+            tasks.add(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error if error is not None else RuntimeError("Hedged call produced no result.")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
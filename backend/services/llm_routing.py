@@ -0,0 +1,148 @@
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Recent samples kept per (route, model) for percentile estimates.
+_WINDOW = 200
+
+
+@dataclass(frozen=True)
+class RoutePlan:
+    route: str
+    model: str
+    max_tokens: int
+    temperature: float
+    latency_slo_ms: int
+    failover: bool = False
+
+
+class _RouteStats:
+    def __init__(self) -> None:
+        self.latencies_ms: Deque[float] = deque(maxlen=_WINDOW)
+        self.tokens: Deque[int] = deque(maxlen=_WINDOW)
+        self.calls = 0
+        self.errors = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_ms": _percentile(self.latencies_ms, 0.50),
+            "p95_ms": _percentile(self.latencies_ms, 0.95),
+            "avg_tokens": round(sum(self.tokens) / len(self.tokens), 1) if self.tokens else 0.0,
+        }
+
+
+_stats: Dict[Tuple[str, str], _RouteStats] = {}
+# route -> monotonic time until which calls go to the fallback model.
+_failover_until: Dict[str, float] = {}
+_failovers: Dict[str, int] = {}
+
+
+def _percentile(samples: Deque[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)], 1)
+
+
+def _route_config(route: str) -> Dict[str, Any]:
+    routes = settings.llm_routes
+    config = routes.get(route)
+    if config is None:
+        raise KeyError(f"Unknown LLM route '{route}'. Configure it in LLM_ROUTES.")
+    return config
+
+
+def resolve(route: str) -> RoutePlan:
+    """
+    Pick the model and parameters for a logical operation.
+
+    The primary model is used unless its recent p95 latency breached the route's SLO,
+    in which case the fallback model serves the route for LLM_ROUTE_FAILOVER_SECONDS
+    before the primary is tried again.
+    """
+    config = _route_config(route)
+    fallback = str(config.get("fallback_model") or "")
+    until = _failover_until.get(route)
+    failover = bool(fallback) and until is not None and until > time.monotonic()
+    if until is not None and not failover:
+        # Failover period over: re-measure the primary from scratch.
+        del _failover_until[route]
+        stats = _stats.get((route, str(config["model"])))
+        if stats is not None:
+            stats.latencies_ms.clear()
+    return RoutePlan(
+        route=route,
+        model=fallback if failover else str(config["model"]),
+        max_tokens=int(config["max_tokens"]),
+        temperature=float(config["temperature"]),
+        latency_slo_ms=int(config["latency_slo_ms"]),
+        failover=failover,
+    )
+
+
+def record(
+    plan: RoutePlan,
+    latency_seconds: float,
+    tokens: int | None,
+    ok: bool = True,
+    timed_out: bool = False,
+) -> None:
+    """
+    Add one call's outcome. Failed calls add no latency sample, except timeouts: a model
+    that hangs until the deadline is the slowest kind, so a timeout counts toward p95 as
+    the deadline (`latency_seconds`), or just past the SLO if the deadline is shorter.
+    """
+    stats = _stats.setdefault((plan.route, plan.model), _RouteStats())
+    stats.calls += 1
+    latency_ms = latency_seconds * 1000.0
+    if not ok:
+        stats.errors += 1
+        if not timed_out:
+            return
+        latency_ms = max(latency_ms, plan.latency_slo_ms + 1.0)
+    stats.latencies_ms.append(latency_ms)
+    if tokens:
+        stats.tokens.append(tokens)
+    if plan.failover or plan.route in _failover_until or len(stats.latencies_ms) < settings.llm_route_min_samples:
+        return
+    config = _route_config(plan.route)
+    if not config.get("fallback_model"):
+        return
+    p95 = _percentile(stats.latencies_ms, 0.95)
+    if p95 > plan.latency_slo_ms:
+        _failover_until[plan.route] = time.monotonic() + settings.llm_route_failover_seconds
+        _failovers[plan.route] = _failovers.get(plan.route, 0) + 1
+        logger.warning(
+            "LLM route failing over route=%s model=%s p95=%.0fms slo=%dms fallback=%s",
+            plan.route,
+            plan.model,
+            p95,
+            plan.latency_slo_ms,
+            config["fallback_model"],
+        )
+
+
+def get_route_stats() -> Dict[str, Any]:
+    now = time.monotonic()
+    result: Dict[str, Any] = {}
+    for route, config in settings.llm_routes.items():
+        result[route] = {
+            "model": config["model"],
+            "fallback_model": config.get("fallback_model") or None,
+            "latency_slo_ms": config["latency_slo_ms"],
+            "failover_for_seconds": round(max(0.0, _failover_until.get(route, 0.0) - now), 1),
+            "failovers": _failovers.get(route, 0),
+            "models": {
+                model: stats.summary() for (name, model), stats in _stats.items() if name == route
+            },
+        }
+    return result
@@ -0,0 +1,340 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Tuple
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority classes: lower value is served first.
+PRIORITY_LIVE = 0  # a candidate is waiting on this call
+PRIORITY_PREFETCH = 1  # pre-generation / background refresh
+PRIORITY_BATCH = 2  # offline re-scoring and other bulk work
+_PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_PREFETCH: "prefetch", PRIORITY_BATCH: "batch"}
+# Share of the lane queue each class may occupy, so bulk work cannot crowd out live turns.
+_QUEUE_SHARE = {PRIORITY_LIVE: 1.0, PRIORITY_PREFETCH: 0.5, PRIORITY_BATCH: 0.25}
+
+_BACKOFF_BASE_SECONDS = 1.0
+_BACKOFF_MAX_SECONDS = 60.0
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        # Requests larger than the bucket are admitted once it is full rather than never.
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float) -> None:
+        # May go negative when actual usage exceeds the estimate; later refills repay it.
+        self.level -= amount
+
+    def cap(self, remaining: float) -> None:
+        self.level = min(self.level, remaining)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "future")
+
+    def __init__(self, tokens: int, future: asyncio.Future) -> None:
+        self.tokens = tokens
+        self.future = future
+
+
+class _ModelLane:
+    """Request/token buckets and the priority queue for one model."""
+
+    def __init__(self, model: str, rpm: int, tpm: int) -> None:
+        self.model = model
+        self.requests = _TokenBucket(rpm)
+        self.tokens = _TokenBucket(tpm)
+        self.queue: List[Tuple[int, int, _Waiter]] = []
+        self.blocked_until = 0.0
+        self.penalty = 0.0
+        self.timer: asyncio.TimerHandle | None = None
+        self.stats = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_deadline": 0,
+            "timed_out": 0,
+            "rate_limited": 0,
+        }
+
+    def _refill(self, now: float) -> None:
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+    def delay_for(self, tokens: int, now: float) -> float:
+        self._refill(now)
+        return max(
+            self.blocked_until - now,
+            self.requests.seconds_until(1),
+            self.tokens.seconds_until(tokens),
+        )
+
+    def estimate_wait(self, tokens: int, priority: int, now: float) -> float:
+        """Rough time until a new waiter would be served, counting everyone queued ahead of it."""
+        self._refill(now)
+        ahead = [waiter for prio, _, waiter in self.queue if prio <= priority]
+        request_deficit = len(ahead) + 1 - self.requests.level
+        token_deficit = sum(waiter.tokens for waiter in ahead) + tokens - self.tokens.level
+        return max(
+            self.blocked_until - now,
+            request_deficit / self.requests.rate,
+            token_deficit / self.tokens.rate,
+            0.0,
+        )
+
+    def dispatch(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.queue:
+            _, _, waiter = self.queue[0]
+            if waiter.future.done():
+                heapq.heappop(self.queue)
+                continue
+            delay = self.delay_for(waiter.tokens, time.monotonic())
+            if delay > 0:
+                self.timer = asyncio.get_running_loop().call_later(delay, self.dispatch)
+                return
+            heapq.heappop(self.queue)
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            waiter.future.set_result(None)
+
+    def remove(self, waiter: _Waiter) -> None:
+        self.queue = [entry for entry in self.queue if entry[2] is not waiter]
+        heapq.heapify(self.queue)
+
+    def block(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + max(0.0, seconds))
+
+
+class _Slot:
+    """Handle for an admitted call; reports actual usage and rate-limit feedback."""
+
+    def __init__(self, lane: _ModelLane, estimated_tokens: int) -> None:
+        self._lane = lane
+        self._estimated_tokens = estimated_tokens
+
+    def settle(self, headers: Mapping[str, str] | None, actual_tokens: int | None = None) -> None:
+        lane = self._lane
+        now = time.monotonic()
+        if actual_tokens is not None:
+            lane.tokens.take(actual_tokens - self._estimated_tokens)
+        lane.penalty /= 2
+        _apply_rate_limit_headers(lane, headers or {}, now)
+
+    def rate_limited(self, headers: Mapping[str, str] | None) -> None:
+        lane = self._lane
+        now = time.monotonic()
+        lane.stats["rate_limited"] += 1
+        retry_after = _retry_after_seconds(headers or {})
+        if retry_after is None:
+            lane.penalty = min(_BACKOFF_MAX_SECONDS, max(_BACKOFF_BASE_SECONDS, lane.penalty * 2))
+            retry_after = lane.penalty
+        lane.block(retry_after, now)
+        _apply_rate_limit_headers(lane, headers or {}, now)
+        logger.warning("LLM rate limited model=%s backing_off=%.2fs", lane.model, retry_after)
+
+
+class LLMScheduler:
+    """
+    Central admission point for provider calls.
+
+    Each model has token buckets for requests and tokens per minute. Waiters are served
+    strictly by priority class, then FIFO. Admission is rejected up front (503 with
+    Retry-After) when the class's queue share is full or the estimated wait exceeds the
+    caller's deadline; provider rate-limit headers pause or shrink the buckets.
+
+    Admitted calls run on the scheduler's own pool of LLM_MAX_CONCURRENCY threads, so a
+    slow provider cannot take over the default executor that transcription, SQLite and
+    file I/O share.
+    """
+
+    def __init__(self) -> None:
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+        self._executor: ThreadPoolExecutor | None = None
+        self._running = 0
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            rpm, tpm = settings.llm_model_limits.get(
+                model,
+                (settings.llm_default_rpm, settings.llm_default_tpm),
+            )
+            lane = _ModelLane(model, rpm, tpm)
+            self._lanes[model] = lane
+        return lane
+
+    @asynccontextmanager
+    async def reserve(
+        self,
+        model: str,
+        tokens: int,
+        priority: int = PRIORITY_LIVE,
+        deadline_seconds: float | None = None,
+    ) -> AsyncIterator[_Slot]:
+        lane = self._lane(model)
+        await self._admit(lane, tokens, priority, deadline_seconds or _default_deadline(priority))
+        yield _Slot(lane, tokens)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking provider call (or stream read) on the LLM thread pool."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.llm_max_concurrency),
+                thread_name_prefix="llm",
+            )
+        self._running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._running -= 1
+
+    def executor_stats(self) -> Dict[str, int]:
+        # `in_use` counts calls handed to the pool, running or waiting for a thread.
+        return {"max_workers": max(1, settings.llm_max_concurrency), "in_use": self._running}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _admit(self, lane: _ModelLane, tokens: int, priority: int, deadline: float) -> None:
+        queue_share = int(settings.llm_queue_limit * _QUEUE_SHARE.get(priority, 0.25))
+        if len(lane.queue) >= max(1, queue_share):
+            lane.stats["rejected_queue_full"] += 1
+            raise _overloaded(lane, "queue full", tokens, priority)
+        estimate = lane.estimate_wait(tokens, priority, time.monotonic())
+        if estimate > deadline:
+            lane.stats["rejected_deadline"] += 1
+            raise _overloaded(lane, "deadline", tokens, priority, estimate)
+
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(lane.queue, (priority, next(self._seq), waiter))
+        lane.dispatch()
+        try:
+            await asyncio.wait_for(waiter.future, timeout=deadline)
+        except asyncio.TimeoutError:
+            lane.remove(waiter)
+            lane.stats["timed_out"] += 1
+            raise _overloaded(lane, "timed out", tokens, priority)
+        except asyncio.CancelledError:
+            lane.remove(waiter)
+            raise
+        lane.stats["admitted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        result: Dict[str, Any] = {}
+        for model, lane in self._lanes.items():
+            lane.delay_for(0, now)
+            queued = {name: 0 for name in _PRIORITY_NAMES.values()}
+            for priority, _, _ in lane.queue:
+                queued[_PRIORITY_NAMES.get(priority, "batch")] += 1
+            result[model] = {
+                **lane.stats,
+                "queued": queued,
+                "requests_available": round(lane.requests.level, 1),
+                "tokens_available": round(lane.tokens.level),
+                "blocked_for_seconds": round(max(0.0, lane.blocked_until - now), 2),
+            }
+        return result
+
+
+def _default_deadline(priority: int) -> float:
+    if priority == PRIORITY_LIVE:
+        return float(settings.llm_live_deadline_seconds)
+    if priority == PRIORITY_PREFETCH:
+        return float(settings.llm_prefetch_deadline_seconds)
+    return float(settings.llm_batch_deadline_seconds)
+
+
+def _overloaded(
+    lane: _ModelLane,
+    reason: str,
+    tokens: int,
+    priority: int,
+    estimate: float | None = None,
+) -> HTTPException:
+    if estimate is None:
+        estimate = lane.estimate_wait(tokens, priority, time.monotonic())
+    logger.warning(
+        "LLM call rejected model=%s priority=%s reason=%s est_wait=%.2fs",
+        lane.model,
+        _PRIORITY_NAMES.get(priority, priority),
+        reason,
+        estimate,
+    )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="AI service is busy. Please retry shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(estimate)))},
+    )
+
+
+def _apply_rate_limit_headers(lane: _ModelLane, headers: Mapping[str, str], now: float) -> None:
+    remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+    remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+    if remaining_requests is not None:
+        lane.requests.cap(remaining_requests)
+        if remaining_requests <= 0:
+            lane.block(_parse_duration(headers.get("x-ratelimit-reset-requests")), now)
+    if remaining_tokens is not None:
+        lane.tokens.cap(remaining_tokens)
+        if remaining_tokens <= 0:
+            lane.block(_parse_duration(headers.get("x-ratelimit-reset-tokens")), now)
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> float | None:
+    retry_ms = _header_float(headers, "retry-after-ms")
+    if retry_ms is not None:
+        return retry_ms / 1000.0
+    return _header_float(headers, "retry-after")
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    raw = headers.get(name)
+    if raw is None:
+        return None
+    try:
+        return float(str(raw).strip())
+    except ValueError:
+        return None
+
+
+def _parse_duration(value: str | None) -> float:
+    """Parse provider reset durations such as `20ms`, `1s` or `6m0s`."""
+    total = 0.0
+    for amount, unit in _DURATION_PART.findall(value or ""):
+        total += float(amount) * {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}[unit]
+    return total
+
+
+llm_scheduler = LLMScheduler()
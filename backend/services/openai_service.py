@@ -1,17 +1,21 @@
+import asyncio
 import json
 import logging
-import os
 import time
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Tuple
 
-from dotenv import load_dotenv
-from openai import OpenAI
+from fastapi import HTTPException, status
 
 from core.config import settings
+from services.answer_prescreen import prescreen_answer
+from services import llm_routing
+from services.llm_providers import ChatResult, ChatStream, ProviderRateLimitError, get_provider
+from services.llm_resilience import call_with_breaker, get_breaker, get_breaker_status, hedged
+from services.llm_scheduler import PRIORITY_LIVE, PRIORITY_PREFETCH, llm_scheduler
 from services.usage_service import check_token_limit, update_usage
-from utils.prompts import CONVERSATION_FOLLOWUP_PROMPT, EVALUATION_PROMPT
+from utils.prompts import CONVERSATION_FOLLOWUP_PROMPT, CONVERSATION_SUMMARY_PROMPT, EVALUATION_PROMPT
+from utils.streaming_json import StreamingJsonObjectParser
 
-_client: OpenAI | None = None
 logger = logging.getLogger(__name__)
 
 # In-memory cache to reduce repeated question generation costs.
@@ -19,36 +23,175 @@ _QUESTION_CACHE: Dict[Tuple[str, str], Dict[str, Any]] = {}
 _QUESTION_CACHE_TTL_SECONDS = 180
 
 
-def get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        load_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY is not set")
-        _client = OpenAI(api_key=api_key)
-    return _client
+class _SingleFlight:
+    """
+    Collapse concurrent calls that share a key onto one in-flight task.
 
+    - The first caller for a key starts the flight; later callers await the same task.
+    - Errors propagate to every waiter and are not cached, so the next call retries.
+    - A cancelled waiter only stops waiting; the flight keeps running for the others
+      (and to warm the question cache) because the underlying HTTP call cannot be
+      interrupted once it has been handed to a worker thread.
+    """
 
-def _extract_total_tokens(response: Any) -> int:
-    usage = getattr(response, "usage", None)
-    total = getattr(usage, "total_tokens", 0) if usage is not None else 0
-    try:
-        return max(0, int(total or 0))
-    except (TypeError, ValueError):
-        return 0
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {"flights": 0, "collapsed": 0, "errors": 0, "cancelled_waiters": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, k=key: self._finish(k, done))
+            self._stats["flights"] += 1
+        else:
+            self._stats["collapsed"] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self._stats["cancelled_waiters"] += 1
+            raise
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+        # Retrieve the exception so orphaned flights do not log "never retrieved".
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "in_flight": len(self._inflight)}
 
 
-def _track_usage_if_needed(user_id: str | None, response: Any, endpoint: str) -> None:
+_QUESTION_FLIGHTS = _SingleFlight()
+
+
+def _track_usage_if_needed(user_id: str | None, tokens: int | None, endpoint: str) -> None:
     if not user_id:
         return
-    tokens = _extract_total_tokens(response)
-    if tokens > 0:
+    if tokens and tokens > 0:
         update_usage(user_id=user_id, tokens=tokens, endpoint=endpoint)
 
 
+def _estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    # ~4 characters per token for the prompt, plus the completion budget.
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in kwargs.get("messages", []))
+    return prompt_chars // 4 + int(kwargs.get("max_tokens") or 0)
+
+
+async def _create_chat_completion(
+    *,
+    operation: str,
+    route: str,
+    priority: int = PRIORITY_LIVE,
+    hedge: bool = False,
+    **kwargs: Any,
+) -> Any:
+    """
+    Single entry point for chat completions.
+
+    - `route` selects model, max_tokens and temperature from the LLM_ROUTES table; a
+      route whose primary model breaches its latency SLO is served by its fallback model.
+    - The operation's circuit breaker fails fast while the provider is unhealthy.
+    - Each attempt is admitted by the shared scheduler (per-model RPM/TPM budgets and
+      priority classes) and bounded by the operation's deadline.
+    - `hedge=True` fires a duplicate attempt after LLM_HEDGE_DELAY_MS to cut tail latency.
+    """
+    plan = llm_routing.resolve(route)
+    request = {
+        **kwargs,
+        "model": plan.model,
+        "max_tokens": plan.max_tokens,
+        "temperature": plan.temperature,
+    }
+    timeout = _deadline_for(operation)
+
+    async def attempt() -> Tuple[Any, float]:
+        return await _scheduled_completion(request, priority=priority, timeout=timeout)
+
+    async def call() -> Tuple[Any, float]:
+        if hedge and settings.llm_hedge_delay_ms > 0:
+            return await hedged(attempt, settings.llm_hedge_delay_ms / 1000.0)
+        return await attempt()
+
+    try:
+        result, latency = await call_with_breaker(operation, call)
+    except HTTPException as exc:
+        # A deadline overrun (504) took at least `timeout`; count it toward the route's p95.
+        timed_out = exc.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        llm_routing.record(plan, timeout if timed_out else 0.0, None, ok=False, timed_out=timed_out)
+        raise
+    except Exception:
+        llm_routing.record(plan, 0.0, None, ok=False)
+        raise
+    # For streams this is time to first byte; their tokens arrive with the last chunk.
+    tokens = result.total_tokens if isinstance(result, ChatResult) else None
+    llm_routing.record(plan, latency, tokens)
+    return result
+
+
+async def _scheduled_completion(kwargs: Dict[str, Any], *, priority: int, timeout: float) -> Tuple[Any, float]:
+    """(result, provider latency in seconds); the latency excludes time queued in the scheduler."""
+    provider = get_provider()
+    request = dict(kwargs)
+    call = provider.stream_chat if request.pop("stream", False) else provider.chat
+    async with llm_scheduler.reserve(
+        model=request["model"],
+        tokens=_estimate_request_tokens(request),
+        priority=priority,
+        # Admission waits no longer than the operation's own deadline, not the priority class default.
+        deadline_seconds=timeout,
+    ) as slot:
+        started = time.perf_counter()
+        try:
+            # Providers are blocking; run them on the LLM pool so concurrent requests overlap.
+            # The provider gets the same timeout, so an abandoned call's thread ends with it.
+            result = await asyncio.wait_for(
+                llm_scheduler.run(call, timeout=timeout, **request),
+                timeout=timeout,
+            )
+        except ProviderRateLimitError as exc:
+            slot.rate_limited(exc.headers)
+            raise
+        # Streamed responses report usage in their final chunk, so keep the estimate for them.
+        slot.settle(result.headers, result.total_tokens if isinstance(result, ChatResult) else None)
+        return result, time.perf_counter() - started
+
+
+def _deadline_for(operation: str) -> float:
+    if operation == "/openai/evaluate":
+        return settings.llm_evaluation_timeout_seconds
+    return settings.llm_question_timeout_seconds
+
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    return llm_scheduler.stats()
+
+
+def get_executor_stats() -> Dict[str, int]:
+    return llm_scheduler.executor_stats()
+
+
+def get_resilience_status() -> Dict[str, Any]:
+    return get_breaker_status()
+
+
+def get_route_stats() -> Dict[str, Any]:
+    return llm_routing.get_route_stats()
+
+
+def get_singleflight_stats() -> Dict[str, int]:
+    return _QUESTION_FLIGHTS.stats()
+
+
+def _question_cache_key(role: str, difficulty: str) -> Tuple[str, str]:
+    return (role.strip().lower(), difficulty.strip().lower())
+
+
 def _get_cached_question(role: str, difficulty: str) -> str:
-    key = (role.strip().lower(), difficulty.strip().lower())
+    key = _question_cache_key(role, difficulty)
     entry = _QUESTION_CACHE.get(key)
     if not entry:
         return ""
@@ -59,7 +202,7 @@ def _get_cached_question(role: str, difficulty: str) -> str:
 
 
 def _set_cached_question(role: str, difficulty: str, question: str) -> None:
-    key = (role.strip().lower(), difficulty.strip().lower())
+    key = _question_cache_key(role, difficulty)
     _QUESTION_CACHE[key] = {"question": question, "ts": time.time()}
 
 
@@ -71,19 +214,27 @@ async def generate_ai_question(role: str, difficulty: str, user_id: str | None =
     if cached:
         return cached
 
-    client = get_client()
+    # Cohorts starting the same role/difficulty together share one generation call;
+    # only the caller that started the flight is charged for its tokens.
+    return await _QUESTION_FLIGHTS.do(
+        _question_cache_key(role, difficulty),
+        lambda: _generate_and_cache_question(role, difficulty, user_id),
+    )
+
+
+async def _generate_and_cache_question(role: str, difficulty: str, user_id: str | None) -> str:
     prompt = f"Generate one {difficulty} interview question for {role}. Return only the question."
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = await _create_chat_completion(
+        operation="/openai/question",
+        route="question",
+        hedge=True,
         messages=[
             {"role": "system", "content": "You generate concise technical interview questions."},
             {"role": "user", "content": prompt},
         ],
-        temperature=0.3,
-        max_tokens=150,
     )
-    _track_usage_if_needed(user_id=user_id, response=response, endpoint="/openai/question")
-    question = (response.choices[0].message.content or "").strip()
+    _track_usage_if_needed(user_id=user_id, tokens=response.total_tokens, endpoint="/openai/question")
+    question = response.content.strip()
     if question:
         _set_cached_question(role, difficulty, question)
     return question
@@ -94,34 +245,27 @@ async def generate_question(role: str) -> str:
     return await generate_ai_question(role=role, difficulty="medium", user_id=None)
 
 
-async def evaluate_answer(answer: str, question: str, user_id: str | None = None) -> Dict[str, Any]:
-    if user_id:
-        check_token_limit(user_id)
-    client = get_client()
+def _evaluation_messages(answer: str, question: str) -> List[Dict[str, str]]:
     prompt = EVALUATION_PROMPT.format(answer=answer, question=question)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a strict senior interviewer."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.3,
-        max_tokens=400,
-        response_format={"type": "json_object"},
-    )
-    _track_usage_if_needed(user_id=user_id, response=response, endpoint="/openai/evaluate")
-    raw_content = response.choices[0].message.content or ""
+    return [
+        {"role": "system", "content": "You are a strict senior interviewer."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _parse_evaluation_json(raw_content: str) -> Dict[str, Any]:
     try:
-        data = json.loads(raw_content)
+        return json.loads(raw_content)
     except json.JSONDecodeError:
         raw_content = raw_content.strip().strip("`")
         start = raw_content.find("{")
         end = raw_content.rfind("}") + 1
         if start != -1 and end != -1:
-            data = json.loads(raw_content[start:end])
-        else:
-            raise
+            return json.loads(raw_content[start:end])
+        raise
+
 
+def _normalize_evaluation(data: Dict[str, Any], answer: str) -> Dict[str, Any]:
     data.setdefault("score", 0)
     data.setdefault("confidence", 0)
     data.setdefault("strengths", [])
@@ -129,22 +273,13 @@ async def evaluate_answer(answer: str, question: str, user_id: str | None = None
     data.setdefault("improvements", [])
     data.setdefault("verdict", "fail")
     data.setdefault("feedback", "")
-    try:
-        data["score"] = int(data.get("score", 0))
-    except (TypeError, ValueError):
-        data["score"] = 0
-    try:
-        data["confidence"] = int(data.get("confidence", 0))
-    except (TypeError, ValueError):
-        data["confidence"] = 0
-    data["score"] = max(0, min(10, data["score"]))
-    data["confidence"] = max(0, min(100, data["confidence"]))
+    data["score"] = _clamp_int(data.get("score", 0), 0, 10)
+    data["confidence"] = _clamp_int(data.get("confidence", 0), 0, 100)
     for key in ["strengths", "weaknesses", "improvements"]:
         if not isinstance(data.get(key), list):
             val = data.get(key)
             data[key] = [str(val)] if val is not None else []
-    verdict = str(data.get("verdict", "fail")).strip().lower()
-    data["verdict"] = "pass" if verdict == "pass" else "fail"
+    data["verdict"] = _normalize_verdict(data.get("verdict", "fail"))
     if not isinstance(data.get("feedback"), str):
         data["feedback"] = str(data["feedback"])
     if not answer.strip():
@@ -163,17 +298,125 @@ async def evaluate_answer(answer: str, question: str, user_id: str | None = None
     return data
 
 
-async def generate_followup_from_history(
-    role: str,
-    history: List[Dict[str, Any]],
+def _clamp_int(value: Any, low: int, high: int) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    return max(low, min(high, number))
+
+
+def _normalize_verdict(value: Any) -> str:
+    return "pass" if str(value).strip().lower() == "pass" else "fail"
+
+
+async def evaluate_answer(answer: str, question: str, user_id: str | None = None) -> Dict[str, Any]:
+    canned = prescreen_answer(answer, question)
+    if canned is not None:
+        return canned
+    if user_id:
+        check_token_limit(user_id)
+    response = await _create_chat_completion(
+        operation="/openai/evaluate",
+        route="evaluation",
+        messages=_evaluation_messages(answer, question),
+        response_format={"type": "json_object"},
+    )
+    _track_usage_if_needed(user_id=user_id, tokens=response.total_tokens, endpoint="/openai/evaluate")
+    raw_content = response.content
+    return _normalize_evaluation(_parse_evaluation_json(raw_content), answer)
+
+
+async def stream_evaluation(
+    answer: str,
+    question: str,
     user_id: str | None = None,
-) -> str:
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of evaluate_answer.
+
+    Yields `("field", (name, value))` as each rubric field completes,
+    `("feedback_delta", text)` while the feedback string is being written, and
+    finally `("evaluation", data)` with the same normalized dict evaluate_answer returns.
+
+    The whole stream shares the evaluation deadline, so a stalled provider stream ends
+    with a 504; errors raised mid-stream count against the operation's breaker.
+    """
+    canned = prescreen_answer(answer, question)
+    if canned is not None:
+        for key in ("score", "verdict", "feedback"):
+            yield "field", (key, canned[key])
+        yield "evaluation", canned
+        return
     if user_id:
         check_token_limit(user_id)
-    client = get_client()
-    trimmed_history = history[-8:]
+    stream: ChatStream = await _create_chat_completion(
+        operation="/openai/evaluate",
+        route="evaluation",
+        messages=_evaluation_messages(answer, question),
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    parser = StreamingJsonObjectParser()
+    raw_parts: List[str] = []
+    chunks = iter(stream)
+    deadline = time.monotonic() + _deadline_for("/openai/evaluate")
+    try:
+        while True:
+            chunk = await _next_chunk(chunks, deadline)
+            if chunk is None:
+                break
+            if chunk.total_tokens is not None:
+                _track_usage_if_needed(user_id=user_id, tokens=chunk.total_tokens, endpoint="/openai/evaluate")
+            if not chunk.text:
+                continue
+            raw_parts.append(chunk.text)
+            for kind, key, payload in parser.feed(chunk.text):
+                if kind == "delta" and key == "feedback":
+                    yield "feedback_delta", payload
+                elif kind == "value":
+                    yield "field", (key, _normalize_streamed_field(key, payload, answer))
+    finally:
+        stream.close()
+    yield "evaluation", _normalize_evaluation(_parse_evaluation_json("".join(raw_parts)), answer)
+
+
+async def _next_chunk(chunks: Any, deadline: float) -> Any:
+    # Each chunk read blocks on the network, so pull it on the LLM pool, within the deadline.
+    breaker = get_breaker("/openai/evaluate")
+    try:
+        return await asyncio.wait_for(
+            llm_scheduler.run(next, chunks, None),
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+    except asyncio.TimeoutError:
+        breaker.record_failure()
+        logger.warning("LLM stream deadline exceeded operation=/openai/evaluate")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="AI service timed out. Please retry.",
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+
+
+def _normalize_streamed_field(key: str, value: Any, answer: str) -> Any:
+    # Mirror _normalize_evaluation so streamed fields never disagree with the final result.
+    if key == "score":
+        return _clamp_int(value, 0, 10) if answer.strip() else 0
+    if key == "confidence":
+        return _clamp_int(value, 0, 100)
+    if key == "verdict":
+        return _normalize_verdict(value) if answer.strip() else "fail"
+    return value
+
+
+def _format_history_turns(turns: List[Dict[str, Any]]) -> str:
     history_text_lines = []
-    for idx, item in enumerate(trimmed_history, start=1):
+    for idx, item in enumerate(turns, start=1):
         q = item.get("question", "").strip()
         a = item.get("answer", "").strip()
         s = item.get("score")
@@ -181,19 +424,68 @@ async def generate_followup_from_history(
         if s is not None:
             line += f"\n   Score: {s}/10"
         history_text_lines.append(line)
-    history_text = "\n\n".join(history_text_lines) or "No previous questions yet."
+    return "\n\n".join(history_text_lines)
+
+
+async def generate_followup_from_history(
+    role: str,
+    history: List[Dict[str, Any]],
+    user_id: str | None = None,
+    *,
+    summary: str = "",
+    difficulty: str = "",
+) -> str:
+    """
+    Generate the next question from the conversation so far.
+
+    `summary` is a compact digest of earlier turns (see services.conversation_memory);
+    when given, `history` only needs the last few verbatim turns, so the prompt stays
+    roughly constant in size however long the interview runs.
+    """
+    if user_id:
+        check_token_limit(user_id)
+    history_text = _format_history_turns(history[-8:])
+    if summary:
+        history_text = (
+            f"Summary of earlier discussion:\n{summary}\n\nMost recent turns:\n"
+            f"{history_text or 'None yet.'}"
+        )
+    history_text = history_text or "No previous questions yet."
+    if difficulty:
+        history_text = f"Target difficulty: {difficulty}\n\n{history_text}"
     prompt = CONVERSATION_FOLLOWUP_PROMPT.format(role=role, history=history_text)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = await _create_chat_completion(
+        operation="/openai/followup-history",
+        route="followup_history",
+        hedge=True,
         messages=[
             {"role": "system", "content": "You orchestrate a structured technical interview."},
             {"role": "user", "content": prompt},
         ],
-        temperature=0.3,
-        max_tokens=150,
     )
-    _track_usage_if_needed(user_id=user_id, response=response, endpoint="/openai/followup-history")
-    return (response.choices[0].message.content or "").strip()
+    _track_usage_if_needed(user_id=user_id, tokens=response.total_tokens, endpoint="/openai/followup-history")
+    return response.content.strip()
+
+
+async def summarize_interview_turns(previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+    """
+    Fold `turns` into `previous_summary`; runs at prefetch priority, off the candidate's
+    path. Background work, so the tokens are not billed to the candidate's daily quota.
+    """
+    prompt = CONVERSATION_SUMMARY_PROMPT.format(
+        summary=previous_summary or "None yet.",
+        turns=_format_history_turns(turns),
+    )
+    response = await _create_chat_completion(
+        operation="/openai/summary",
+        route="summary",
+        priority=PRIORITY_PREFETCH,
+        messages=[
+            {"role": "system", "content": "You keep concise notes on a technical interview."},
+            {"role": "user", "content": prompt},
+        ],
+    )
+    return response.content.strip()
 
 
 async def generate_followup_question(
@@ -205,7 +497,6 @@ async def generate_followup_question(
 ) -> str:
     if user_id:
         check_token_limit(user_id)
-    client = get_client()
     prompt = (
         "Based on this question and answer, generate a follow-up interview question.\n\n"
         f"Role: {role}\n"
@@ -214,17 +505,17 @@ async def generate_followup_question(
         f"Answer: {user_answer}\n\n"
         "Return only the question."
     )
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = await _create_chat_completion(
+        operation="/openai/followup",
+        route="followup",
+        hedge=True,
         messages=[
             {"role": "system", "content": "You generate strict, role-relevant interview questions."},
             {"role": "user", "content": prompt},
         ],
-        temperature=0.3,
-        max_tokens=150,
     )
-    _track_usage_if_needed(user_id=user_id, response=response, endpoint="/openai/followup")
-    return (response.choices[0].message.content or "").strip()
+    _track_usage_if_needed(user_id=user_id, tokens=response.total_tokens, endpoint="/openai/followup")
+    return response.content.strip()
 
 
 async def generate_next_question_from_previous(
@@ -0,0 +1,212 @@
+import json
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.database import ProctoringDailyStats, ProctoringSessionStats, get_db, utc_now
+
+_DAY_COUNTERS = (
+    "sessions_started",
+    "sessions_terminated",
+    "sessions_with_violation",
+    "first_violation_seconds_total",
+    "counted_total",
+    "uncounted_total",
+)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands DateTime columns back without a timezone; everything here is UTC.
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _parse(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return _aware(datetime.fromisoformat(value))
+    except ValueError:
+        return None
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return _aware(value).isoformat() if value else None
+
+
+def _earliest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [_aware(value) for value in values if value is not None]
+    return min(present) if present else None
+
+
+def _latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [_aware(value) for value in values if value is not None]
+    return max(present) if present else None
+
+
+def apply_batch(db: Session, sessions: Dict[str, Dict[str, Any]], events: List[Dict[str, Any]]) -> None:
+    """
+    Fold one proctoring store flush into the per-session and per-day counters.
+
+    Runs inside the flush's transaction (the caller commits), so counters always match
+    the stored events. Each event adds its run length (`count`) to its type's counted
+    or uncounted total; a session's first violation and termination are counted once.
+    """
+    by_session: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        by_session.setdefault(event["session_id"], []).append(event)
+    session_ids = list(set(sessions) | set(by_session))
+    if not session_ids:
+        return
+    now = utc_now()
+    existing = {
+        row.session_id: row
+        for row in db.scalars(select(ProctoringSessionStats).where(ProctoringSessionStats.session_id.in_(session_ids)))
+    }
+    days: Dict[str, Dict[str, Any]] = {}
+
+    def day(moment: datetime) -> Dict[str, Any]:
+        counters = days.setdefault(_aware(moment).date().isoformat(), dict.fromkeys(_DAY_COUNTERS, 0))
+        counters.setdefault("types", {})
+        return counters
+
+    for session_id in session_ids:
+        info = sessions.get(session_id, {})
+        session_events = by_session.get(session_id, [])
+        row = existing.get(session_id)
+        if row is None:
+            # A session starts at its earliest event (client clock, like the violations it is
+            # compared with), or when the server first heard of it if no event has a time.
+            started_at = _earliest(*(event["occurred_at"] for event in session_events)) or _earliest(
+                info.get("created_at"), *(event["received_at"] for event in session_events)
+            )
+            row = ProctoringSessionStats(
+                session_id=session_id,
+                candidate_id=info.get("candidate_id") or session_events[0]["candidate_id"],
+                started_at=started_at,
+                counted_total=0,
+                uncounted_total=0,
+                terminated=False,
+                type_counts_json="{}",
+            )
+            db.add(row)
+            day(started_at)["sessions_started"] += 1
+        had_violation = row.first_violation_at is not None
+        types = json.loads(row.type_counts_json or "{}")
+        for event in session_events:
+            first = _aware(event["occurred_at"] or event["received_at"])
+            last = _parse(event.get("last_ts")) or first
+            bucket = "counted" if event["counted"] else "uncounted"
+            occurrences = event["count"]
+
+            per_type = types.setdefault(event["type"], {"counted": 0, "uncounted": 0, "first_at": None, "last_at": None})
+            per_type[bucket] += occurrences
+            per_type["first_at"] = _iso(_earliest(_parse(per_type["first_at"]), first))
+            per_type["last_at"] = _iso(_latest(_parse(per_type["last_at"]), last))
+            if event["counted"]:
+                row.counted_total += occurrences
+                row.first_violation_at = _earliest(row.first_violation_at, first)
+            else:
+                row.uncounted_total += occurrences
+            row.first_event_at = _earliest(row.first_event_at, first)
+            row.last_event_at = _latest(row.last_event_at, last)
+
+            counters = day(first)
+            counters[f"{bucket}_total"] += occurrences
+            day_type = counters["types"].setdefault(event["type"], {"counted": 0, "uncounted": 0})
+            day_type[bucket] += occurrences
+        row.type_counts_json = json.dumps(types, sort_keys=True)
+
+        if not had_violation and row.first_violation_at is not None:
+            counters = day(row.started_at)
+            counters["sessions_with_violation"] += 1
+            counters["first_violation_seconds_total"] += max(
+                0.0, (_aware(row.first_violation_at) - _aware(row.started_at)).total_seconds()
+            )
+        if info.get("terminated") and not row.terminated:
+            row.terminated = True
+            day(row.started_at)["sessions_terminated"] += 1
+        row.updated_at = now
+
+    existing_days = {
+        row.day: row for row in db.scalars(select(ProctoringDailyStats).where(ProctoringDailyStats.day.in_(list(days))))
+    }
+    for key, delta in days.items():
+        row = existing_days.get(key)
+        if row is None:
+            row = ProctoringDailyStats(day=key, type_counts_json="{}", **dict.fromkeys(_DAY_COUNTERS, 0))
+            db.add(row)
+        for name in _DAY_COUNTERS:
+            setattr(row, name, getattr(row, name) + delta[name])
+        types = json.loads(row.type_counts_json or "{}")
+        for event_type, counts in delta["types"].items():
+            per_type = types.setdefault(event_type, {"counted": 0, "uncounted": 0})
+            per_type["counted"] += counts["counted"]
+            per_type["uncounted"] += counts["uncounted"]
+        row.type_counts_json = json.dumps(types, sort_keys=True)
+        row.updated_at = now
+
+
+def session_summary(session_id: str) -> Optional[Dict[str, Any]]:
+    """One session's counters (a primary-key lookup), or None if nothing was stored for it."""
+    with get_db() as db:
+        row = db.get(ProctoringSessionStats, session_id)
+        if row is None:
+            return None
+        first_violation = _aware(row.first_violation_at)
+        return {
+            "session_id": row.session_id,
+            "candidate_id": row.candidate_id,
+            "terminated": row.terminated,
+            "counted": row.counted_total,
+            "uncounted": row.uncounted_total,
+            "started_at": _iso(row.started_at),
+            "first_event_at": _iso(row.first_event_at),
+            "last_event_at": _iso(row.last_event_at),
+            "first_violation_at": _iso(first_violation),
+            "time_to_first_violation_seconds": (
+                round(max(0.0, (first_violation - _aware(row.started_at)).total_seconds()), 3)
+                if first_violation
+                else None
+            ),
+            "by_type": json.loads(row.type_counts_json or "{}"),
+            "updated_at": _iso(row.updated_at),
+        }
+
+
+def _rates(counters: Dict[str, Any]) -> Dict[str, Any]:
+    started = counters["sessions_started"]
+    with_violation = counters["sessions_with_violation"]
+    return {
+        **counters,
+        "termination_rate": round(counters["sessions_terminated"] / started, 4) if started else None,
+        "avg_time_to_first_violation_seconds": (
+            round(counters["first_violation_seconds_total"] / with_violation, 3) if with_violation else None
+        ),
+    }
+
+
+def daily_summaries(since: date, until: date) -> Dict[str, Any]:
+    """Per-day counters for [since, until] (one row per day) and their totals."""
+    with get_db() as db:
+        rows = db.scalars(
+            select(ProctoringDailyStats)
+            .where(ProctoringDailyStats.day >= since.isoformat(), ProctoringDailyStats.day <= until.isoformat())
+            .order_by(ProctoringDailyStats.day)
+        ).all()
+        days = []
+        totals: Dict[str, Any] = {**dict.fromkeys(_DAY_COUNTERS, 0), "by_type": {}}
+        for row in rows:
+            counters = {name: getattr(row, name) for name in _DAY_COUNTERS}
+            by_type = json.loads(row.type_counts_json or "{}")
+            days.append({"day": row.day, **_rates(counters), "by_type": by_type})
+            for name in _DAY_COUNTERS:
+                totals[name] += counters[name]
+            for event_type, counts in by_type.items():
+                per_type = totals["by_type"].setdefault(event_type, {"counted": 0, "uncounted": 0})
+                per_type["counted"] += counts["counted"]
+                per_type["uncounted"] += counts["uncounted"]
+        return {"since": since.isoformat(), "until": until.isoformat(), "days": days, "totals": _rates(totals)}
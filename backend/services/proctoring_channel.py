@@ -0,0 +1,140 @@
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from models.schemas import ProctoringLogRequest
+from services.proctoring_ingest import proctoring_ingest
+from services.proctoring_sink import proctoring_sink
+
+_stats: Counter = Counter()
+
+MAX_TYPE_LENGTH = 64
+MAX_MESSAGE_LENGTH = 1000
+
+
+def _timestamp(value: Any) -> str:
+    # Epoch milliseconds (compact) or an ISO string, stored as ISO like /proctor-log events.
+    if isinstance(value, str) and value:
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            moment = datetime.fromtimestamp(value / 1000.0, tz=timezone.utc)
+        except (OverflowError, OSError) as exc:
+            # Out of the platform's range (e.g. 1e20 or inf); a bad frame, not a server error.
+            raise ValueError("timestamp is out of range") from exc
+        return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    raise ValueError("timestamp must be epoch milliseconds or an ISO string")
+
+
+def decode_event(frame: Any) -> tuple[int, Dict[str, Any]]:
+    """`[seq, ts_ms, type, message, counted]` with optional trailing `metadata` -> (seq, event dict)."""
+    if not isinstance(frame, list) or len(frame) not in (5, 6):
+        raise ValueError("event frame must be [seq, ts, type, message, counted, metadata?]")
+    seq, ts, event_type, message, counted = frame[:5]
+    metadata = frame[5] if len(frame) == 6 else {}
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        raise ValueError("seq must be a non-negative integer")
+    if not isinstance(event_type, str) or not event_type or len(event_type) > MAX_TYPE_LENGTH:
+        raise ValueError("type must be a non-empty string")
+    if not isinstance(message, str) or len(message) > MAX_MESSAGE_LENGTH:
+        raise ValueError("message must be a string")
+    if not isinstance(metadata, dict):
+        raise ValueError("metadata must be an object")
+    return seq, {
+        "timestamp": _timestamp(ts),
+        "type": event_type,
+        "message": message,
+        "counted": bool(counted),
+        "metadata": metadata,
+    }
+
+
+class ProctoringChannel:
+    """
+    Server-side state of one /proctor/ws connection.
+
+    Events are buffered while they are contiguous and handed to proctoring ingest as one
+    batch once PROCTOR_WS_BATCH_EVENTS have arrived or the oldest has waited
+    PROCTOR_WS_BATCH_MS. Each batch is answered with an `ack` carrying the session's
+    acknowledged sequence (and `backoff_ms` while the log writer is behind), or with
+    `resend` when the batch started past it.
+    """
+
+    def __init__(self, meta: ProctoringLogRequest) -> None:
+        self.meta = meta
+        self._seq_start = 0
+        self._events: List[Dict[str, Any]] = []
+        self._first_at = 0.0
+        _stats["connections"] += 1
+
+    async def resume_seq(self) -> int:
+        return await proctoring_ingest.acked_seq(self.meta.candidate_id, self.meta.session_id)
+
+    async def feed(self, frame: List[Any]) -> List[Dict[str, Any]]:
+        """Buffer one event frame or a list of them; returns messages to send back."""
+        frames = frame if frame and isinstance(frame[0], list) else [frame]
+        _stats["frames"] += 1
+        replies: List[Dict[str, Any]] = []
+        for item in frames:
+            seq, event = decode_event(item)
+            if self._events and seq != self._seq_start + len(self._events):
+                # Not contiguous with the buffer: ingest what we have, then start over here.
+                replies.extend(await self.flush())
+            if not self._events:
+                self._seq_start = seq
+                self._first_at = time.monotonic()
+            self._events.append(event)
+            _stats["events"] += 1
+            if len(self._events) >= max(1, settings.proctor_ws_batch_events):
+                replies.extend(await self.flush())
+        return replies
+
+    async def update_status(self, status: str, violations: int, terminated: bool) -> List[Dict[str, Any]]:
+        replies = await self.flush()
+        self.meta = self.meta.model_copy(update={"status": status, "violations": violations, "terminated": terminated})
+        # An empty batch at the acknowledged sequence records just the state change.
+        result = await proctoring_ingest.ingest_events(self.meta, await self.resume_seq(), [])
+        replies.append(self._ack(result.acked_seq))
+        return replies
+
+    async def ack(self) -> Dict[str, Any]:
+        return self._ack(await self.resume_seq())
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Time left before the buffered batch must be flushed; None when nothing is buffered."""
+        if not self._events:
+            return None
+        return max(0.0, self._first_at + settings.proctor_ws_batch_ms / 1000.0 - time.monotonic())
+
+    async def flush(self) -> List[Dict[str, Any]]:
+        if not self._events:
+            return []
+        events, self._events = self._events, []
+        result = await proctoring_ingest.ingest_events(self.meta, self._seq_start, events)
+        _stats["batches"] += 1
+        if self._seq_start > result.acked_seq:
+            _stats["resends"] += 1
+            return [{"type": "resend", "from": result.acked_seq}]
+        return [self._ack(result.acked_seq)]
+
+    def _ack(self, acked_seq: int) -> Dict[str, Any]:
+        ack: Dict[str, Any] = {"type": "ack", "acked_seq": acked_seq}
+        if proctoring_sink.stats()["pending_records"] > settings.proctor_ws_high_water:
+            _stats["backoffs"] += 1
+            ack["backoff_ms"] = settings.proctor_ws_backoff_ms
+        return ack
+
+    async def close(self) -> List[Dict[str, Any]]:
+        _stats["disconnects"] += 1
+        return await self.flush()
+
+
+def get_channel_stats() -> Dict[str, Any]:
+    events = _stats["events"]
+    return {
+        **_stats,
+        # Events per ingest batch over all connections (higher = less per-event overhead).
+        "events_per_batch": round(events / _stats["batches"], 2) if _stats["batches"] else 0.0,
+    }
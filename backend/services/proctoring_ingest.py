@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from models.schemas import ProctoringLogRequest
+from services.proctoring_sink import log_path_for, proctoring_sink
+from services.proctoring_store import proctoring_store
+
+logger = logging.getLogger(__name__)
+
+# A session re-reads its persisted state on a gap at most this often.
+_CATCH_UP_INTERVAL_SECONDS = 5.0
+
+
+@dataclass
+class _SessionState:
+    acked_seq: int = 0
+    status: str = ""
+    violations: int = 0
+    terminated: bool = False
+    # Fingerprints of recently accepted events (ordered set), for exact-duplicate detection.
+    recent: "OrderedDict[str, None]" = field(default_factory=OrderedDict)
+    # monotonic() of the last gap-triggered catch-up.
+    caught_up_at: float = float("-inf")
+
+
+@dataclass
+class IngestResult:
+    log_path: Path
+    # Event records actually written (after compaction).
+    events_stored: int
+    acked_seq: int
+    # Events at or below the acknowledged sequence, i.e. already received.
+    duplicates_skipped: int
+    # New events past the acknowledged sequence, before compaction.
+    events_accepted: int = 0
+    exact_duplicates_dropped: int = 0
+    runs_collapsed: int = 0
+
+
+class ProctoringIngest:
+    """
+    Sequence-numbered proctoring ingest.
+
+    Events are numbered per session from 0. A batch says where it starts (`seq_start`);
+    the server keeps the high-water mark per session (`acked_seq`: events below it are
+    stored) and writes only events past it, so clients can send just the delta since
+    the last acknowledgement. Batches without `seq_start` are treated as the full list
+    so far, so older clients re-sending everything no longer duplicate records.
+
+    A batch that starts beyond the high-water mark (an earlier batch was lost) is not
+    stored; the response's `acked_seq` tells the client where to resend from.
+
+    New events are then compacted before they are written: exact duplicates of any of
+    the session's last PROCTOR_DEDUP_WINDOW events are dropped, and runs of consecutive
+    identical events (same type, message, counted flag and metadata) become one event
+    with `count`, `first_ts` and `last_ts`, so violation totals survive compaction.
+
+    Per-session state is kept in memory for the last PROCTOR_TRACKED_SESSIONS sessions.
+    A session this process does not hold (after a restart, an eviction, or a batch that
+    went to another worker) is rebuilt from its persisted log before anything is acked,
+    so `acked_seq` never falls back to 0 for a session whose events are already stored.
+    A gap batch re-reads the log too, at most once per session every few seconds. The
+    log is read in a worker thread, without flushing the sink's queue.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: "OrderedDict[Tuple[str, str], _SessionState]" = OrderedDict()
+        self._stats = {
+            "batches": 0,
+            "events_received": 0,
+            "events_accepted": 0,
+            "duplicates_skipped": 0,
+            "gaps": 0,
+            "sessions_restored": 0,
+            "exact_duplicates_dropped": 0,
+            "runs_collapsed": 0,
+            "records_written": 0,
+        }
+
+    async def ingest(self, payload: ProctoringLogRequest) -> IngestResult:
+        seq_start = payload.seq_start if payload.seq_start is not None else 0
+        return await self.ingest_events(payload, seq_start, [event.model_dump() for event in payload.events])
+
+    async def ingest_events(
+        self, meta: ProctoringLogRequest, seq_start: int, events: List[Dict[str, Any]]
+    ) -> IngestResult:
+        """
+        Ingest already-validated event dicts (timestamp, type, message, counted, metadata)
+        numbered from `seq_start`; session fields come from `meta`, its `events` are ignored.
+        """
+        state = await self._load(meta.candidate_id, meta.session_id)
+        if seq_start > state.acked_seq and time.monotonic() - state.caught_up_at >= _CATCH_UP_INTERVAL_SECONDS:
+            # Another worker may have stored the missing events; catch up before refusing.
+            state.caught_up_at = time.monotonic()
+            self._adopt(state, await asyncio.to_thread(_read_persisted, meta.candidate_id, meta.session_id))
+        return self._ingest(state, meta, seq_start, events)
+
+    def _ingest(
+        self, state: _SessionState, meta: ProctoringLogRequest, seq_start: int, events: List[Dict[str, Any]]
+    ) -> IngestResult:
+        received = len(events)
+        self._stats["batches"] += 1
+        self._stats["events_received"] += received
+
+        if seq_start > state.acked_seq:
+            self._stats["gaps"] += 1
+            logger.info(
+                "proctoring batch gap session=%s expected_seq=%s got_seq=%s",
+                meta.session_id,
+                state.acked_seq,
+                seq_start,
+            )
+            return IngestResult(log_path_for(meta.candidate_id), 0, state.acked_seq, 0)
+
+        skip = min(received, state.acked_seq - seq_start)
+        new_events = events[skip:]
+        self._stats["duplicates_skipped"] += skip
+        first_seq = seq_start + skip
+
+        changed = (meta.status, meta.violations, meta.terminated) != (
+            state.status,
+            state.violations,
+            state.terminated,
+        )
+        compacted, dropped, collapsed = self._compact(state, new_events, first_seq)
+        log_path = log_path_for(meta.candidate_id)
+        if compacted or changed:
+            record = _log_record(meta, compacted, first_seq, len(new_events))
+            proctoring_sink.write(meta.candidate_id, record)
+            proctoring_store.record(record)
+        state.acked_seq = max(state.acked_seq, seq_start + received)
+        state.status, state.violations, state.terminated = meta.status, meta.violations, meta.terminated
+        self._stats["events_accepted"] += len(new_events)
+        return IngestResult(
+            log_path,
+            events_stored=len(compacted),
+            acked_seq=state.acked_seq,
+            duplicates_skipped=skip,
+            events_accepted=len(new_events),
+            exact_duplicates_dropped=dropped,
+            runs_collapsed=collapsed,
+        )
+
+    async def acked_seq(self, candidate_id: str, session_id: str) -> int:
+        """Where a (re)connecting client should resume: events below this are stored."""
+        return (await self._load(candidate_id, session_id)).acked_seq
+
+    async def _load(self, candidate_id: str, session_id: str) -> _SessionState:
+        key = (candidate_id, session_id)
+        if key not in self._sessions:
+            persisted = await asyncio.to_thread(_read_persisted, candidate_id, session_id)
+            # Another request for the session may have loaded it while we were reading.
+            if key not in self._sessions:
+                self._adopt(self._session(key), persisted)
+        return self._session(key)
+
+    def _session(self, key: Tuple[str, str]) -> _SessionState:
+        state = self._sessions.get(key)
+        if state is None:
+            state = self._sessions[key] = _SessionState()
+            while len(self._sessions) > max(1, settings.proctor_tracked_sessions):
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        return state
+
+    def _adopt(self, state: _SessionState, persisted: Optional[_SessionState]) -> None:
+        # Only ever moves a session forward; what this process acked itself stays.
+        if persisted is None or persisted.acked_seq <= state.acked_seq:
+            return
+        state.acked_seq = persisted.acked_seq
+        state.status, state.violations, state.terminated = persisted.status, persisted.violations, persisted.terminated
+        state.recent.update(persisted.recent)
+        while len(state.recent) > max(0, settings.proctor_dedup_window):
+            state.recent.popitem(last=False)
+        self._stats["sessions_restored"] += 1
+
+    def _compact(
+        self, state: _SessionState, events: List[Dict[str, Any]], first_seq: int
+    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(records to write, exact duplicates dropped, events folded into a run)."""
+        window = max(0, settings.proctor_dedup_window)
+        out: List[Dict[str, Any]] = []
+        dropped = collapsed = 0
+        run_key = None
+        for index, record in enumerate(events):
+            fingerprint = json.dumps(record, sort_keys=True, ensure_ascii=True)
+            if fingerprint in state.recent:
+                dropped += 1
+                continue
+            if window:
+                state.recent[fingerprint] = None
+                while len(state.recent) > window:
+                    state.recent.popitem(last=False)
+            key = (record["type"], record["message"], record["counted"], json.dumps(record["metadata"], sort_keys=True))
+            if out and key == run_key:
+                previous = out[-1]
+                if "count" not in previous:
+                    previous.update(count=1, first_ts=previous["timestamp"])
+                previous["count"] += 1
+                previous["last_ts"] = record["timestamp"]
+                collapsed += 1
+                continue
+            run_key = key
+            # Sequence number of the (first) client event this record stands for.
+            out.append({"seq": first_seq + index, **record})
+        self._stats["exact_duplicates_dropped"] += dropped
+        self._stats["runs_collapsed"] += collapsed
+        self._stats["records_written"] += len(out)
+        return out, dropped, collapsed
+
+    def stats(self) -> Dict[str, Any]:
+        accepted = self._stats["events_accepted"]
+        return {
+            **self._stats,
+            # Event records written per new event accepted (lower is better).
+            "compaction_ratio": round(self._stats["records_written"] / accepted, 3) if accepted else 1.0,
+            "tracked_sessions": len(self._sessions),
+        }
+
+
+def _read_persisted(candidate_id: str, session_id: str) -> Optional[_SessionState]:
+    """A session's state as its log holds it (acked sequence, status, recent events); blocking."""
+    try:
+        records = proctoring_sink.read_session(candidate_id, session_id, flush=False)
+    except Exception:
+        logger.warning("could not read proctoring log to restore session=%s", session_id, exc_info=True)
+        return None
+    if not records:
+        return None
+    state = _SessionState()
+    for record in records:
+        if "seq_start" in record:
+            state.acked_seq = max(state.acked_seq, int(record["seq_start"]) + int(record.get("seq_count", 0)))
+        else:
+            # Pre-sequence record: the full event list so far.
+            state.acked_seq = max(state.acked_seq, len(record.get("events") or []))
+    last = records[-1]
+    state.status = last.get("status", "")
+    state.violations = int(last.get("violations", 0))
+    state.terminated = bool(last.get("terminated", False))
+    window = max(0, settings.proctor_dedup_window)
+    tail = [event for record in records for event in record.get("events") or []][-window:] if window else []
+    for event in tail:
+        base = {key: event.get(key) for key in ("type", "message", "counted")}
+        base["metadata"] = event.get("metadata") or {}
+        # A collapsed run stands for events at both ends of its time range.
+        for timestamp in dict.fromkeys((event.get("first_ts") or event.get("timestamp"), event.get("last_ts"))):
+            if timestamp:
+                fingerprint = json.dumps({"timestamp": timestamp, **base}, sort_keys=True, ensure_ascii=True)
+                state.recent[fingerprint] = None
+    return state
+
+
+def _log_record(
+    payload: ProctoringLogRequest,
+    events: List[Dict[str, Any]],
+    first_seq: int,
+    events_received: int,
+) -> Dict[str, Any]:
+    return {
+        "server_received_at": datetime.now(timezone.utc).isoformat(),
+        "candidate_id": payload.candidate_id,
+        "session_id": payload.session_id,
+        "role": payload.role,
+        "difficulty": payload.difficulty,
+        "mode": payload.mode,
+        "status": payload.status,
+        "violations": payload.violations,
+        "terminated": payload.terminated,
+        # This record covers client events [seq_start, seq_start + seq_count), after compaction.
+        "seq_start": first_seq,
+        "seq_count": events_received,
+        "events": events,
+    }
+
+
+proctoring_ingest = ProctoringIngest()
@@ -0,0 +1,254 @@
+import gzip
+import json
+import logging
+import mmap
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Codec -> file extension of rotated segments.
+CODECS = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+_zstd_warned = False
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def resolve_codec() -> str:
+    """PROCTOR_COMPRESSION, falling back to gzip when zstandard is not installed."""
+    global _zstd_warned
+    codec = settings.proctor_compression if settings.proctor_compression in CODECS else "gzip"
+    if codec == "zstd" and _zstandard() is None:
+        if not _zstd_warned:
+            logger.warning("PROCTOR_COMPRESSION=zstd but zstandard is not installed; using gzip")
+            _zstd_warned = True
+        return "gzip"
+    return codec
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if codec == "zstd":
+        return _zstandard().ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst proctoring segments")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def segments_for(active: Path) -> List[Path]:
+    """Rotated segments of one candidate's log, oldest first (names carry the rotation time)."""
+    if not active.parent.is_dir():
+        return []
+    return sorted(
+        path
+        for path in active.parent.glob(f"{active.stem}.*")
+        if path.name != active.name and not path.name.endswith((".idx", ".tmp"))
+    )
+
+
+# ── Active file index ─────────────────────────────────────────────────────────
+# JSON lines next to the file being appended: a header with the file's creation time,
+# then one {"s": session_id, "o": offset, "n": length} entry per session per flush.
+
+
+def write_index_header(handle, created_at: float) -> None:
+    handle.write(json.dumps({"created_at": created_at}).encode("ascii") + b"\n")
+
+
+def write_index_entries(handle, entries: List[Tuple[str, int, int]]) -> None:
+    handle.write(
+        b"".join(
+            json.dumps({"s": session_id, "o": offset, "n": length}, ensure_ascii=True).encode("ascii") + b"\n"
+            for session_id, offset, length in entries
+        )
+    )
+
+
+def index_created_at(active: Path) -> Optional[float]:
+    """Creation time from the active file's index header, without reading the entries."""
+    try:
+        with index_path(active).open("rb") as handle:
+            return float(json.loads(handle.readline())["created_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def read_active_index(active: Path) -> Tuple[Optional[float], List[Tuple[str, int, int]]]:
+    created_at: Optional[float] = None
+    entries: List[Tuple[str, int, int]] = []
+    try:
+        lines = index_path(active).read_bytes().splitlines()
+    except FileNotFoundError:
+        return None, entries
+    for line in lines:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if "created_at" in item:
+            created_at = float(item["created_at"])
+        elif "s" in item:
+            entries.append((str(item["s"]), int(item["o"]), int(item["n"])))
+    return created_at, entries
+
+
+# ── Rotation ──────────────────────────────────────────────────────────────────
+
+
+def rotate(active: Path, created_at: Optional[float] = None) -> Optional[Tuple[Path, int, int]]:
+    """
+    Compress `active` into a rotated segment and remove it.
+
+    Records are grouped by session and each session is compressed as its own gzip
+    member / zstd frame, so the sidecar index ({session_id: [offset, length, records]})
+    lets one session be read by slicing the segment without decompressing the rest.
+    Returns (segment, raw bytes, stored bytes), or None if there was nothing to rotate.
+    """
+    data = active.read_bytes() if active.exists() else b""
+    if not data.strip():
+        active.unlink(missing_ok=True)
+        index_path(active).unlink(missing_ok=True)
+        return None
+
+    groups: Dict[str, List[bytes]] = {}
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            session_id = str(json.loads(line).get("session_id", ""))
+        except (ValueError, AttributeError):
+            session_id = ""
+        groups.setdefault(session_id, []).append(line + b"\n")
+
+    codec = resolve_codec()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    segment = active.with_name(f"{active.stem}.{stamp}.jsonl{CODECS[codec]}")
+    sessions: Dict[str, List[int]] = {}
+    offset = 0
+    tmp = segment.with_name(segment.name + ".tmp")
+    with tmp.open("wb") as handle:
+        for session_id, lines in groups.items():
+            chunk = _compress(codec, b"".join(lines))
+            handle.write(chunk)
+            sessions[session_id] = [offset, len(chunk), len(lines)]
+            offset += len(chunk)
+        handle.flush()
+        os.fsync(handle.fileno())
+    index = {
+        "codec": codec,
+        "created_at": created_at,
+        "rotated_at": time.time(),
+        "records": sum(item[2] for item in sessions.values()),
+        "raw_bytes": len(data),
+        "sessions": sessions,
+    }
+    tmp_index = index_path(tmp)
+    tmp_index.write_text(json.dumps(index, ensure_ascii=True), encoding="utf-8")
+    os.replace(tmp_index, index_path(segment))
+    os.replace(tmp, segment)
+    active.unlink()
+    index_path(active).unlink(missing_ok=True)
+    return segment, len(data), offset
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+
+def _parse_lines(data: bytes) -> Iterator[Dict[str, Any]]:
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            logger.debug("skipping malformed proctoring log line")
+
+
+def _read_slices(path: Path, slices: List[Tuple[int, int]]) -> List[bytes]:
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return [mapped[offset : offset + length] for offset, length in slices]
+
+
+def _segment_index(segment: Path) -> Dict[str, Any]:
+    return json.loads(index_path(segment).read_text(encoding="utf-8"))
+
+
+def read_session(active: Path, session_id: str, legacy: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    All records of one session from a candidate's segments and active file, via the
+    indexes. `legacy` is an unindexed pre-sharding file, which has to be scanned.
+    """
+    records: List[Dict[str, Any]] = []
+    if legacy is not None and legacy.exists():
+        records.extend(record for record in _parse_lines(legacy.read_bytes()) if record.get("session_id") == session_id)
+    for segment in segments_for(active):
+        try:
+            index = _segment_index(segment)
+        except (OSError, ValueError) as exc:
+            logger.warning("proctoring segment index unreadable path=%s: %s", segment, exc)
+            continue
+        entry = index["sessions"].get(session_id)
+        if entry:
+            (chunk,) = _read_slices(segment, [(entry[0], entry[1])])
+            records.extend(_parse_lines(_decompress(index["codec"], chunk)))
+    _, entries = read_active_index(active)
+    wanted = [(offset, length) for entry_session, offset, length in entries if entry_session == session_id]
+    if wanted and active.exists():
+        for chunk in _read_slices(active, wanted):
+            records.extend(record for record in _parse_lines(chunk) if record.get("session_id") == session_id)
+    return records
+
+
+def _read_segment(segment: Path) -> Iterator[Dict[str, Any]]:
+    index = _segment_index(segment)
+    entries = sorted(index["sessions"].values())
+    for chunk in _read_slices(segment, [(offset, length) for offset, length, _ in entries]):
+        yield from _parse_lines(_decompress(index["codec"], chunk))
+
+
+def iter_records(logs_dir: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Every record under `logs_dir`: flat per-candidate files from before sharding first,
+    then each candidate's rotated segments (oldest first) followed by its active file.
+    """
+    if not logs_dir.is_dir():
+        return
+    for path in sorted(logs_dir.glob("*.jsonl")):
+        yield from _parse_lines(path.read_bytes())
+    for shard in sorted(path for path in logs_dir.iterdir() if path.is_dir()):
+        stems = sorted({path.name.split(".", 1)[0] for path in shard.iterdir() if path.is_file()})
+        for stem in stems:
+            active = shard / f"{stem}.jsonl"
+            for segment in segments_for(active):
+                try:
+                    yield from _read_segment(segment)
+                except Exception as exc:
+                    logger.warning("proctoring segment unreadable path=%s: %s", segment, exc)
+            if active.exists():
+                yield from _parse_lines(active.read_bytes())
@@ -0,0 +1,262 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List
+
+from core.config import settings
+from services.proctoring_segments import (
+    index_created_at,
+    index_path,
+    read_session,
+    resolve_codec,
+    rotate,
+    write_index_entries,
+    write_index_header,
+)
+from services.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+LOGS_DIR = Path(__file__).resolve().parents[1] / "logs" / "proctoring"
+
+
+def safe_candidate_id(candidate_id: str) -> str:
+    safe = "".join(c for c in candidate_id if c.isalnum() or c in ("-", "_"))
+    return safe or "unknown_candidate"
+
+
+def log_path_for(candidate_id: str) -> Path:
+    """Active log file of a candidate, sharded into directories by ID prefix."""
+    safe = safe_candidate_id(candidate_id)
+    return LOGS_DIR / safe[:2].lower() / f"{safe}.jsonl"
+
+
+@dataclass
+class _OpenLog:
+    data: BinaryIO
+    index: BinaryIO
+    created_at: float
+
+
+class ProctoringSink(WriteBehindBuffer):
+    """
+    Write-behind JSONL writer for proctoring records.
+
+    `write` only queues the record in memory; a background task drains the queue every
+    PROCTOR_FLUSH_INTERVAL_MS (or sooner once PROCTOR_FLUSH_BATCH_SIZE records are
+    waiting), appending each file's records in one write, grouped by session, with the
+    byte range of each session's records added to the file's sidecar index. Up to
+    PROCTOR_MAX_OPEN_FILES files stay open between flushes (least recently used are
+    closed first), and written data is fsynced every PROCTOR_FSYNC_INTERVAL_MS
+    (0 = after every flush).
+
+    Before appending, a file that has reached PROCTOR_ROTATE_BYTES or is older than
+    PROCTOR_ROTATE_SECONDS is rotated into a compressed segment (see proctoring_segments).
+    """
+
+    name = "proctoring sink"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._pending: Dict[Path, List[Dict[str, Any]]] = defaultdict(list)
+        self._pending_count = 0
+        self._handles: "OrderedDict[Path, _OpenLog]" = OrderedDict()
+        self._unsynced: set[Path] = set()
+        self._last_fsync = time.monotonic()
+        self._stats = {
+            "queued": 0,
+            "flushes": 0,
+            "records_written": 0,
+            "bytes_written": 0,
+            "fsyncs": 0,
+            "handle_evictions": 0,
+            "flush_failures": 0,
+            "rotations": 0,
+            "rotation_failures": 0,
+            "rotated_raw_bytes": 0,
+            "rotated_stored_bytes": 0,
+        }
+
+    def write(self, candidate_id: str, record: Dict[str, Any]) -> Path:
+        """Queue `record` for the candidate's log file and return that file's path."""
+        path = log_path_for(candidate_id)
+        with self._lock:
+            self._pending[path].append(record)
+            self._pending_count += 1
+            self._stats["queued"] += 1
+            full = self._pending_count >= settings.proctor_flush_batch_size
+        self._queued(full)
+        return path
+
+    def _flush_interval_ms(self) -> int:
+        return settings.proctor_flush_interval_ms
+
+    def flush(self, fsync: bool = False) -> int:
+        """
+        Write everything queued so far; blocking, safe to call from any thread. Returns
+        records written. Files are written one by one, so a failing file keeps only its
+        own records queued.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(list)
+                self._pending_count = 0
+            written = 0
+            for path, records in pending.items():
+                try:
+                    written += self._append(path, records)
+                except Exception as exc:
+                    self._close(path)
+                    with self._lock:
+                        # Put the records back in front of anything queued meanwhile.
+                        self._pending[path][:0] = records
+                        self._pending_count += len(records)
+                        self._stats["flush_failures"] += 1
+                    logger.warning("proctoring log write failed path=%s records=%s: %s", path, len(records), exc)
+            interval = settings.proctor_fsync_interval_ms / 1000.0
+            if fsync or time.monotonic() - self._last_fsync >= interval:
+                self._fsync_all()
+            if written:
+                self._stats["flushes"] += 1
+                self._stats["records_written"] += written
+            return written
+
+    def _append(self, path: Path, records: List[Dict[str, Any]]) -> int:
+        log = self._open(path)
+        if self._rotation_due(log):
+            self._rotate(path, log)
+            log = self._open(path)
+        groups: Dict[str, List[bytes]] = {}
+        for record in records:
+            line = json.dumps(record, ensure_ascii=True) + "\n"
+            groups.setdefault(str(record.get("session_id", "")), []).append(line.encode("ascii"))
+        offset = log.data.tell()
+        chunks = []
+        entries = []
+        for session_id, lines in groups.items():
+            chunk = b"".join(lines)
+            chunks.append(chunk)
+            entries.append((session_id, offset, len(chunk)))
+            offset += len(chunk)
+        data = b"".join(chunks)
+        log.data.write(data)
+        log.data.flush()
+        # Index entries go after the data they point at, so they never reference unwritten bytes.
+        write_index_entries(log.index, entries)
+        log.index.flush()
+        self._unsynced.add(path)
+        self._stats["bytes_written"] += len(data)
+        return len(records)
+
+    def _open(self, path: Path) -> _OpenLog:
+        log = self._handles.get(path)
+        if log is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            created_at = index_created_at(path)
+            data = path.open("ab")
+            index = index_path(path).open("ab")
+            if created_at is None:
+                created_at = time.time()
+                write_index_header(index, created_at)
+            log = self._handles[path] = _OpenLog(data, index, created_at)
+            while len(self._handles) > max(1, settings.proctor_max_open_files):
+                self._close(next(iter(self._handles)))
+                self._stats["handle_evictions"] += 1
+        self._handles.move_to_end(path)
+        return log
+
+    def _rotation_due(self, log: _OpenLog) -> bool:
+        size = log.data.tell()
+        if size == 0:
+            return False
+        age = time.time() - log.created_at
+        return size >= settings.proctor_rotate_bytes or 0 < settings.proctor_rotate_seconds <= age
+
+    def _rotate(self, path: Path, log: _OpenLog) -> None:
+        self._close(path)
+        try:
+            result = rotate(path, log.created_at)
+        except Exception as exc:
+            # Keep appending to the active file; rotation is retried on the next write.
+            self._stats["rotation_failures"] += 1
+            logger.warning("proctoring log rotation failed path=%s: %s", path, exc)
+            return
+        if result is not None:
+            segment, raw_bytes, stored_bytes = result
+            self._stats["rotations"] += 1
+            self._stats["rotated_raw_bytes"] += raw_bytes
+            self._stats["rotated_stored_bytes"] += stored_bytes
+            logger.info("proctoring log rotated segment=%s raw=%s stored=%s", segment.name, raw_bytes, stored_bytes)
+
+    def _fsync_all(self) -> None:
+        for path in list(self._unsynced):
+            log = self._handles.get(path)
+            if log is not None:
+                try:
+                    os.fsync(log.data.fileno())
+                    os.fsync(log.index.fileno())
+                    self._stats["fsyncs"] += 1
+                except OSError as exc:
+                    logger.warning("proctoring log fsync failed path=%s: %s", path, exc)
+        self._unsynced.clear()
+        self._last_fsync = time.monotonic()
+
+    def _close(self, path: Path) -> None:
+        log = self._handles.pop(path, None)
+        if log is None:
+            return
+        try:
+            log.data.flush()
+            log.index.flush()
+            if path in self._unsynced:
+                os.fsync(log.data.fileno())
+                os.fsync(log.index.fileno())
+                self._stats["fsyncs"] += 1
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._unsynced.discard(path)
+            log.data.close()
+            log.index.close()
+
+    def read_session(self, candidate_id: str, session_id: str, flush: bool = True) -> List[Dict[str, Any]]:
+        """
+        One session's records, oldest first; blocking. Queued records are written first,
+        or with `flush=False` appended from the queue without writing anything.
+        """
+        if flush:
+            self.flush()
+        path = log_path_for(candidate_id)
+        legacy = LOGS_DIR / f"{safe_candidate_id(candidate_id)}.jsonl"
+        # Rotation only happens under the flush lock, so files cannot move mid-read; no
+        # flush is half done either, so every record is either on disk or still queued.
+        with self._flush_lock:
+            with self._lock:
+                queued = [record for record in self._pending.get(path, []) if record.get("session_id") == session_id]
+            return read_session(path, session_id, legacy=legacy) + queued
+
+    def close(self) -> None:
+        """Flush, fsync and close every handle; blocking."""
+        self.flush(fsync=True)
+        with self._flush_lock:
+            for path in list(self._handles):
+                self._close(path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            raw = self._stats["rotated_raw_bytes"]
+            return {
+                **self._stats,
+                "pending_records": self._pending_count,
+                "open_files": len(self._handles),
+                "codec": resolve_codec(),
+                # Stored bytes per raw byte across rotated segments (lower is better).
+                "rotated_compression_ratio": round(self._stats["rotated_stored_bytes"] / raw, 3) if raw else 1.0,
+            }
+
+
+proctoring_sink = ProctoringSink()
@@ -0,0 +1,331 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, update
+
+from core.config import settings
+from core.database import ProctoringEventRecord, ProctoringSessionRecord, get_db, utc_now
+from services.proctoring_aggregates import apply_batch
+from services.write_behind import WriteBehindBuffer
+
+AGGREGATE_GROUPS = ("type", "day", "status")
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ProctoringStore(WriteBehindBuffer):
+    """
+    Write-behind index of proctoring records in the proctoring_sessions and
+    proctoring_events tables.
+
+    `record` takes the same record the JSONL sink gets and only buffers it; a background
+    task flushes every PROCTOR_FLUSH_INTERVAL_MS (or sooner once PROCTOR_FLUSH_BATCH_SIZE
+    event rows are queued) with one multi-row insert of events, one upsert per session
+    and the matching update of the running violation counters (proctoring_aggregates).
+    The JSONL files stay the system of record; this copy exists for queries.
+    """
+
+    name = "proctoring store"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._events: List[Dict[str, Any]] = []
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"records": 0, "flushes": 0, "events_written": 0, "sessions_written": 0, "flush_failures": 0}
+
+    def record(self, record: Dict[str, Any]) -> None:
+        if not settings.proctor_db_store:
+            return
+        received_at = _parse_ts(record.get("server_received_at")) or utc_now()
+        rows = [_event_row(record, event, index, received_at) for index, event in enumerate(record.get("events", []))]
+        with self._lock:
+            self._events.extend(rows)
+            _merge_session(self._sessions, record, received_at)
+            self._stats["records"] += 1
+            full = len(self._events) >= settings.proctor_flush_batch_size
+        self._queued(full)
+
+    def _flush_interval_ms(self) -> int:
+        return settings.proctor_flush_interval_ms
+
+    def _take_batch(self) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]:
+        events, self._events = self._events, []
+        sessions, self._sessions = self._sessions, {}
+        return (sessions, events) if events or sessions else None
+
+    def _write_batch(self, batch: Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]) -> int:
+        sessions, events = batch
+        _write_records(sessions, events)
+        return len(events)
+
+    def _restore_batch(self, batch: Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]) -> None:
+        sessions, events = batch
+        self._events[:0] = events
+        for session_id, newer in self._sessions.items():
+            if session_id in sessions:
+                sessions[session_id] = _combine(sessions[session_id], newer)
+            else:
+                sessions[session_id] = newer
+        self._sessions = sessions
+
+    def _batch_written(self, batch: Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]], written: int) -> None:
+        self._stats["events_written"] += written
+        self._stats["sessions_written"] += len(batch[0])
+
+    def start(self) -> None:
+        if settings.proctor_db_store:
+            super().start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "enabled": settings.proctor_db_store,
+                "pending_events": len(self._events),
+                "pending_sessions": len(self._sessions),
+            }
+
+
+def _event_row(record: Dict[str, Any], event: Dict[str, Any], index: int, received_at: datetime) -> Dict[str, Any]:
+    timestamp = str(event.get("timestamp", ""))
+    return {
+        "session_id": record["session_id"],
+        "candidate_id": record["candidate_id"],
+        "seq": int(event.get("seq", record.get("seq_start", 0) + index)),
+        "timestamp": timestamp,
+        "occurred_at": _parse_ts(timestamp),
+        "type": str(event.get("type", "")),
+        "message": str(event.get("message", "")),
+        "counted": bool(event.get("counted", False)),
+        "count": int(event.get("count", 1)),
+        "last_ts": event.get("last_ts"),
+        "metadata_json": json.dumps(event.get("metadata") or {}, ensure_ascii=True, sort_keys=True),
+        "received_at": received_at,
+    }
+
+
+def _merge_session(sessions: Dict[str, Dict[str, Any]], record: Dict[str, Any], received_at: datetime) -> None:
+    incoming = {
+        "candidate_id": record["candidate_id"],
+        "role": record.get("role", ""),
+        "difficulty": record.get("difficulty", ""),
+        "mode": record.get("mode", ""),
+        "status": record.get("status", ""),
+        "violations": int(record.get("violations", 0)),
+        "terminated": bool(record.get("terminated", False)),
+        "event_count": int(record.get("seq_count", len(record.get("events", [])))),
+        "created_at": received_at,
+        "updated_at": received_at,
+    }
+    current = sessions.get(record["session_id"])
+    sessions[record["session_id"]] = _combine(current, incoming) if current else incoming
+
+
+def _combine(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    # Latest state wins; event counts add up and the earliest sighting is kept.
+    return {
+        **newer,
+        "event_count": older["event_count"] + newer["event_count"],
+        "created_at": min(older["created_at"], newer["created_at"]),
+    }
+
+
+def _write_records(sessions: Dict[str, Dict[str, Any]], events: List[Dict[str, Any]]) -> None:
+    with get_db() as db:
+        existing = set(
+            db.scalars(
+                select(ProctoringSessionRecord.session_id).where(ProctoringSessionRecord.session_id.in_(list(sessions)))
+            )
+        )
+        missing = [{"session_id": session_id, **row} for session_id, row in sessions.items() if session_id not in existing]
+        if missing:
+            db.execute(insert(ProctoringSessionRecord), missing)
+        for session_id in existing:
+            row = sessions[session_id]
+            db.execute(
+                update(ProctoringSessionRecord)
+                .where(ProctoringSessionRecord.session_id == session_id)
+                .values(
+                    status=row["status"],
+                    violations=row["violations"],
+                    terminated=row["terminated"],
+                    event_count=ProctoringSessionRecord.event_count + row["event_count"],
+                    updated_at=row["updated_at"],
+                )
+                .execution_options(synchronize_session=False)
+            )
+        if events:
+            db.execute(insert(ProctoringEventRecord), events)
+        # Violation counters are updated in the same transaction as the rows they count.
+        apply_batch(db, sessions, events)
+        db.commit()
+
+
+def _session_dict(row: ProctoringSessionRecord) -> Dict[str, Any]:
+    return {
+        "session_id": row.session_id,
+        "candidate_id": row.candidate_id,
+        "role": row.role,
+        "difficulty": row.difficulty,
+        "mode": row.mode,
+        "status": row.status,
+        "violations": row.violations,
+        "terminated": row.terminated,
+        "event_count": row.event_count,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+    }
+
+
+def _event_dict(row: ProctoringEventRecord) -> Dict[str, Any]:
+    return {
+        "seq": row.seq,
+        "timestamp": row.timestamp,
+        "type": row.type,
+        "message": row.message,
+        "counted": row.counted,
+        "count": row.count,
+        "last_ts": row.last_ts,
+        "metadata": json.loads(row.metadata_json or "{}"),
+        "received_at": row.received_at,
+    }
+
+
+def query_sessions(
+    *,
+    candidate_id: Optional[str] = None,
+    status: Optional[str] = None,
+    terminated: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Sessions first seen in [since, until), most recently updated first."""
+    model = ProctoringSessionRecord
+    filters = []
+    if candidate_id:
+        filters.append(model.candidate_id == candidate_id)
+    if status:
+        filters.append(model.status == status)
+    if terminated is not None:
+        filters.append(model.terminated == terminated)
+    if since is not None:
+        filters.append(model.created_at >= since)
+    if until is not None:
+        filters.append(model.created_at < until)
+    with get_db() as db:
+        total = db.scalar(select(func.count()).select_from(model).where(*filters)) or 0
+        rows = db.scalars(
+            select(model).where(*filters).order_by(model.updated_at.desc()).limit(limit).offset(offset)
+        ).all()
+        return total, [_session_dict(row) for row in rows]
+
+
+def query_events(
+    session_id: str,
+    *,
+    event_type: Optional[str] = None,
+    counted: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """A session's events in sequence order."""
+    model = ProctoringEventRecord
+    filters = [model.session_id == session_id]
+    if event_type:
+        filters.append(model.type == event_type)
+    if counted is not None:
+        filters.append(model.counted == counted)
+    if since is not None:
+        filters.append(model.occurred_at >= since)
+    if until is not None:
+        filters.append(model.occurred_at < until)
+    with get_db() as db:
+        total = db.scalar(select(func.count()).select_from(model).where(*filters)) or 0
+        rows = db.scalars(
+            select(model).where(*filters).order_by(model.seq, model.id).limit(limit).offset(offset)
+        ).all()
+        return total, [_event_dict(row) for row in rows]
+
+
+def aggregate(
+    group_by: str,
+    *,
+    candidate_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Counts grouped by event `type`, event `day`, or session `status`.
+
+    Event groups report stored rows, occurrences (runs expanded) and counted
+    occurrences; status groups report sessions, terminated sessions and violations.
+    """
+    if group_by not in AGGREGATE_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(AGGREGATE_GROUPS)}")
+    with get_db() as db:
+        if group_by == "status":
+            model = ProctoringSessionRecord
+            filters = []
+            if candidate_id:
+                filters.append(model.candidate_id == candidate_id)
+            if since is not None:
+                filters.append(model.created_at >= since)
+            if until is not None:
+                filters.append(model.created_at < until)
+            rows = db.execute(
+                select(
+                    model.status,
+                    func.count(),
+                    func.sum(case((model.terminated.is_(True), 1), else_=0)),
+                    func.sum(model.violations),
+                )
+                .where(*filters)
+                .group_by(model.status)
+                .order_by(func.count().desc())
+            ).all()
+            return [
+                {"key": key, "sessions": sessions, "terminated": int(ended or 0), "violations": int(violations or 0)}
+                for key, sessions, ended, violations in rows
+            ]
+
+        model = ProctoringEventRecord
+        occurred = func.coalesce(model.occurred_at, model.received_at)
+        key = model.type if group_by == "type" else func.date(occurred)
+        filters = []
+        if candidate_id:
+            filters.append(model.candidate_id == candidate_id)
+        if since is not None:
+            filters.append(occurred >= since)
+        if until is not None:
+            filters.append(occurred < until)
+        rows = db.execute(
+            select(
+                key,
+                func.count(),
+                func.sum(model.count),
+                func.sum(case((model.counted.is_(True), model.count), else_=0)),
+            )
+            .where(*filters)
+            .group_by(key)
+            .order_by(key)
+        ).all()
+        return [
+            {"key": str(group), "events": events, "occurrences": int(occurrences or 0), "counted": int(counted or 0)}
+            for group, events, occurrences, counted in rows
+        ]
+
+
+proctoring_store = ProctoringStore()
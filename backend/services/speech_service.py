@@ -1,57 +1,96 @@
+import asyncio
+import io
+import logging
 import os
 from pathlib import Path
-from uuid import uuid4
+from typing import BinaryIO
 
-from dotenv import load_dotenv
 from fastapi import HTTPException, status
 from fastapi import UploadFile
-from openai import OpenAI
 
+from services.audio_preprocess import can_preprocess, preprocess_audio
+from services.transcript_cache import hash_file, transcript_cache
+from services.transcription_backends import TranscriptionBackend, get_transcription_backend
 
-_client: OpenAI | None = None
+logger = logging.getLogger(__name__)
 
+# Older releases spooled uploads here; anything left behind is removed at startup.
+TMP_UPLOAD_DIR = Path(__file__).resolve().parents[1] / "tmp_uploads"
 
-def get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        load_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY is not set")
-        _client = OpenAI(api_key=api_key)
-    return _client
+
+def audio_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio file too large. Max allowed size is {max_bytes / (1024 * 1024):g}MB.",
+    )
 
 
 async def transcribe_audio(upload: UploadFile, max_bytes: int = 5 * 1024 * 1024) -> str:
-    client = get_client()
-
-    # Keep temp files in project path to avoid Windows temp locking issues.
-    suffix = os.path.splitext(upload.filename or "")[1] or ".webm"
-    temp_dir = Path(__file__).resolve().parents[1] / "tmp_uploads"
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    tmp_path = temp_dir / f"{uuid4().hex}{suffix}"
-
-    try:
-        content = await upload.read()
-        if len(content) > max_bytes:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Audio file too large. Max allowed size is 5MB.",
-            )
-        with open(tmp_path, "wb") as tmp_file:
-            tmp_file.write(content)
-
-        with open(tmp_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text",
+    # The multipart parser has already spooled the body (in memory, or on disk past
+    # 1 MB); hand that buffer straight to the backend instead of copying it again.
+    return await transcribe_file(upload.file, upload.filename or "audio.webm", max_bytes, size=upload.size)
+
+
+async def transcribe_file(
+    audio_file: BinaryIO,
+    filename: str,
+    max_bytes: int = 5 * 1024 * 1024,
+    *,
+    size: int | None = None,
+) -> str:
+    """Transcribe a seekable audio file object; identical bytes reuse the cached transcript."""
+    backend = get_transcription_backend()
+    if size is None:
+        size = audio_file.seek(0, os.SEEK_END)
+    if size > max_bytes:
+        raise audio_too_large(max_bytes)
+    audio_file.seek(0)
+
+    # Identical bytes (a retried upload) reuse the earlier transcript.
+    digest = await asyncio.to_thread(hash_file, audio_file, backend.name)
+    cached = await asyncio.to_thread(transcript_cache.get, digest)
+    if cached is not None:
+        return cached
+    transcript = await _transcribe_file(backend, audio_file, filename)
+    await asyncio.to_thread(transcript_cache.set, digest, transcript)
+    return transcript
+
+
+async def _transcribe_file(backend: TranscriptionBackend, audio_file: BinaryIO, filename: str) -> str:
+    if can_preprocess(filename):
+        # Trimming silence shortens what the backend bills for (or decodes); it needs the decoded bytes.
+        raw = await asyncio.to_thread(audio_file.read)
+        result = await asyncio.to_thread(preprocess_audio, raw, filename)
+        if result.applied:
+            logger.info(
+                "audio preprocessed file=%s bytes_in=%s bytes_out=%s seconds_saved=%.2f",
+                filename,
+                result.original_bytes,
+                result.output_bytes,
+                result.seconds_saved,
             )
+            if not result.has_speech:
+                return ""
+            audio_file, filename = io.BytesIO(result.data), result.filename
+        else:
+            audio_file.seek(0)
 
-        return transcript.strip()
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except OSError:
-            pass
+    return await backend.transcribe(audio_file, filename)
 
+
+def sweep_tmp_uploads() -> int:
+    """Delete temp uploads orphaned by earlier crashes; returns the number removed."""
+    if not TMP_UPLOAD_DIR.is_dir():
+        return 0
+    removed = 0
+    for path in TMP_UPLOAD_DIR.iterdir():
+        if not path.is_file():
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError as exc:
+            logger.warning("could not remove stale upload %s: %s", path.name, exc)
+    if removed:
+        logger.info("removed %s stale upload(s) from %s", removed, TMP_UPLOAD_DIR)
+    return removed
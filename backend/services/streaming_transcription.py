@@ -0,0 +1,167 @@
+import asyncio
+import io
+import logging
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from core.config import settings
+from services.audio_preprocess import (
+    can_preprocess,
+    np,
+    pcm16_to_samples,
+    pcm16_to_wav,
+    preprocess_audio,
+    voiced_frames,
+)
+from services.audio_probe import check_duration, validate_audio
+from services.speech_service import audio_too_large
+from services.transcript_cache import new_hasher, transcript_cache
+from services.transcription_backends import get_transcription_backend
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("pcm16", "webm")
+# Rates browsers and capture devices actually record at; anything else is a client bug.
+SAMPLE_RATES = (8_000, 11_025, 16_000, 22_050, 24_000, 32_000, 44_100, 48_000)
+# Shorter segments lose too much context for the recogniser.
+_MIN_SEGMENT_SECONDS = 1.0
+# Segment transcriptions in flight per stream.
+_MAX_PARALLEL_SEGMENTS = 3
+
+_stats: Counter = Counter()
+
+
+class IncrementalTranscriber:
+    """
+    Transcribe an answer while it is still being recorded.
+
+    `pcm16` streams (little-endian 16-bit mono) are cut into segments at pauses of
+    STREAM_SEGMENT_SILENCE_MS, or at STREAM_MAX_SEGMENT_SECONDS, and each segment is
+    transcribed in the background as soon as it closes; `finish` only waits for the
+    last one and stitches the texts in order. `webm` chunks are not independently
+    decodable, so they are buffered and transcribed once at the end.
+    """
+
+    def __init__(self, audio_format: str, sample_rate: int = 16_000, max_bytes: int | None = None) -> None:
+        if audio_format not in FORMATS:
+            raise ValueError(f"Unsupported audio format '{audio_format}'. Use one of: {', '.join(FORMATS)}.")
+        if sample_rate not in SAMPLE_RATES:
+            raise ValueError(
+                f"Unsupported sample rate {sample_rate}. Use one of: {', '.join(map(str, SAMPLE_RATES))}."
+            )
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes or settings.max_audio_upload_bytes
+        self.received = 0
+        self._pending = bytearray()
+        self._segments: List[asyncio.Task] = []
+        self._reported = 0
+        self._limit = asyncio.Semaphore(_MAX_PARALLEL_SEGMENTS)
+        self._backend = get_transcription_backend()
+        # Whole-stream hash, updated per chunk, keys the cache for webm streams.
+        self._hasher = new_hasher(self._backend.name)
+        _stats["streams"] += 1
+
+    def feed(self, chunk: bytes) -> None:
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            raise audio_too_large(self.max_bytes)
+        self._pending.extend(chunk)
+        if self.audio_format == "webm":
+            self._hasher.update(chunk)
+        if self.audio_format == "pcm16":
+            check_duration(self.received / (self.sample_rate * 2), minimum=False)
+            self._maybe_cut()
+
+    def new_segments(self) -> List[Tuple[int, str]]:
+        """Segments finished since the last call, in order; stops at the first one still running."""
+        ready: List[Tuple[int, str]] = []
+        while self._reported < len(self._segments):
+            task = self._segments[self._reported]
+            if not task.done() or task.cancelled() or task.exception() is not None:
+                break
+            ready.append((self._reported, task.result()))
+            self._reported += 1
+        return ready
+
+    async def finish(self) -> str:
+        if self.audio_format == "pcm16":
+            check_duration(self.received / (self.sample_rate * 2))
+        if self._pending:
+            if self.audio_format == "pcm16":
+                self._submit(len(self._pending))
+            else:
+                data = bytes(self._pending)
+                self._pending.clear()
+                # Same checks as an uploaded file: sniffed container, duration limits.
+                await asyncio.to_thread(validate_audio, io.BytesIO(data))
+                digest = self._hasher.hexdigest()
+                self._segments.append(asyncio.create_task(self._transcribe(data, "answer.webm", digest)))
+        texts = await asyncio.gather(*self._segments)
+        return " ".join(text for text in texts if text).strip()
+
+    def cancel(self) -> None:
+        for task in self._segments:
+            task.cancel()
+
+    def _maybe_cut(self) -> None:
+        bytes_per_second = self.sample_rate * 2
+        pending_seconds = len(self._pending) / bytes_per_second
+        if pending_seconds < _MIN_SEGMENT_SECONDS:
+            return
+        if np is None:
+            # No VAD without NumPy: fall back to fixed-length segments.
+            if pending_seconds >= settings.stream_max_segment_seconds:
+                self._submit(len(self._pending))
+            return
+
+        mask, frame = voiced_frames(pcm16_to_samples(self._pending), self.sample_rate)
+        frame_bytes = frame * 2
+        if not mask.any():
+            # Only silence so far; drop it rather than paying to transcribe it.
+            _stats["silence_dropped_seconds"] += round(len(mask) * frame / self.sample_rate)
+            del self._pending[: len(mask) * frame_bytes]
+            return
+        voiced = np.flatnonzero(mask)
+        silent_tail = len(mask) - 1 - int(voiced[-1])
+        if silent_tail * frame * 1000 >= settings.stream_segment_silence_ms * self.sample_rate:
+            self._submit((int(voiced[-1]) + 1) * frame_bytes)
+        elif pending_seconds >= settings.stream_max_segment_seconds:
+            # Long run without a pause: cut at the last quiet frame, or at the end.
+            quiet = np.flatnonzero(~mask)
+            cut_frame = int(quiet[-1]) + 1 if len(quiet) else len(mask)
+            self._submit(cut_frame * frame_bytes)
+
+    def _submit(self, nbytes: int) -> None:
+        segment = bytes(self._pending[:nbytes])
+        del self._pending[:nbytes]
+        if not segment:
+            return
+        _stats["segments"] += 1
+        wav = pcm16_to_wav(segment, self.sample_rate)
+        hasher = new_hasher(self._backend.name)
+        hasher.update(wav)
+        self._segments.append(asyncio.create_task(self._transcribe(wav, "segment.wav", hasher.hexdigest())))
+
+    async def _transcribe(self, data: bytes, filename: str, digest: str) -> str:
+        cached = await asyncio.to_thread(transcript_cache.get, digest)
+        if cached is not None:
+            return cached
+        text = await self._transcribe_uncached(data, filename)
+        await asyncio.to_thread(transcript_cache.set, digest, text)
+        return text
+
+    async def _transcribe_uncached(self, data: bytes, filename: str) -> str:
+        async with self._limit:
+            if can_preprocess(filename):
+                result = await asyncio.to_thread(preprocess_audio, data, filename)
+                if result.applied:
+                    if not result.has_speech:
+                        _stats["segments_without_speech"] += 1
+                        return ""
+                    data, filename = result.data, result.filename
+            return await self._backend.transcribe(io.BytesIO(data), filename)
+
+
+def get_streaming_stats() -> Dict[str, int]:
+    return dict(_stats)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 64 * 1024
+# Disk pruning runs after this many writes.
+_PRUNE_EVERY_WRITES = 100
+
+
+def new_hasher(namespace: str) -> "hashlib._Hash":
+    # Namespaced by provider so switching providers never serves another engine's text.
+    return hashlib.sha256(namespace.encode("utf-8") + b"\0")
+
+
+def hash_file(audio_file: BinaryIO, namespace: str) -> str:
+    """Hash a seekable upload in chunks and rewind it; memory use stays at one chunk."""
+    hasher = new_hasher(namespace)
+    audio_file.seek(0)
+    while chunk := audio_file.read(HASH_CHUNK_BYTES):
+        hasher.update(chunk)
+    audio_file.seek(0)
+    return hasher.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Transcripts keyed by the SHA-256 of the uploaded audio, so a resubmitted recording
+    (flaky network, client retry) does not pay for speech-to-text twice.
+
+    An LRU of TRANSCRIPT_CACHE_SIZE entries lives in memory; when TRANSCRIPT_CACHE_DIR
+    is set, entries are also written there as small JSON files so they survive restarts
+    and are shared by workers on the same host. Both tiers expire after
+    TRANSCRIPT_CACHE_TTL_SECONDS.
+
+    `get`, `set` and `prune_disk` block on the disk tier; async callers run them in a
+    worker thread. The memory tier and counters are guarded by a lock for that reason.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._writes = 0
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, digest: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                text, stored_at = entry
+                if now - stored_at <= settings.transcript_cache_ttl_seconds:
+                    self._memory.move_to_end(digest)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return text
+                self._memory.pop(digest, None)
+        entry = self._read_disk(digest, now)
+        with self._lock:
+            if entry is not None:
+                self._remember(digest, *entry)
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, digest: str, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(digest, text, now)
+            self._stats["stores"] += 1
+        self._write_disk(digest, text, now)
+
+    def _remember(self, digest: str, text: str, stored_at: float) -> None:
+        # Caller holds `_lock`.
+        self._memory[digest] = (text, stored_at)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > max(1, settings.transcript_cache_size):
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, digest: str) -> Path | None:
+        if not settings.transcript_cache_dir:
+            return None
+        return Path(settings.transcript_cache_dir) / digest[:2] / f"{digest}.json"
+
+    def _read_disk(self, digest: str, now: float) -> Tuple[str, float] | None:
+        path = self._disk_path(digest)
+        if path is None or not path.is_file():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            text, stored_at = str(data["text"]), float(data["ts"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if now - stored_at > settings.transcript_cache_ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return text, stored_at
+
+    def _write_disk(self, digest: str, text: str, now: float) -> None:
+        path = self._disk_path(digest)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({"text": text, "ts": now}), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("transcript cache write failed: %s", exc)
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY_WRITES == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Drop expired entries and the oldest ones beyond TRANSCRIPT_CACHE_DISK_ENTRIES."""
+        if not settings.transcript_cache_dir:
+            return 0
+        root = Path(settings.transcript_cache_dir)
+        if not root.is_dir():
+            return 0
+        cutoff = time.time() - settings.transcript_cache_ttl_seconds
+        entries = []
+        removed = 0
+        for path in root.glob("*/*.json"):
+            try:
+                mtime = path.stat().st_mtime
+                if mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                else:
+                    entries.append((mtime, path))
+            except OSError:
+                continue
+        excess = len(entries) - settings.transcript_cache_disk_entries
+        if excess > 0:
+            for _, path in sorted(entries)[:excess]:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": bool(settings.transcript_cache_dir),
+            }
+
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,205 @@
+"""
+Speech-to-text backends.
+
+- `api`   – the configured LLM provider's hosted transcription (OpenAI whisper-1).
+- `local` – faster-whisper on the CPU in a process pool. Each worker process loads
+            the model once in its initializer and reuses it for every request, so
+            answers cost no network round trip and no per-minute fee.
+- `stub`  – deterministic offline transcripts for tests and benchmarks.
+
+Pick one with TRANSCRIPTION_BACKEND; `get_transcription_backend()` returns the shared instance.
+"""
+
+import asyncio
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, BinaryIO, Deque, Dict
+
+from core.config import settings
+from services.llm_providers import LLMProvider, StubProvider, get_provider
+
+logger = logging.getLogger(__name__)
+
+_LATENCY_WINDOW = 200
+
+
+class TranscriptionBackend:
+    """
+    Async transcription interface.
+
+    `name` namespaces the transcript cache, so it must change whenever the same audio
+    could produce different text (another engine or model).
+    """
+
+    name = "base"
+
+    def __init__(self) -> None:
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._stats = {"calls": 0, "errors": 0}
+
+    async def transcribe(self, audio_file: BinaryIO, filename: str = "audio.webm") -> str:
+        started = time.perf_counter()
+        self._stats["calls"] += 1
+        try:
+            text = await self._transcribe(audio_file, filename)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        self._latencies.append(time.perf_counter() - started)
+        return text.strip()
+
+    async def _transcribe(self, audio_file: BinaryIO, filename: str) -> str:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        """Warm up ahead of the first request (no-op by default)."""
+
+    def close(self) -> None:
+        """Release workers or connections (no-op by default)."""
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "backend": self.name,
+            **self._stats,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+        }
+
+
+class ProviderBackend(TranscriptionBackend):
+    """Hosted transcription through an LLM provider; the blocking call runs in a thread."""
+
+    def __init__(self, provider: LLMProvider) -> None:
+        super().__init__()
+        self.provider = provider
+        self.name = provider.name
+
+    async def _transcribe(self, audio_file: BinaryIO, filename: str) -> str:
+        return await asyncio.to_thread(self.provider.transcribe, audio_file, filename)
+
+
+class ApiBackend(ProviderBackend):
+    def __init__(self) -> None:
+        super().__init__(get_provider())
+
+
+class StubBackend(ProviderBackend):
+    def __init__(self) -> None:
+        super().__init__(StubProvider())
+
+
+# --- local engine; these run inside the worker processes ---
+
+_worker_model: Any = None
+
+
+def _init_worker(model_size: str, compute_type: str, cpu_threads: int) -> None:
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+def _worker_transcribe(data: bytes, language: str | None) -> str:
+    segments, _ = _worker_model.transcribe(io.BytesIO(data), language=language or None, beam_size=1)
+    return " ".join(segment.text.strip() for segment in segments)
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper in a ProcessPoolExecutor of LOCAL_WHISPER_WORKERS processes.
+
+    Decoding is CPU-bound and holds the GIL, so it runs in separate processes rather
+    than threads; CPU threads are split evenly between the workers. Workers are spawned
+    (not forked) so they never inherit the event loop's threads.
+    """
+
+    def __init__(self) -> None:
+        if importlib.util.find_spec("faster_whisper") is None:
+            raise RuntimeError("TRANSCRIPTION_BACKEND=local needs the faster-whisper package (pip install faster-whisper).")
+        super().__init__()
+        self.model_size = settings.local_whisper_model
+        self.workers = max(1, settings.local_whisper_workers)
+        self.name = f"local:{self.model_size}"
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_size, settings.local_whisper_compute_type, cpu_threads),
+            )
+        return self._pool
+
+    def start(self) -> None:
+        # One ping per worker brings every process up so model loading happens before traffic.
+        pool = self._get_pool()
+        for _ in range(self.workers):
+            pool.submit(_worker_ping)
+
+    async def _transcribe(self, audio_file: BinaryIO, filename: str) -> str:
+        data = await asyncio.to_thread(audio_file.read)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(), _worker_transcribe, data, settings.local_whisper_language
+            )
+        except BrokenProcessPool:
+            # A worker died (OOM, crash); start a fresh pool for the next request.
+            logger.error("local transcription pool broke; restarting it")
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "workers": self.workers, "model": self.model_size}
+
+
+BACKENDS = {"api": ApiBackend, "local": LocalWhisperBackend, "stub": StubBackend}
+_backend: TranscriptionBackend | None = None
+
+
+def create_backend(name: str) -> TranscriptionBackend:
+    backend_cls = BACKENDS.get(name.strip().lower())
+    if backend_cls is None:
+        raise RuntimeError(f"Unknown TRANSCRIPTION_BACKEND '{name}'. Use one of: {', '.join(BACKENDS)}.")
+    return backend_cls()
+
+
+def get_transcription_backend() -> TranscriptionBackend:
+    global _backend
+    if _backend is None:
+        _backend = create_backend(settings.transcription_backend or "api")
+    return _backend
+
+
+def get_transcription_stats() -> Dict[str, Any]:
+    if _backend is None:
+        return {"backend": settings.transcription_backend or "api", "calls": 0, "errors": 0}
+    return _backend.stats()
+
+
+def close_transcription_backend() -> None:
+    global _backend
+    if _backend is not None:
+        _backend.close()
+        _backend = None
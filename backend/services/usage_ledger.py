@@ -0,0 +1,118 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+
+from core.config import settings
+from core.database import UsageLog, User, get_db, utc_now
+from services.write_behind import WriteBehindBuffer
+
+
+class UsageLedger(WriteBehindBuffer):
+    """
+    Write-behind buffer for token usage.
+
+    `record` only appends to memory; a background task flushes every
+    USAGE_FLUSH_INTERVAL_MS (or sooner once USAGE_FLUSH_BATCH_SIZE rows are queued)
+    with one multi-row insert into usage_logs and one counter UPDATE per user.
+    Deltas not yet committed are reported by `pending_tokens` so quota checks stay exact.
+    """
+
+    name = "usage ledger"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rows: List[Dict[str, Any]] = []
+        self._deltas: Counter = Counter()
+        # Deltas handed to a flush that has not committed yet.
+        self._in_flight: Counter = Counter()
+        self._stats = {"recorded": 0, "flushes": 0, "rows_written": 0, "flush_failures": 0}
+
+    def record(self, user_id: str, tokens: int, endpoint: str) -> None:
+        with self._lock:
+            self._rows.append(
+                {"user_id": user_id, "tokens_used": tokens, "endpoint": endpoint, "timestamp": utc_now()}
+            )
+            self._deltas[user_id] += tokens
+            self._stats["recorded"] += 1
+            full = len(self._rows) >= settings.usage_flush_batch_size
+        self._queued(full)
+
+    def pending_tokens(self, user_id: str) -> int:
+        with self._lock:
+            return self._deltas.get(user_id, 0) + self._in_flight.get(user_id, 0)
+
+    def _flush_interval_ms(self) -> int:
+        return settings.usage_flush_interval_ms
+
+    def _take_batch(self) -> Optional[Tuple[List[Dict[str, Any]], Counter]]:
+        rows, self._rows = self._rows, []
+        deltas, self._deltas = self._deltas, Counter()
+        self._in_flight = deltas
+        return (rows, deltas) if rows else None
+
+    def _write_batch(self, batch: Tuple[List[Dict[str, Any]], Counter]) -> int:
+        rows, deltas = batch
+        _write_usage(rows, deltas)
+        return len(rows)
+
+    def _restore_batch(self, batch: Tuple[List[Dict[str, Any]], Counter]) -> None:
+        rows, deltas = batch
+        self._rows[:0] = rows
+        self._deltas.update(deltas)
+        self._in_flight = Counter()
+
+    def _batch_written(self, batch: Tuple[List[Dict[str, Any]], Counter], written: int) -> None:
+        self._in_flight = Counter()
+        self._stats["rows_written"] += written
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending_rows": len(self._rows), "pending_users": len(self._deltas)}
+
+
+def _write_usage(rows: List[Dict[str, Any]], deltas: Counter) -> None:
+    today = utc_now().date().isoformat()
+    user_ids = list(deltas)
+    with get_db() as db:
+        existing = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        if missing:
+            now = utc_now()
+            db.execute(
+                insert(User),
+                [
+                    {
+                        "id": user_id,
+                        "created_at": now,
+                        "plan": "free",
+                        "total_tokens_used": 0,
+                        "daily_tokens_used": 0,
+                        "daily_questions_used": 0,
+                        "questions_attempted": 0,
+                        "last_usage_day": today,
+                    }
+                    for user_id in missing
+                ],
+            )
+        db.execute(
+            update(User)
+            .where(User.id.in_(user_ids), User.last_usage_day != today)
+            .values(daily_tokens_used=0, daily_questions_used=0, last_usage_day=today)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(insert(UsageLog), rows)
+        for user_id, tokens in deltas.items():
+            db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    total_tokens_used=User.total_tokens_used + tokens,
+                    daily_tokens_used=User.daily_tokens_used + tokens,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+
+
+usage_ledger = UsageLedger()
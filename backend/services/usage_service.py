@@ -4,7 +4,8 @@ from typing import Any, Dict, Optional
 from fastapi import HTTPException, status
 
 from core.config import settings
-from core.database import InterviewSession, RequestLog, UsageLog, User, get_db, utc_now
+from core.database import InterviewSession, RequestLog, User, get_db, utc_now
+from services.usage_ledger import usage_ledger
 
 
 def _today_utc() -> str:
@@ -58,17 +59,21 @@ def get_usage_summary(user_id: str) -> Dict[str, Any]:
             daily_tokens_limit = settings.daily_tokens_free * 10
             daily_questions_limit = settings.daily_questions_free * 5
 
+        # Tokens recorded but not yet flushed by the usage ledger still count against quotas.
+        pending_tokens = usage_ledger.pending_tokens(user_id)
+        daily_tokens_used = int(row.daily_tokens_used) + pending_tokens
+
         return {
             "user_id": row.id,
             "plan": plan,
-            "total_tokens_used": int(row.total_tokens_used),
-            "daily_tokens_used": int(row.daily_tokens_used),
+            "total_tokens_used": int(row.total_tokens_used) + pending_tokens,
+            "daily_tokens_used": daily_tokens_used,
             "daily_questions_used": int(row.daily_questions_used),
             "questions_attempted": int(row.questions_attempted),
             "daily_tokens_limit": daily_tokens_limit,
             "daily_questions_limit": daily_questions_limit,
             "questions_left_today": max(0, daily_questions_limit - int(row.daily_questions_used)),
-            "tokens_left_today": max(0, daily_tokens_limit - int(row.daily_tokens_used)),
+            "tokens_left_today": max(0, daily_tokens_limit - daily_tokens_used),
         }
 
 
@@ -101,22 +106,9 @@ def increment_question_usage(user_id: str) -> None:
 
 
 def update_usage(user_id: str, tokens: int, endpoint: str) -> None:
+    """Queue token usage; the usage ledger writes usage_logs and user counters in batches."""
     tokens = max(0, int(tokens or 0))
-    ensure_user(user_id)
-    _reset_daily_if_needed(user_id)
-    with get_db() as db:
-        db.add(
-            UsageLog(
-                user_id=user_id,
-                tokens_used=tokens,
-                endpoint=endpoint,
-                timestamp=utc_now(),
-            )
-        )
-        row = db.query(User).filter(User.id == user_id).first()
-        row.total_tokens_used += tokens
-        row.daily_tokens_used += tokens
-        db.commit()
+    usage_ledger.record(user_id=user_id, tokens=tokens, endpoint=endpoint)
 
 
 def create_or_reset_session(
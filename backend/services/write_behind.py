@@ -0,0 +1,117 @@
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    In-memory buffer drained to storage by a background task.
+
+    Subclasses keep their buffers under `_lock`, call `_queued` after adding to them and
+    supply the batch handling: `_take_batch` empties the buffers (None when there is
+    nothing to write), `_write_batch` stores a batch (blocking, outside `_lock`),
+    `_restore_batch` puts back a batch that failed and `_batch_written` counts one that
+    did not. `_stats` must hold "flushes" and "flush_failures". A subclass whose writes
+    can partly fail may override `flush` (and `close`) instead.
+
+    The task flushes every `_flush_interval_ms()`, or sooner once `_queued` is told the
+    buffer is full. `stop` (app shutdown) and atexit (any other exit) write what is left.
+    """
+
+    name = "write-behind buffer"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Serializes flushes so the background task and shutdown never write the same batch.
+        self._flush_lock = threading.Lock()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stats: Dict[str, Any] = {"flushes": 0, "flush_failures": 0}
+        # Last-resort flush for processes that exit without the app's shutdown event.
+        atexit.register(self.close)
+
+    def _flush_interval_ms(self) -> int:
+        raise NotImplementedError
+
+    def _take_batch(self) -> Optional[Any]:
+        raise NotImplementedError
+
+    def _write_batch(self, batch: Any) -> int:
+        """Store `batch`; returns the rows written."""
+        raise NotImplementedError
+
+    def _restore_batch(self, batch: Any) -> None:
+        raise NotImplementedError
+
+    def _batch_written(self, batch: Any, written: int) -> None:
+        pass
+
+    def flush(self) -> int:
+        """Write everything buffered so far; blocking, safe to call from any thread. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take_batch()
+            if batch is None:
+                return 0
+            try:
+                written = self._write_batch(batch)
+            except Exception as exc:
+                with self._lock:
+                    # Put the batch back in front of anything recorded meanwhile.
+                    self._restore_batch(batch)
+                    self._stats["flush_failures"] += 1
+                logger.warning("%s flush failed: %s", self.name, exc)
+                return 0
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._batch_written(batch, written)
+            return written
+
+    def close(self) -> None:
+        """Write whatever is still buffered; blocking."""
+        self.flush()
+
+    def _queued(self, full: bool) -> None:
+        """Call after adding to the buffers, outside `_lock`; `full` wakes the flusher now."""
+        self._ensure_flusher()
+        if full and self._wake is not None:
+            self._wake.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, worker threads): the running flusher or atexit picks it up.
+            return
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        interval = max(0.05, self._flush_interval_ms() / 1000.0)
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        self._ensure_flusher()
+
+    async def stop(self) -> None:
+        """Stop the background task, then `close` (write whatever is still buffered)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.close)
@@ -71,3 +71,22 @@ Constraints:
 """
 
 
+
+
+CONVERSATION_SUMMARY_PROMPT = """
+You maintain running notes on a technical interview so later questions can build on it.
+
+Current notes:
+{summary}
+
+New question/answer turns to fold in:
+
+{turns}
+
+Rewrite the notes to cover everything so far in at most 120 words:
+- topics already asked (so they are not repeated)
+- what the candidate demonstrated well and where they struggled, with scores if given
+- open threads worth probing next
+
+Return ONLY the updated notes, with no extra commentary.
+"""
@@ -0,0 +1,164 @@
+import json
+from typing import Any, List, Tuple
+
+# Parser states for the top-level JSON object.
+_EXPECT_OBJECT = 0
+_EXPECT_KEY = 1
+_IN_KEY = 2
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_IN_STRING = 5
+_IN_NESTED = 6
+_IN_SCALAR = 7
+_DONE = 8
+
+
+class StreamingJsonObjectParser:
+    """
+    Incrementally parse a flat JSON object as model tokens arrive.
+
+    `feed()` returns a list of `(kind, key, payload)` updates:
+    - ("delta", key, text)  new characters of a string value that is still open.
+    - ("value", key, value) a top-level value that is now complete.
+
+    Nested arrays/objects are buffered and emitted once closed. Anything before the
+    opening brace (e.g. a stray code fence) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._state = _EXPECT_OBJECT
+        self._key = ""
+        self._raw = ""
+        self._text: List[str] = []
+        self._escape = ""
+        self._in_escape = False
+        self._pending_surrogate = ""
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        updates: List[Tuple[str, str, Any]] = []
+        delta: List[str] = []
+        for ch in chunk:
+            state = self._state
+            if state == _DONE:
+                break
+            if state == _EXPECT_OBJECT:
+                if ch == "{":
+                    self._state = _EXPECT_KEY
+            elif state == _EXPECT_KEY:
+                if ch == '"':
+                    self._key = ""
+                    self._text = []
+                    self._state = _IN_KEY
+                elif ch == "}":
+                    self._state = _DONE
+            elif state == _IN_KEY:
+                decoded = self._consume_string_char(ch)
+                if decoded is None:
+                    self._key = "".join(self._text)
+                    self._state = _EXPECT_COLON
+                else:
+                    self._text.append(decoded)
+            elif state == _EXPECT_COLON:
+                if ch == ":":
+                    self._state = _EXPECT_VALUE
+            elif state == _EXPECT_VALUE:
+                if ch.isspace():
+                    continue
+                if ch == '"':
+                    self._text = []
+                    self._state = _IN_STRING
+                elif ch in "[{":
+                    self._raw = ch
+                    self._depth = 1
+                    self._nested_in_string = False
+                    self._nested_escape = False
+                    self._state = _IN_NESTED
+                else:
+                    self._raw = ch
+                    self._state = _IN_SCALAR
+            elif state == _IN_STRING:
+                decoded = self._consume_string_char(ch)
+                if decoded is None:
+                    if delta:
+                        updates.append(("delta", self._key, "".join(delta)))
+                        delta = []
+                    updates.append(("value", self._key, "".join(self._text)))
+                    self._state = _EXPECT_KEY
+                elif decoded:
+                    self._text.append(decoded)
+                    delta.append(decoded)
+            elif state == _IN_NESTED:
+                self._raw += ch
+                if self._nested_in_string:
+                    if self._nested_escape:
+                        self._nested_escape = False
+                    elif ch == "\\":
+                        self._nested_escape = True
+                    elif ch == '"':
+                        self._nested_in_string = False
+                elif ch == '"':
+                    self._nested_in_string = True
+                elif ch in "[{":
+                    self._depth += 1
+                elif ch in "]}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        updates.append(("value", self._key, _loads_or_raw(self._raw)))
+                        self._state = _EXPECT_KEY
+            elif state == _IN_SCALAR:
+                if ch == "," or ch == "}" or ch.isspace():
+                    updates.append(("value", self._key, _loads_or_raw(self._raw.strip())))
+                    self._state = _DONE if ch == "}" else _EXPECT_KEY
+                else:
+                    self._raw += ch
+        if delta and self._state == _IN_STRING:
+            updates.append(("delta", self._key, "".join(delta)))
+        return updates
+
+    def _consume_string_char(self, ch: str) -> str | None:
+        """
+        Decode one character inside a JSON string.
+
+        Returns None on the closing quote, "" while an escape sequence is incomplete,
+        otherwise the decoded text.
+        """
+        if self._in_escape:
+            self._escape += ch
+            if self._escape[0] == "u" and len(self._escape) < 5:
+                return ""
+            sequence = "\\" + self._escape
+            self._in_escape = False
+            self._escape = ""
+            if sequence.startswith("\\u"):
+                code = int(sequence[2:], 16) if _is_hex(sequence[2:]) else 0xFFFD
+                if 0xD800 <= code <= 0xDBFF:
+                    self._pending_surrogate = sequence
+                    return ""
+                if 0xDC00 <= code <= 0xDFFF and self._pending_surrogate:
+                    sequence = self._pending_surrogate + sequence
+                self._pending_surrogate = ""
+            return _loads_or_raw('"' + sequence + '"')
+        if ch == "\\":
+            self._in_escape = True
+            return ""
+        if ch == '"':
+            return None
+        return ch
+
+
+def _is_hex(value: str) -> bool:
+    return len(value) == 4 and all(c in "0123456789abcdefABCDEF" for c in value)
+
+
+def _loads_or_raw(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, ValueError):
+        return raw
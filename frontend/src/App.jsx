@@ -1,4 +1,4 @@
-import { Suspense, lazy, useEffect, useMemo, useState } from 'react';
+import { Suspense, lazy, useEffect, useMemo, useRef, useState } from 'react';
 import WarningModal from './components/WarningModal.jsx';
 import useProctoring from './hooks/useProctoring.js';
 import useFullscreen from './hooks/useFullscreen.js';
@@ -69,6 +69,8 @@ function App() {
   const [pendingSkipCompletion, setPendingSkipCompletion] = useState(null);
   const [sessionId, setSessionId] = useState('');
   const [logUploaded, setLogUploaded] = useState(false);
+  // Proctoring events the server has acknowledged; only later ones are re-sent.
+  const proctorAckedSeq = useRef(0);
   const [candidateId, setCandidateId] = useState(() => ensureId(CANDIDATE_KEY, 'candidate'));
   const [usageSummary, setUsageSummary] = useState(null);
   const [usageError, setUsageError] = useState('');
@@ -151,7 +153,8 @@ function App() {
     if (state !== STATES.completed || logUploaded || !sessionId) return;
     const upload = async () => {
       try {
-        await submitProctoringLog({
+        const seqStart = Math.min(proctorAckedSeq.current, events.length);
+        const res = await submitProctoringLog({
           candidate_id: candidateId,
           session_id: sessionId,
           role,
@@ -160,8 +163,10 @@ function App() {
           status: terminated ? 'terminated' : 'completed',
           violations,
           terminated,
-          events,
+          seq_start: seqStart,
+          events: events.slice(seqStart),
         });
+        proctorAckedSeq.current = res?.acked_seq ?? events.length;
         setLogUploaded(true);
       } catch (err) {
         // Logging should not break interview UX.
@@ -203,6 +208,7 @@ function App() {
       setAnswers([]);
       setHistoryPayload([]);
       setLogUploaded(false);
+      proctorAckedSeq.current = 0;
       clearEvents();
       appendEvent('session', 'Interview session started.', false, {
         role,
@@ -509,6 +515,7 @@ function App() {
                     setError('');
                     setSessionId('');
                     setLogUploaded(false);
+                    proctorAckedSeq.current = 0;
                   }}
                 />
               )}